@@ -0,0 +1,19 @@
+"""
+旗形与三角旗形态识别
+
+识别核心（只依赖NumPy）:
+important_point_algorithm   滚动窗口极值点、方向变化点、PIP感知重要点
+trendline_automation        支撑线/阻力线拟合
+flag_pattern_algorithm      识别函数的稳定导入入口（实现见flag_pattern_algorithm_0328）
+range_index                 区间最值索引
+pattern_pool, pattern_index 待确认形态池、形态时间跨度索引
+incremental_scan, chunked_scan, shape_scan, breakout, screener, shape_index, pattern_features
+scan_cache, adjusted_prices, order_sweep
+
+回测与参数选择: backtest, portfolio, significance, param_search, walk_forward, resample
+服务与流水线: scan_pipeline, scan_service
+绘图与结果输出（可选依赖）: pattern_render, overview_chart, result_writer
+
+各模块按需导入，例如 from flag_pattern.flag_pattern_algorithm import find_flags_pennants_pips；
+这里不预先导入任何子模块，导入单个模块的开销与原先的顶层模块相同。
+"""
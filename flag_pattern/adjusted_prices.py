@@ -0,0 +1,246 @@
+import numpy as np
+from .incremental_scan import ResumableScanner
+from .flag_pattern_algorithm_0328 import FlagParams, patterns_to_table
+
+
+# 形态表格中的价格字段：对数价格整体平移时这些字段随之平移，其余字段（位置、宽度、高度、斜率）不变
+PRICE_FIELDS = ['base_y', 'tip_y', 'conf_y', 'support_intercept', 'resist_intercept']
+
+
+'''====================1.原始价格与复权因子==========================='''
+
+class AdjustedPriceStore:
+    """
+    保存原始价格和复权因子、按需复权的价格库
+
+    get_stock_data以前复权（PriceAdj=F）方式取数，每次分红送股都会改写全部历史价格，
+    所有缓存的扫描结果随之失效。这里只保存不复权的原始价格，复权因子（后复权因子，
+    在每个除权日跳变的累计乘数）压缩为跳变点(除权K线, 对数跳变幅度)保存，取价格时才展开：
+    - 后复权：原始价格 × F[t] / F[0]，新的除权事件只改变除权日及之后的价格；
+    - 前复权：原始价格 × F[t] / F[-1]，取对数后等于后复权的对数价格整体减去常数log(F[-1] / F[0])。
+
+    每次修改都记录版本号和受影响的第一根K线，AdjustedScanCache据此只重新扫描受影响的部分。
+    """
+
+    def __init__(self):
+        self._raw = {}     # 品种 -> 原始价格
+        self._events = {}  # 品种 -> (除权K线数组, 对数跳变幅度数组)
+        self._changes = {}  # 品种 -> [(版本号, 受影响的第一根K线)]
+        self.version = 0
+
+    def __contains__(self, symbol):
+        return symbol in self._raw
+
+    def __len__(self):
+        return len(self._raw)
+
+    def bars(self, symbol) -> int:
+        """品种的K线数"""
+        return len(self._raw[symbol])
+
+    def _touch(self, symbol, first: int):
+        self.version += 1
+        self._changes.setdefault(symbol, []).append((self.version, int(first)))
+
+    def set_series(self, symbol, raw: np.array, factor: np.array = None):
+        """
+        设置（或整体替换）一个品种的原始价格
+
+        参数:
+        raw: np.array - 不复权价格
+        factor: np.array - 与raw等长的累计复权因子（如Wind的adjfactor），None表示没有除权
+        """
+        raw = np.asarray(raw, dtype=np.float64).copy()
+        ex_x, jumps = np.zeros(0, dtype=np.int64), np.zeros(0)
+        if factor is not None:
+            log_f = np.log(np.asarray(factor, dtype=np.float64))
+            ex_x = np.flatnonzero(np.diff(log_f) != 0) + 1
+            jumps = log_f[ex_x] - log_f[ex_x - 1]
+        self._raw[symbol] = raw
+        self._events[symbol] = (ex_x, jumps)
+        self._touch(symbol, 0)
+
+    def append(self, symbol, raw: np.array, factor: float = None):
+        """
+        追加新K线的原始价格
+
+        参数:
+        factor: float - 新K线的复权因子相对上一根K线的倍数（当天除权时传入，例如每10股派1元、收盘10元时约为1.01）
+        """
+        raw = np.atleast_1d(np.asarray(raw, dtype=np.float64))
+        start = len(self._raw[symbol])
+        self._raw[symbol] = np.concatenate([self._raw[symbol], raw])
+        if factor is not None and factor != 1.0:
+            self._add_event(symbol, start, np.log(factor))
+        self._touch(symbol, start)
+
+    def add_adjustment(self, symbol, ex_x: int, ratio: float):
+        """
+        登记一次除权：第ex_x根K线起复权因子乘以ratio（可以是历史上补录或更正的除权事件）
+
+        返回:
+        int - 受影响的第一根K线（后复权价格只在ex_x及之后改变）
+        """
+        self._add_event(symbol, ex_x, np.log(ratio))
+        self._touch(symbol, ex_x)
+        return ex_x
+
+    def _add_event(self, symbol, ex_x: int, jump: float):
+        xs, js = self._events[symbol]
+        pos = np.searchsorted(xs, ex_x)
+        if pos < len(xs) and xs[pos] == ex_x:
+            js = js.copy()
+            js[pos] += jump
+        else:
+            xs, js = np.insert(xs, pos, ex_x), np.insert(js, pos, jump)
+        self._events[symbol] = (xs, js)
+
+    def changed_since(self, symbol, version: int):
+        """
+        version之后受影响的第一根K线，没有变化时返回None
+        """
+        firsts = [first for v, first in self._changes.get(symbol, []) if v > version]
+        return min(firsts) if firsts else None
+
+    def log_factor(self, symbol) -> np.array:
+        """
+        逐K线展开的累计对数复权因子log(F[t] / F[0])
+        """
+        n = len(self._raw[symbol])
+        xs, js = self._events[symbol]
+        steps = np.zeros(n + 1)
+        np.add.at(steps, np.minimum(xs, n), js)
+        return np.cumsum(steps[:n])
+
+    def prices(self, symbol, adjust: str = 'backward', log: bool = True) -> np.array:
+        """
+        复权价格
+
+        参数:
+        adjust: str - 'backward'后复权、'forward'前复权、None不复权
+        log: bool - 是否返回对数价格
+
+        返回:
+        np.array - 价格数组（每次调用重新展开，不缓存）
+        """
+        out = np.log(self._raw[symbol])
+        if adjust is not None:
+            lf = self.log_factor(symbol)
+            out = out + lf
+            if adjust == 'forward':
+                out = out - (lf[-1] if len(lf) else 0.0)
+            elif adjust != 'backward':
+                raise ValueError(f"未知的复权方式: {adjust}")
+        return out if log else np.exp(out)
+
+    def forward_shift(self, symbol) -> float:
+        """前复权对数价格与后复权对数价格之差（常数）"""
+        lf = self.log_factor(symbol)
+        return -float(lf[-1]) if len(lf) else 0.0
+
+
+'''====================2.利用平移不变性的扫描缓存==========================='''
+
+class AdjustedScanCache:
+    """
+    复权价格的扫描结果缓存
+
+    识别在对数价格上进行，对数价格整体加上一个常数时，局部极值、PIP点、趋势线斜率、高度和宽度都不变，
+    只有价格字段（PRICE_FIELDS）平移同一个常数。因此：
+    - 扫描统一在后复权对数价格上进行。新的除权事件只改变除权日及之后的后复权价格，
+      之前的部分逐位不变；识别是因果的，除权日之前确认的形态和扫描器状态都可以直接复用。
+    - 前复权结果不重新扫描，把后复权结果的价格字段整体平移forward_shift即可。
+
+    扫描过程中每隔checkpoint_every根K线保存一次扫描器状态（ResumableScanner.to_dict）。
+    价格从第d根K线起发生变化时，回到不晚于d的最近检查点，丢弃之后确认的形态，只重新扫描检查点之后的部分；
+    只是追加新K线时直接从最新状态续扫。
+
+    参数:
+    store: AdjustedPriceStore - 价格库
+    checkpoint_every: int - 检查点间隔（K线数），越小回退时重扫的K线越少，保存的状态越多
+    """
+
+    def __init__(self, store: AdjustedPriceStore, checkpoint_every: int = 1000):
+        assert(checkpoint_every >= 1)
+        self.store = store
+        self.checkpoint_every = checkpoint_every
+        self._entries = {}
+        self.scanned_bars = 0  # 累计实际扫描的K线数
+        self.reused_bars = 0   # 累计复用（未重新扫描）的K线数
+
+    def _scan_to(self, entry: dict, data: np.array):
+        # 从entry的扫描器当前位置扫描到data末尾，沿途保存检查点
+        scanner = entry['scanner']
+        pos = scanner.next_i
+        step = self.checkpoint_every
+        while pos < len(data):
+            stop = min((pos // step + 1) * step, len(data))
+            for found, patterns in zip(scanner.update(data[pos:stop]), entry['patterns']):
+                patterns.extend(found)
+            self.scanned_bars += stop - pos
+            pos = stop
+            if pos % step == 0:
+                entry['checkpoints'].append((pos, scanner.to_dict()))
+
+    def _rollback(self, entry: dict, first: int):
+        # 回到不晚于first的最近检查点，丢弃之后确认的形态和检查点
+        checkpoints = entry['checkpoints']
+        while checkpoints and checkpoints[-1][0] > first:
+            checkpoints.pop()
+        if checkpoints:
+            pos, state = checkpoints[-1]
+            entry['scanner'] = ResumableScanner.from_dict(state)
+        else:
+            pos = 0
+            entry['scanner'] = ResumableScanner(*entry['args'])
+        entry['patterns'] = [[p for p in patterns if p.conf_x < pos] for patterns in entry['patterns']]
+
+    def patterns(self, symbol, method: str = 'pips', order: int = 12, adjust: str = 'forward', max_pending: int = 1,
+                 params: FlagParams = None, max_span: int = None) -> dict:
+        """
+        品种的形态表格，只对价格发生变化的部分重新扫描
+
+        参数:
+        adjust: str - 'forward'前复权或'backward'后复权，决定返回的价格字段所在的坐标
+        其他参数见ResumableScanner
+
+        异常:
+        KeyError - 价格库中没有该品种
+
+        返回:
+        dict - 形态表格，与patterns_to_table(find_flags_pennants_*(store.prices(symbol, adjust), ...))相同
+               （前复权时价格字段由平移得到，与直接扫描相差浮点舍入误差）
+        """
+        if adjust not in ('forward', 'backward'):
+            raise ValueError(f"未知的复权方式: {adjust}")
+        if symbol not in self.store:
+            # 否则changed_since找不到任何变化，会静默返回空表格
+            raise KeyError(f"未知的品种: {symbol}（请先用store.set_series添加价格）")
+        key = (symbol, method, int(order), int(max_pending), params, max_span)
+        entry = self._entries.get(key)
+        if entry is None:
+            args = (order, method, max_pending, params, max_span)
+            entry = {'args': args, 'scanner': ResumableScanner(*args), 'patterns': ([], [], [], []),
+                     'checkpoints': [], 'version': 0}
+            self._entries[key] = entry
+
+        first = self.store.changed_since(symbol, entry['version'])
+        if first is not None:
+            data = self.store.prices(symbol, 'backward')
+            if first < entry['scanner'].next_i:
+                self._rollback(entry, first)
+            self.reused_bars += entry['scanner'].next_i
+            self._scan_to(entry, data)
+            entry['version'] = self.store.version
+
+        table = patterns_to_table(entry['patterns'])
+        if adjust == 'forward':
+            shift = self.store.forward_shift(symbol)
+            for name in PRICE_FIELDS:
+                table[name] = table[name] + shift
+        return table
+
+    def stats(self) -> dict:
+        """扫描/复用的K线数和检查点数"""
+        return {'entries': len(self._entries), 'scanned_bars': self.scanned_bars, 'reused_bars': self.reused_bars,
+                'checkpoints': sum(len(e['checkpoints']) for e in self._entries.values())}
@@ -0,0 +1,232 @@
+from dataclasses import dataclass
+import numpy as np
+from .pattern_index import PATTERN_KINDS
+
+
+# 平仓原因编码
+EXIT_HORIZON = 0   # 持有期到期
+EXIT_TARGET = 1    # 达到测量目标
+EXIT_STOP = 2      # 触及反向趋势线
+EXIT_TRAIL = 3     # 触发追踪止损
+EXIT_REASONS = ['horizon', 'target', 'stop', 'trail']
+
+
+@dataclass
+class ExitRule:
+    """
+    一组平仓规则，持有期到期总是生效，其余规则为None/False时不启用
+
+    属性:
+    target_mult: float - 测量目标：入场价沿形态方向移动 pole_height * target_mult 时止盈
+    stop: bool - 反向趋势线止损：牛市形态跌破支撑线、熊市形态升破阻力线时止损，
+                 趋势线按斜率延伸到每一根K线
+    trail_mult: float - 追踪止损：从持仓以来的最有利价格回撤 flag_height * trail_mult 时平仓
+    """
+    target_mult: float = None
+    stop: bool = False
+    trail_mult: float = None
+
+
+@dataclass
+class EventStudyResult:
+    """
+    事件研究的回测结果
+
+    逐笔结果的数组形状均为(规则数, 持有期乘数个数, 形态数)，持有期超出数据范围的交易为NaN
+
+    属性:
+    rules: list - 规则名称
+    hold_mults: np.array - 持有期乘数
+    kinds: np.array - 每个形态的类型编码（PATTERN_KINDS的下标）
+    pnl: np.array - 每笔交易的对数收益（熊市形态做空，已按方向取正负）
+    mae: np.array - 最大不利偏移（<=0）
+    mfe: np.array - 最大有利偏移（>=0）
+    bars: np.array - 持仓K线数
+    reason: np.array - 平仓原因，见EXIT_REASONS
+    """
+    rules: list
+    hold_mults: np.array
+    kinds: np.array
+    pnl: np.array
+    mae: np.array
+    mfe: np.array
+    bars: np.array
+    reason: np.array
+
+    def stats(self):
+        """
+        按(规则, 持有期乘数, 形态类型)汇总：数量、平均收益、胜率、总收益、平均MAE/MFE、平均持仓K线数、
+        各平仓原因的占比
+
+        返回:
+        pd.DataFrame - 以(rule, hold_mult, pattern)为索引
+        """
+        import pandas as pd  # 只有汇总时才需要pandas
+
+        rows, index = [], []
+        for r, rule in enumerate(self.rules):
+            for h, hold_mult in enumerate(self.hold_mults):
+                for k, name in enumerate(PATTERN_KINDS):
+                    mask = self.kinds == k
+                    pnl = self.pnl[r, h, mask]
+                    done = ~np.isnan(pnl)
+                    row = {
+                        'count': int(mask.sum()),
+                        'avg': pnl[done].mean() if done.any() else np.nan,
+                        'wr': (pnl > 0).sum() / len(pnl) if len(pnl) else np.nan,
+                        'total': pnl[done].sum(),
+                        'mae': self.mae[r, h, mask][done].mean() if done.any() else np.nan,
+                        'mfe': self.mfe[r, h, mask][done].mean() if done.any() else np.nan,
+                        'bars': self.bars[r, h, mask][done].mean() if done.any() else np.nan,
+                    }
+                    reasons = self.reason[r, h, mask][done]
+                    for code, reason in enumerate(EXIT_REASONS):
+                        row[f'exit_{reason}'] = (reasons == code).mean() if done.any() else np.nan
+                    rows.append(row)
+                    index.append((rule, float(hold_mult), name))
+        return pd.DataFrame(rows, index=pd.MultiIndex.from_tuples(index, names=['rule', 'hold_mult', 'pattern']))
+
+
+def _first_true(mask: np.array) -> np.array:
+    """每一行第一个True的列号，没有True时为列数"""
+    first = np.argmax(mask, axis=1)
+    first[~mask.any(axis=1)] = mask.shape[1]
+    return first
+
+
+def _simulate_chunk(t: dict, high, low, close, open_, rules: dict, hold_mults: np.array):
+    """
+    对一批形态模拟所有规则和持有期乘数
+
+    所有价格先换算到"方向化"的坐标：相对入场价的收益，熊市形态取负号，这样多空两种方向
+    都可以按做多的逻辑统一处理：有利价格是 high（做空时是 low），不利价格是 low（做空时是 high）。
+    每个形态的持仓路径是入场后的1..max_h根K线，构成(形态数, max_h)的矩阵，所有规则都在矩阵上向量化计算。
+    """
+    n = len(close)
+    conf_x = t['conf_x']
+    direction = np.where(np.isin(t['kind'], [PATTERN_KINDS.index('bull_flag'), PATTERN_KINDS.index('bull_pennant')]),
+                         1.0, -1.0)
+    horizons = (t['flag_width'][None, :] * hold_mults[:, None]).astype(np.int64)  # (持有期乘数个数, 形态数)
+    max_h = max(int(horizons.max()), 1) if horizons.size else 1
+
+    offsets = np.arange(1, max_h + 1)
+    idx = conf_x[:, None] + offsets[None, :]
+    inside = idx < n
+    idx = np.minimum(idx, n - 1)
+
+    entry = close[conf_x][:, None]
+    d = direction[:, None]
+    fav = d * (np.where(d > 0, high[idx], low[idx]) - entry)    # 每根K线的最有利收益
+    adv = d * (np.where(d > 0, low[idx], high[idx]) - entry)    # 每根K线的最不利收益
+    cls = d * (close[idx] - entry)                              # 每根K线的收盘收益
+    opn = d * (open_[idx] - entry) if open_ is not None else None
+    # 数据末尾之后的K线不触发任何规则
+    fav = np.where(inside, fav, -np.inf)
+    adv = np.where(inside, adv, np.inf)
+
+    # 反向趋势线：牛市用支撑线，熊市用阻力线；趋势线以tip_x为原点
+    line_b = np.where(direction > 0, t['support_intercept'], t['resist_intercept'])
+    line_k = np.where(direction > 0, t['support_slope'], t['resist_slope'])
+    stop_line = d * (line_b[:, None] + line_k[:, None] * (idx - t['tip_x'][:, None]) - entry)
+
+    # 入场以来（不含当根K线）的最有利收益，用于追踪止损
+    peak = np.maximum.accumulate(np.concatenate([np.zeros((len(conf_x), 1)), fav[:, :-1]], axis=1), axis=1)
+
+    out = {name: np.empty((len(rules), len(hold_mults), len(conf_x))) for name in ('pnl', 'mae', 'mfe', 'bars')}
+    out['reason'] = np.empty((len(rules), len(hold_mults), len(conf_x)), dtype=np.int8)
+    rows = np.arange(len(conf_x))
+
+    for r, rule in enumerate(rules.values()):
+        # 每条规则的首次触发K线与持有期无关，只计算一次
+        first = np.full(len(conf_x), max_h)
+        level = np.full(len(conf_x), np.nan)
+        reason = np.full(len(conf_x), EXIT_HORIZON, dtype=np.int8)
+
+        # 优先级（同一根K线同时触发时）：止损 > 追踪止损 > 止盈，按保守原则先判定亏损方向
+        candidates = []
+        if rule.target_mult is not None:
+            target = (t['pole_height'] * rule.target_mult)[:, None]
+            hit = fav >= target
+            fill = np.maximum(target, opn) if opn is not None else np.broadcast_to(target, hit.shape)
+            candidates.append((EXIT_TARGET, hit, fill))
+        if rule.trail_mult is not None:
+            trail = peak - (t['flag_height'] * rule.trail_mult)[:, None]
+            hit = adv <= trail
+            fill = np.minimum(trail, opn) if opn is not None else trail
+            candidates.append((EXIT_TRAIL, hit, fill))
+        if rule.stop:
+            hit = adv <= stop_line
+            fill = np.minimum(stop_line, opn) if opn is not None else stop_line
+            candidates.append((EXIT_STOP, hit, fill))
+
+        for code, hit, fill in candidates:
+            f = _first_true(hit)
+            fill_at = fill[rows, np.minimum(f, max_h - 1)]
+            better = (f < max_h) & (f <= first)  # 后加入的规则优先级更高，相同K线时覆盖
+            first = np.where(better, f, first)
+            level = np.where(better, fill_at, level)
+            reason = np.where(better, code, reason)
+
+        for h in range(len(hold_mults)):
+            hp = horizons[h]
+            triggered = first < hp  # 第first+1根K线触发，且在持有期之内
+            exit_col = np.where(triggered, first, hp - 1)
+            pnl = np.where(triggered, level, cls[rows, np.maximum(exit_col, 0)])
+            pnl = np.where(hp == 0, 0.0, pnl)  # 持有期为0：确认点当根平仓
+
+            # 持仓期间的MAE/MFE：平仓K线之前的完整K线 + 平仓价格（到期平仓时平仓K线完整计入）
+            held = offsets[None, :] - 1 < exit_col[:, None]
+            full_last = ~triggered & (hp > 0)
+            held_full = held | ((offsets[None, :] - 1 == exit_col[:, None]) & full_last[:, None])
+            mfe = np.maximum(np.where(held_full, fav, -np.inf).max(axis=1), np.maximum(pnl, 0.0))
+            mae = np.minimum(np.where(held_full, adv, np.inf).min(axis=1), np.minimum(pnl, 0.0))
+
+            # 与原先的统计口径一致：持有期结束点超出数据范围的交易记为NaN
+            valid = conf_x + hp < n
+            out['pnl'][r, h] = np.where(valid, pnl, np.nan)
+            out['mae'][r, h] = np.where(valid, mae, np.nan)
+            out['mfe'][r, h] = np.where(valid, mfe, np.nan)
+            out['bars'][r, h] = np.where(valid, np.where(hp == 0, 0, exit_col + 1), np.nan)
+            out['reason'][r, h] = np.where(triggered, reason, EXIT_HORIZON)
+    return out
+
+
+def run_event_study(table: dict, high: np.array, low: np.array, close: np.array, open_: np.array = None,
+                    hold_mults=(1.0,), rules: dict = None, chunk_size: int = 4096) -> EventStudyResult:
+    """
+    向量化的形态事件研究回测
+
+    在确认点收盘价入场，一次调用同时评估多组平仓规则和多个持有期乘数。
+    持有期 = int(flag_width * hold_mult)，只有持有期到期规则时结果与pattern_returns完全一致。
+    同一根K线上同时满足多个平仓条件时，按 止损 > 追踪止损 > 止盈 的保守顺序处理；
+    提供开盘价时，跳空越过止损/止盈价的K线按开盘价成交。
+
+    参数:
+    table: dict - 形态表格（patterns_to_table的返回值）
+    high, low, close: np.array - 价格数组（与识别时使用的价格一致，通常是对数价格）
+    open_: np.array - 开盘价，可选
+    hold_mults: list - 持有期乘数
+    rules: dict - 规则名称 -> ExitRule，默认只有持有期到期规则
+    chunk_size: int - 每批处理的形态数，限制路径矩阵的内存占用
+
+    返回:
+    EventStudyResult - 逐笔结果，调用stats()得到汇总统计
+    """
+    if rules is None:
+        rules = {'horizon': ExitRule()}
+    high, low, close = (np.asarray(a, dtype=float) for a in (high, low, close))
+    open_ = np.asarray(open_, dtype=float) if open_ is not None else None
+    hold_mults = np.asarray(hold_mults, dtype=float)
+    t = {name: np.asarray(col) for name, col in table.items()}
+    count = len(t['conf_x'])
+
+    shape = (len(rules), len(hold_mults), count)
+    result = {name: np.empty(shape) for name in ('pnl', 'mae', 'mfe', 'bars')}
+    result['reason'] = np.empty(shape, dtype=np.int8)
+    for lo in range(0, count, chunk_size):
+        chunk = {name: col[lo:lo + chunk_size] for name, col in t.items()}
+        out = _simulate_chunk(chunk, high, low, close, open_, rules, hold_mults)
+        for name in result:
+            result[name][:, :, lo:lo + chunk_size] = out[name]
+
+    return EventStudyResult(list(rules), hold_mults, np.asarray(t['kind']), **result)
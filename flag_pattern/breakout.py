@@ -0,0 +1,135 @@
+import numpy as np
+from .important_point_algorithm import find_pips
+from .trendline_automation import fit_trendlines_single
+from .flag_pattern_algorithm_0328 import FlagPattern, FlagParams, DEFAULT_FLAG_PARAMS
+from .pattern_index import PATTERN_KINDS
+from .range_index import RangeIndex, SliceRangeIndex
+
+
+# pending_breakouts输出的列
+BREAKOUT_COLUMNS = ['kind', 'base_x', 'tip_x', 'level_x', 'level', 'slope', 'last_y', 'distance',
+                    'flag_width', 'pole_width', 'pole_height']
+
+
+'''====================1.候选形态的突破线==========================='''
+
+def breakout_line(pending: FlagPattern, data: np.array, i: int, order: int, method: str, bull: bool,
+                  params: FlagParams = None, index: RangeIndex = None):
+    """
+    候选形态在第i根K线收盘后的突破线：第i+1根K线的价格越过level（牛市向上、熊市向下）即可能确认
+
+    旗杆、旗帜宽度和高度的条件与check_*_pattern_*相同，按第i+1根K线确认来检查，不满足时返回None。
+    - 趋势线方法：旗帜部分是data[tip_x:i+1]，与第i+1根K线上的检查完全相同，level是精确的确认价格；
+    - PIP方法：PIP点依赖确认K线本身，这里以第i根K线为PIP终点，把阻力线（熊市为支撑线）延长一根K线作为近似。
+
+    参数:
+    pending: FlagPattern - 候选形态（base_x/base_y，趋势线方法还有tip_x/tip_y）
+    data: np.array - 价格数组
+    i: int - 最后一根已收盘K线的索引
+    order: int - 滚动窗口大小参数
+    method: str - 'pips'或'trendline'
+    bull: bool - 牛市候选为True
+    params: FlagParams - 阈值参数
+    index: RangeIndex - data的区间最值索引，None时直接对切片求值
+
+    返回:
+    dict - tip_x、level（第i+1根K线的突破价）、slope（突破线斜率，向后外推用）、pennant、
+           flag_width/pole_width/pole_height（按第i+1根K线确认计算）；几何条件不满足时为None
+    """
+    if params is None:
+        params = DEFAULT_FLAG_PARAMS
+    if index is None:
+        index = SliceRangeIndex(data)
+    j = i + 1  # 假设在下一根K线确认
+    sign = 1.0 if bull else -1.0
+
+    if method == 'pips':
+        tip = index.argmax(pending.base_x, j) if bull else index.argmin(pending.base_x, j)
+        flag_width = j - tip
+        if flag_width < max(params.min_flag_width, order * params.min_flag_width_order):
+            return None
+        # 旗帜高度只能用到第i根K线（确认K线在突破方向上，不会增加回撤）
+        flag_height = data[tip] - index.min(tip, j) if bull else index.max(tip, j) - data[tip]
+    else:
+        tip = pending.tip_x
+        flag_width = j - tip
+        if flag_width < 2:  # 至少两根K线才能拟合趋势线
+            return None
+        # 旗帜部分不能越过旗杆顶点（熊市为底点）
+        if bull and index.max(tip + 1, j) > pending.tip_y:
+            return None
+        if not bull and index.min(tip + 1, j) < pending.tip_y:
+            return None
+        flag_height = data[tip] - index.min(tip, j) if bull else index.max(tip, j) - data[tip]
+
+    pole_width = tip - pending.base_x
+    pole_height = sign * (data[tip] - pending.base_y)
+    if flag_width > pole_width * params.max_flag_width_ratio:
+        return None
+    if flag_height > pole_height * params.max_flag_height_ratio:
+        return None
+
+    if method == 'pips':
+        pips_x, pips_y = find_pips(data[tip:j], 5, params.pip_distance)
+        # 旗帜形状：中间的PIP点是局部高点（熊市为局部低点）
+        if not (sign * pips_y[2] > sign * pips_y[1] and sign * pips_y[2] > sign * pips_y[3]):
+            return None
+        # 突破线连接第1、3个PIP点（牛市为阻力线，熊市为支撑线）；另一条线决定是否为三角旗
+        slope = (pips_y[2] - pips_y[0]) / (pips_x[2] - pips_x[0])
+        level = pips_y[0] + slope * (pips_x[4] + 1)
+        other_slope = (pips_y[3] - pips_y[1]) / (pips_x[3] - pips_x[1])
+    else:
+        support_coefs, resist_coefs = fit_trendlines_single(data[tip:j])
+        line, other = (resist_coefs, support_coefs) if bull else (support_coefs, resist_coefs)
+        slope = line[0]
+        level = line[1] + line[0] * (flag_width + 1)  # 与check_*_pattern_trendline中的确认价相同
+        other_slope = other[0]
+
+    return {'tip_x': int(tip), 'level': float(level), 'slope': float(slope),
+            'pennant': bool(other_slope > 0 if bull else other_slope < 0),
+            'flag_width': int(flag_width), 'pole_width': int(pole_width), 'pole_height': float(pole_height)}
+
+
+'''====================2.扫描器中所有候选的突破线==========================='''
+
+def pending_breakouts(scanner, index: RangeIndex = None) -> dict:
+    """
+    增量扫描器（ResumableScanner）当前所有候选形态的突破线
+
+    distance是最后一根K线距离突破线还差多少（对数价格单位，牛市为level - last_y，熊市为last_y - level），
+    越小越接近突破，负值表示已经越过突破线但还未满足其他确认条件。
+    只包含已经进入候选池的形态：局部顶部/底部要滞后order根K线才能确认，
+    新候选在创建的同一根K线上就确认的形态无法提前列出。
+
+    参数:
+    scanner: ResumableScanner - 增量扫描器
+    index: RangeIndex - scanner.buffer的区间最值索引，None时直接对切片求值
+
+    返回:
+    dict - 列见BREAKOUT_COLUMNS，索引均为全序列的绝对索引；kind为PATTERN_KINDS中的序号，按distance升序排列
+    """
+    data = scanner.buffer
+    i = len(data) - 1
+    rows = []
+    if i >= 0:
+        # 候选只有少数几个，直接对切片求值、现场拟合比构建整段缓冲区的索引更快
+        for bull, pool in ((True, scanner.pending_bulls), (False, scanner.pending_bears)):
+            for pending in pool:
+                line = breakout_line(pending, data, i, scanner.order, scanner.method, bull, scanner.params, index)
+                if line is None:
+                    continue
+                name = ('bull_' if bull else 'bear_') + ('pennant' if line['pennant'] else 'flag')
+                distance = line['level'] - data[i] if bull else data[i] - line['level']
+                rows.append((PATTERN_KINDS.index(name), pending.base_x + scanner.offset,
+                             line['tip_x'] + scanner.offset, scanner.offset + i + 1, line['level'], line['slope'],
+                             float(data[i]), float(distance), line['flag_width'], line['pole_width'],
+                             line['pole_height']))
+    rows.sort(key=lambda row: row[7])
+
+    table = {name: np.array([row[k] for row in rows]) for k, name in enumerate(BREAKOUT_COLUMNS)}
+    table['kind'] = table['kind'].astype(np.int8)
+    for name in ('base_x', 'tip_x', 'level_x', 'flag_width', 'pole_width'):
+        table[name] = table[name].astype(np.int64)
+    for name in ('level', 'slope', 'last_y', 'distance', 'pole_height'):
+        table[name] = table[name].astype(np.float64)
+    return table
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+from .incremental_scan import ResumableScanner
+
+
+'''====================1.磁盘上的价格数组==========================='''
+
+def open_prices(path: str, dtype=np.float64) -> np.array:
+    """
+    以内存映射方式打开磁盘上的价格数组，不把整个文件读入内存
+
+    参数:
+    path: str - .npy文件，或没有文件头的原始二进制文件（按dtype解释）
+    dtype: 原始二进制文件的数据类型
+
+    返回:
+    np.memmap - 只读的一维数组，切片时才从磁盘读取对应部分
+    """
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    return np.memmap(path, dtype=dtype, mode='r')
+
+
+def csv_to_npy(csv_path: str, npy_path: str, column: str = 'close', log: bool = True,
+               chunksize: int = 1_000_000) -> int:
+    """
+    把CSV中的一列价格逐块转存为.npy文件，供open_prices内存映射读取
+
+    CSV按chunksize行分块读取，先统计行数，再逐块写入预先分配好的.npy内存映射，
+    任何时候内存中只有一块数据。
+
+    参数:
+    csv_path: str - CSV文件路径（如旗形/BTCUSDT3600.csv）
+    npy_path: str - 输出的.npy文件路径
+    column: str - 价格列名
+    log: bool - 是否取自然对数（识别一般在对数价格上进行）
+    chunksize: int - 每次读取的行数
+
+    返回:
+    int - 写入的K线数
+    """
+    import pandas as pd  # 只有转换CSV时才需要pandas
+
+    n = sum(len(part) for part in pd.read_csv(csv_path, usecols=[column], chunksize=chunksize))
+    out = np.lib.format.open_memmap(npy_path, mode='w+', dtype=np.float64, shape=(n,))
+    pos = 0
+    for part in pd.read_csv(csv_path, usecols=[column], chunksize=chunksize):
+        values = part[column].to_numpy(dtype=np.float64)
+        out[pos:pos + len(values)] = np.log(values) if log else values
+        pos += len(values)
+    out.flush()
+    del out
+    return n
+
+
+'''====================2.分块扫描==========================='''
+
+def iter_chunks(prices: np.array, order: int, max_span: int, method: str = 'pips', chunk_size: int = 1_000_000,
+                max_pending: int = 1, params=None, start: int = 0, end: int = None):
+    """
+    逐块扫描价格数组，每处理完一块就返回这一块中新确认的形态
+
+    每块只从prices（通常是open_prices返回的内存映射）中读取chunk_size根K线，交给ResumableScanner续扫。
+    扫描器在块之间保留的尾部数据就是下一块的前导区（halo）：滚动窗口需要的2*order+1根K线，
+    以及跨度不超过max_span的候选形态的起点之后的数据。块之间传递的状态（候选池、last_top/last_bottom）
+    也由扫描器保存，因此跨越块边界的形态与整段扫描一样能被识别。
+
+    内存占用：前导区不超过max(max_span, 2*order+1)根K线，加上当前块，
+    以及在两者之上构建的区间最值索引，与序列总长度无关。
+
+    参数:
+    prices: np.array - 价格数组，可以是np.memmap
+    order: int - 滚动窗口大小参数
+    max_span: int - 形态跨度上限（见find_flags_pennants_*），决定前导区的长度
+    method: str - 'pips'或'trendline'
+    chunk_size: int - 每块的K线数
+    max_pending: int - 每个方向的候选池容量
+    params: FlagParams - 形态检查的阈值参数
+    start, end: int - 只扫描prices[start:end]，形态索引相对于start
+
+    生成:
+    (块结束位置, (bull_flags, bear_flags, bull_pennants, bear_pennants))
+    """
+    assert(chunk_size >= 1)
+    end = len(prices) if end is None else min(end, len(prices))
+    scanner = ResumableScanner(order, method, max_pending, params, max_span)
+    for pos in range(start, end, chunk_size):
+        stop = min(pos + chunk_size, end)
+        # np.array复制出这一块，读取后不再引用内存映射的页
+        result = scanner.update(np.array(prices[pos:stop], dtype=np.float64))
+        yield stop - start, result
+
+
+def scan_chunked(prices, order: int, max_span: int, method: str = 'pips', chunk_size: int = 1_000_000,
+                 max_pending: int = 1, params=None):
+    """
+    分块扫描整个价格数组，结果与在内存中一次性扫描
+    find_flags_pennants_*(prices, order, max_span=max_span, ...)完全相同
+
+    参数:
+    prices: np.array/str - 价格数组，或.npy/原始二进制文件路径（以内存映射方式打开）
+    其他参数见iter_chunks
+
+    返回:
+    bull_flags: list - 牛市旗形列表
+    bear_flags: list - 熊市旗形列表
+    bull_pennants: list - 牛市三角旗列表
+    bear_pennants: list - 熊市三角旗列表
+    """
+    if isinstance(prices, (str, os.PathLike)):
+        prices = open_prices(os.fspath(prices))
+    results = ([], [], [], [])
+    for _, found in iter_chunks(prices, order, max_span, method, chunk_size, max_pending, params):
+        for patterns, new in zip(results, found):
+            patterns.extend(new)
+    return results
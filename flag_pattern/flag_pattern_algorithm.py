@@ -0,0 +1,21 @@
+"""
+旗形识别算法的稳定导入入口
+
+识别算法实现在flag_pattern_algorithm_0328.py中（按日期命名的版本）。
+主程序和其他脚本统一从这里导入，以后更换实现版本时只需要修改这个文件。
+"""
+from .flag_pattern_algorithm_0328 import (  # noqa: F401
+    FlagPattern,
+    FlagParams,
+    DEFAULT_FLAG_PARAMS,
+    patterns_to_table,
+    table_to_patterns,
+    check_bull_pattern_pips,
+    check_bear_pattern_pips,
+    check_bull_pattern_trendline,
+    check_bear_pattern_trendline,
+    confirm_pending,
+    find_flags_pennants_pips,
+    find_flags_pennants_trendline,
+    plot_flag,
+)
@@ -0,0 +1,82 @@
+"""
+识别核心的冷启动导入时间检查
+
+进程池的每个工作进程启动时都要导入识别核心，导入越慢，并行扫描的启动开销越大。
+这里在全新的解释器中逐个导入核心模块，测量导入耗时，并检查是否意外加载了
+pandas、matplotlib等重量级依赖（这些依赖只应在绘图、汇总时按需导入）。
+
+用法:
+python -m flag_pattern.import_budget              # 使用默认预算
+python -m flag_pattern.import_budget --budget-ms 200
+任何模块超出预算或加载了重量级依赖时，以非零状态码退出，可以直接放进CI。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+# 识别核心模块：只允许依赖NumPy
+CORE_MODULES = ['flag_pattern.' + name for name in [
+    'important_point_algorithm', 'trendline_automation', 'pattern_pool', 'pattern_index', 'range_index',
+    'flag_pattern_algorithm_0328', 'flag_pattern_algorithm', 'shape_scan', 'incremental_scan', 'chunked_scan',
+    'breakout', 'screener', 'shape_index', 'pattern_features', 'scan_cache', 'adjusted_prices', 'order_sweep']]
+
+# 核心模块不允许在导入时加载的重量级依赖
+HEAVY_MODULES = ['pandas', 'matplotlib', 'mplfinance', 'plotly', 'pyarrow', 'scipy']
+
+# 默认预算（毫秒），包含导入NumPy本身的时间
+DEFAULT_BUDGET_MS = 300.0
+
+_PROBE = """
+import sys, time, json
+t = time.perf_counter()
+import {module}
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({{'ms': ms, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(module: str, repeat: int = 3):
+    """
+    在全新的解释器中导入模块，返回(耗时毫秒, 被加载的重量级依赖列表)
+
+    重复repeat次取最小值，排除磁盘缓存等偶然因素。
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # 包所在目录
+    best, heavy = float('inf'), []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             cwd=root, capture_output=True, text=True, check=True)
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        best = min(best, result['ms'])
+        heavy = result['heavy']
+    return best, heavy
+
+
+def check_import_budget(modules=CORE_MODULES, budget_ms: float = DEFAULT_BUDGET_MS, repeat: int = 3):
+    """
+    检查每个模块的冷启动导入时间
+
+    返回:
+    list - 每个模块的(模块名, 耗时毫秒, 被加载的重量级依赖, 是否通过)
+    """
+    report = []
+    for module in modules:
+        ms, heavy = measure_import(module, repeat)
+        report.append((module, ms, heavy, ms <= budget_ms and not heavy))
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='检查识别核心的冷启动导入时间')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help='每个模块的导入时间预算（毫秒）')
+    parser.add_argument('--repeat', type=int, default=3, help='每个模块重复测量的次数')
+    args = parser.parse_args()
+
+    report = check_import_budget(budget_ms=args.budget_ms, repeat=args.repeat)
+    for module, ms, heavy, ok in report:
+        note = f"  加载了重量级依赖: {', '.join(heavy)}" if heavy else ''
+        print(f"{'OK  ' if ok else 'FAIL'} {module:<44s} {ms:8.1f} ms{note}")
+    sys.exit(0 if all(ok for *_, ok in report) else 1)
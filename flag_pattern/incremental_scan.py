@@ -0,0 +1,232 @@
+import json
+from dataclasses import asdict, replace
+import numpy as np
+from .important_point_algorithm import rw_top, rw_bottom
+from .flag_pattern_algorithm_0328 import (FlagPattern, FlagParams, confirm_pending,
+                                         check_bull_pattern_pips, check_bear_pattern_pips,
+                                         check_bull_pattern_trendline, check_bear_pattern_trendline)
+from .pattern_pool import PendingPool
+from .range_index import RangeIndex, SliceRangeIndex
+
+
+CHECKPOINT_VERSION = 1
+
+# 一次追加不超过这么多根K线时不构建区间最值索引
+_SLICE_STEPS = 4
+
+_CHECKERS = {
+    'pips': (check_bull_pattern_pips, check_bear_pattern_pips),
+    'trendline': (check_bull_pattern_trendline, check_bear_pattern_trendline),
+}
+
+
+class ResumableScanner:
+    """
+    可断点续扫的旗形扫描器
+
+    新K线到来时，只有最后约2*order根K线以及仍未确认的候选形态可能发生变化，
+    而find_flags_pennants_*每次都从索引0重新扫描。这个扫描器在每次扫描结束时保存状态：
+    候选形态池、last_top/last_bottom以及滚动窗口所需的尾部价格缓冲区，
+    追加新K线时从断点继续，只返回新确认的形态。对同一序列分批调用update()与一次性调用
+    find_flags_pennants_*得到的结果完全一致。
+
+    状态可以序列化为JSON（to_dict/save/load），便于每日任务跨进程续扫。
+
+    缓冲区保留的历史由仍在跟踪的候选决定；设置max_span后候选的起点不会早于当前K线max_span根，
+    缓冲区长度不超过max(max_span, 2*order+1)加上一次追加的K线数（分块扫描依赖这一点，见chunked_scan）。
+
+    缓冲区内部使用相对于offset的局部索引，对外返回的形态一律使用全序列的绝对索引。
+
+    参数:
+    order: int - 滚动窗口大小参数
+    method: str - 'pips'或'trendline'
+    max_pending: int - 每个方向的候选池容量（按默认的起点新旧优先级淘汰）
+    params: FlagParams - 形态检查的阈值参数，None时使用默认值
+    max_span: int - 形态跨度上限，与find_flags_pennants_*的同名参数相同，None表示不限制
+    """
+
+    def __init__(self, order: int, method: str = 'pips', max_pending: int = 1, params: FlagParams = None,
+                 max_span: int = None):
+        assert(order >= 3)  # 确保窗口大小参数至少为3
+        if method not in _CHECKERS:
+            raise ValueError(f"未知的识别方法: {method}")
+        self.order = order
+        self.method = method
+        self.max_pending = max_pending
+        self.params = params
+        self.max_span = max_span
+
+        self.offset = 0                       # 缓冲区第一个元素在全序列中的绝对索引
+        self.buffer = np.zeros(0)             # 尾部价格缓冲区
+        self.next_i = 0                       # 下一个待处理的绝对索引
+        self.last_top = -1                    # 最近的局部顶部（局部索引，-1表示没有）
+        self.last_bottom = -1                 # 最近的局部底部（局部索引，-1表示没有）
+        self.pending_bulls = PendingPool(max_pending)
+        self.pending_bears = PendingPool(max_pending)
+
+    def __len__(self):
+        """已处理的K线总数"""
+        return self.next_i
+
+    def update(self, new_data: np.array):
+        """
+        追加新K线并从断点继续扫描
+
+        参数:
+        new_data: np.array - 新增的价格数据（与之前的数据首尾相接）
+
+        返回:
+        bull_flags, bear_flags, bull_pennants, bear_pennants - 本次新确认的形态（绝对索引）
+        """
+        self.buffer = np.concatenate([self.buffer, np.asarray(new_data, dtype=float)])
+        check_bull, check_bear = _CHECKERS[self.method]
+        order = self.order
+        data = self.buffer
+        start = self.next_i - self.offset
+        # 逐根K线推进时只有几次区间查询，直接对切片求值比重建稀疏表更快，结果相同
+        index = RangeIndex(data) if len(data) - start > _SLICE_STEPS else SliceRangeIndex(data)
+
+        bull_flags, bear_flags, bull_pennants, bear_pennants = [], [], [], []
+        max_span = self.max_span
+        for i in range(start, len(data)):
+            # 与find_flags_pennants_*的循环体保持一致
+            if max_span is not None:
+                self.pending_bulls.expire(i - max_span)
+                self.pending_bears.expire(i - max_span)
+            if self.method == 'pips':
+                if rw_top(data, i, order):
+                    self.pending_bears.push(FlagPattern(i - order, data[i - order]))
+                if rw_bottom(data, i, order):
+                    self.pending_bulls.push(FlagPattern(i - order, data[i - order]))
+            else:
+                if rw_top(data, i, order):
+                    self.last_top = i - order
+                    if self.last_bottom != -1 and (max_span is None or self.last_bottom >= i - max_span):
+                        self.pending_bulls.push(FlagPattern(self.last_bottom, data[self.last_bottom],
+                                                            self.last_top, data[self.last_top]))
+                if rw_bottom(data, i, order):
+                    self.last_bottom = i - order
+                    if self.last_top != -1 and (max_span is None or self.last_top >= i - max_span):
+                        self.pending_bears.push(FlagPattern(self.last_top, data[self.last_top],
+                                                            self.last_bottom, data[self.last_bottom]))
+
+            confirm_pending(self.pending_bears, check_bear, data, i, order, bear_flags, bear_pennants,
+                            self.params, index)
+            confirm_pending(self.pending_bulls, check_bull, data, i, order, bull_flags, bull_pennants,
+                            self.params, index)
+
+        self.next_i = self.offset + len(data)
+        result = tuple([self._to_absolute(p) for p in patterns]
+                       for patterns in (bull_flags, bear_flags, bull_pennants, bear_pennants))
+        self._trim()
+        return result
+
+    def pending(self):
+        """
+        返回当前仍未确认的候选形态（绝对索引），牛市在前
+        """
+        return ([self._to_absolute(p) for p in self.pending_bulls],
+                [self._to_absolute(p) for p in self.pending_bears])
+
+    def _to_absolute(self, pattern: FlagPattern) -> FlagPattern:
+        shift = self.offset
+        return replace(pattern,
+                       base_x=pattern.base_x + shift,
+                       tip_x=pattern.tip_x + shift if pattern.tip_x != -1 else -1,
+                       conf_x=pattern.conf_x + shift if pattern.conf_x != -1 else -1)
+
+    def _trim(self):
+        """
+        丢弃不再需要的历史数据：保留滚动窗口需要的2*order+1根K线，
+        以及所有候选形态起点和last_top/last_bottom之后的数据
+
+        设置了max_span时，先执行下一根K线开始时的过期处理：超出跨度的候选移出候选池，
+        超出跨度的last_top/last_bottom不能再作为旗杆起点，记为-1，两者都不再占用缓冲区
+        """
+        if self.max_span is not None:
+            horizon = len(self.buffer) - self.max_span  # 下一根K线的过期界限（局部索引）
+            self.pending_bulls.expire(horizon)
+            self.pending_bears.expire(horizon)
+            if self.last_top < horizon:
+                self.last_top = -1
+            if self.last_bottom < horizon:
+                self.last_bottom = -1
+        keep = len(self.buffer) - (2 * self.order + 1)
+        for pool in (self.pending_bulls, self.pending_bears):
+            for p in pool:
+                keep = min(keep, p.base_x)
+        for x in (self.last_top, self.last_bottom):
+            if x != -1:
+                keep = min(keep, x)
+        if keep <= 0:
+            return
+
+        self.buffer = self.buffer[keep:].copy()
+        self.offset += keep
+        for pool in (self.pending_bulls, self.pending_bears):
+            for p in pool:
+                p.base_x -= keep
+                if p.tip_x != -1:
+                    p.tip_x -= keep
+            # 默认优先级是base_x，平移后必须重新计算，否则之后加入的候选与旧候选的比较会出错
+            pool.reprioritize()
+        if self.last_top != -1:
+            self.last_top -= keep
+        if self.last_bottom != -1:
+            self.last_bottom -= keep
+
+    def to_dict(self) -> dict:
+        """
+        把扫描器状态导出为可JSON序列化的字典
+        """
+        return {
+            'version': CHECKPOINT_VERSION,
+            'order': self.order,
+            'method': self.method,
+            'max_pending': self.max_pending,
+            'params': asdict(self.params) if self.params is not None else None,
+            'max_span': self.max_span,
+            'offset': self.offset,
+            'next_i': self.next_i,
+            'last_top': self.last_top,
+            'last_bottom': self.last_bottom,
+            'buffer': self.buffer.tolist(),
+            # 候选池按插入顺序保存，恢复时按同样顺序放回以保持淘汰顺序
+            'pending_bulls': [_pattern_to_json(p) for p in self.pending_bulls],
+            'pending_bears': [_pattern_to_json(p) for p in self.pending_bears],
+        }
+
+    @classmethod
+    def from_dict(cls, state: dict):
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"不支持的断点版本: {state.get('version')}")
+        # 旧版本的断点没有params，使用默认阈值
+        params = state.get('params')
+        scanner = cls(state['order'], state['method'], state['max_pending'],
+                      FlagParams(**params) if params is not None else None, state.get('max_span'))
+        scanner.offset = state['offset']
+        scanner.next_i = state['next_i']
+        scanner.last_top = state['last_top']
+        scanner.last_bottom = state['last_bottom']
+        scanner.buffer = np.array(state['buffer'], dtype=float)
+        for p in state['pending_bulls']:
+            scanner.pending_bulls.push(FlagPattern(**p))
+        for p in state['pending_bears']:
+            scanner.pending_bears.push(FlagPattern(**p))
+        return scanner
+
+    def save(self, path: str):
+        """保存断点到JSON文件"""
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(self.to_dict(), fh)
+
+    @classmethod
+    def load(cls, path: str):
+        """从JSON文件恢复扫描器"""
+        with open(path, 'r', encoding='utf-8') as fh:
+            return cls.from_dict(json.load(fh))
+
+
+def _pattern_to_json(pattern: FlagPattern) -> dict:
+    # 把NumPy标量转换为Python原生类型，保证可以JSON序列化
+    return {k: (v.item() if isinstance(v, np.generic) else v) for k, v in asdict(pattern).items()}
@@ -0,0 +1,206 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from .pattern_index import PATTERN_KINDS
+
+
+# 每个(品种, 方法, order)任务输出的统计指标
+STAT_COLUMNS = ['count', 'avg', 'wr', 'total']
+
+# 工作进程最近使用的序列索引：(共享内存名, {'index': RangeIndex})
+# 任务按品种顺序排列，同一品种的不同order在同一个进程中共用索引
+_index_cache = (None, None)
+
+
+def pattern_returns(table: dict, data: np.array, hold_mult: float = 1.0) -> np.array:
+    """
+    向量化计算形态的持有期对数收益
+
+    持有期 = int(flag_width * hold_mult)，从确认点开始持有；熊市形态做空，收益取负；
+    持有期超出数据范围的形态收益为NaN。与原先逐个形态计算的结果一致。
+
+    参数:
+    table: dict - 形态表格（patterns_to_table的返回值）
+    data: np.array - 对数价格数组
+    hold_mult: float - 持有期乘数
+
+    返回:
+    np.array - 每个形态的收益
+    """
+    conf_x = np.asarray(table['conf_x'], dtype=np.int64)
+    hp = (np.asarray(table['flag_width']) * hold_mult).astype(np.int64)  # 与int()一样向零取整
+    exit_x = conf_x + hp
+    valid = exit_x < len(data)
+
+    ret = np.full(len(conf_x), np.nan)
+    ret[valid] = data[exit_x[valid]] - data[conf_x[valid]]
+    bear = np.isin(np.asarray(table['kind']), [PATTERN_KINDS.index('bear_flag'), PATTERN_KINDS.index('bear_pennant')])
+    ret[bear] = -ret[bear]
+    return ret
+
+
+def summarize_returns(kinds: np.array, returns: np.array) -> dict:
+    """
+    按形态类型汇总数量、平均收益、胜率和总收益
+
+    没有形态时：数量0、平均收益NaN、胜率NaN、总收益0（与原先的扫描脚本一致）
+    """
+    stats = {}
+    for k, name in enumerate(PATTERN_KINDS):
+        r = returns[kinds == k]
+        if len(r) > 0:
+            valid = r[~np.isnan(r)]
+            stats[name] = (len(r),
+                           valid.mean() if len(valid) else np.nan,
+                           (r > 0).sum() / len(r),
+                           valid.sum())
+        else:
+            stats[name] = (0, np.nan, np.nan, 0.0)
+    return stats
+
+
+def _scan_table(data: np.array, method: str, order: int, hold_mult: float, indexes: dict, kwargs: dict) -> dict:
+    """
+    运行一次识别，返回带'return'列的形态表格
+
+    indexes是同一序列的索引缓存（'index': RangeIndex），按需构建后留给同一序列的其他order使用
+    """
+    from .flag_pattern_algorithm_0328 import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                             patterns_to_table)
+    from .range_index import RangeIndex
+
+    if 'index' not in indexes:
+        indexes['index'] = RangeIndex(data)
+    if method == 'pips':
+        result = find_flags_pennants_pips(data, order, index=indexes['index'], **kwargs)
+    else:
+        result = find_flags_pennants_trendline(data, order, index=indexes['index'], **kwargs)
+    table = patterns_to_table(result)
+    table['return'] = pattern_returns(table, data, hold_mult)
+    return table
+
+
+def _run_task(task):
+    """
+    工作进程：通过共享内存读取价格数组，运行一次识别并汇总统计
+    """
+    from .range_index import RangeIndex
+    global _index_cache
+
+    shm_name, length, symbol, method, order, hold_mult, return_patterns, kwargs = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    data = None
+    try:
+        data = np.ndarray((length,), dtype=np.float64, buffer=shm.buf)
+        if _index_cache[0] != shm_name:
+            # 索引保存价格的副本，共享内存关闭后仍然有效
+            _index_cache = (shm_name, {'index': RangeIndex(data.copy())})
+        table = _scan_table(data, method, order, hold_mult, _index_cache[1], kwargs)
+    finally:
+        del data  # 先释放对共享内存的引用，才能关闭
+        shm.close()
+
+    stats = summarize_returns(table['kind'], table['return'])
+    return symbol, method, order, stats, table if return_patterns else None
+
+
+def run_order_sweep(series: dict, orders, methods=('pips',), hold_mult: float = 1.0,
+                    max_workers: int = None, return_patterns: bool = False, writer=None, **kwargs):
+    """
+    并行运行order参数扫描
+
+    每个(品种, 方法, order)是一个独立任务，分发到进程池执行。
+    价格数组只复制一次到共享内存(multiprocessing.shared_memory)，工作进程直接映射读取，
+    不需要为每个任务序列化一份价格数据。
+
+    参数:
+    series: dict - 品种代码 -> 对数价格数组
+    orders: list - 要测试的order参数
+    methods: tuple - 识别方法，'pips'和/或'trendline'
+    hold_mult: float - 持有期乘数
+    max_workers: int - 进程数，默认CPU核数；为1时在当前进程串行执行
+    return_patterns: bool - 是否同时返回每个任务的形态表格（含'return'列）
+    writer: ResultWriter - 结果写入器，每个任务完成后立即把形态表格写入'patterns'数据集，
+            不需要把所有表格保留在内存中
+    kwargs: 传给find_flags_pennants_*的其他参数（如max_pending）
+
+    返回:
+    results: pd.DataFrame - 以(symbol, method, order, pattern)为索引，列为count/avg/wr/total
+    patterns: dict - (symbol, method, order) -> 形态表格，仅当return_patterns=True时返回
+    """
+    import pandas as pd  # 工作进程只导入本模块的_run_task，不需要pandas，因此按需导入以加快进程启动
+
+    for method in methods:
+        if method not in ('pips', 'trendline'):
+            raise ValueError(f"未知的识别方法: {method}")
+
+    blocks = {}
+    try:
+        # 每个品种的价格数组复制一次到共享内存
+        for symbol, data in series.items():
+            data = np.ascontiguousarray(data, dtype=np.float64)
+            shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+            np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+            blocks[symbol] = (shm, len(data))
+
+        want_tables = return_patterns or writer is not None
+        tasks = [(blocks[symbol][0].name, blocks[symbol][1], symbol, method, order, hold_mult, want_tables, kwargs)
+                 for symbol in series for method in methods for order in orders]
+
+        # 汇总为一张整洁的数据框；任务结果按顺序逐个到达，到达后立即写出
+        rows, index = [], []
+        patterns = {}
+
+        def collect(output):
+            symbol, method, order, stats, table = output
+            for name in PATTERN_KINDS:
+                index.append((symbol, method, order, name))
+                rows.append(stats[name])
+            if writer is not None:
+                writer.write('patterns', table, symbol, method, order)
+            if return_patterns:
+                patterns[(symbol, method, order)] = table
+
+        if max_workers == 1:
+            for task in tasks:
+                collect(_run_task(task))
+        else:
+            if max_workers is None:
+                max_workers = min(os.cpu_count() or 1, len(tasks)) or 1
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                # chunksize减少进程间通信次数；任务耗时与order相关，不宜过大
+                for output in pool.map(_run_task, tasks, chunksize=max(1, len(tasks) // (max_workers * 8))):
+                    collect(output)
+    finally:
+        for shm, _ in blocks.values():
+            shm.close()
+            shm.unlink()
+
+    results = pd.DataFrame(rows, columns=STAT_COLUMNS,
+                           index=pd.MultiIndex.from_tuples(index, names=['symbol', 'method', 'order', 'pattern']))
+    results['count'] = results['count'].astype(np.int64)
+    if return_patterns:
+        return results, patterns
+    return results
+
+
+def to_wide(results: 'pd.DataFrame', symbol=None, method=None) -> 'pd.DataFrame':
+    """
+    把整洁格式的结果转换为原扫描脚本的宽表格式：以order为索引，
+    列为bull_flag_count、bull_flag_avg、bull_flag_wr、bull_flag_total等
+    """
+    df = results
+    if symbol is not None:
+        df = df.xs(symbol, level='symbol')
+    elif 'symbol' in df.index.names:
+        df = df.droplevel('symbol')
+    if method is not None:
+        df = df.xs(method, level='method')
+    elif 'method' in df.index.names:
+        df = df.droplevel('method')
+
+    wide = df.unstack('pattern')
+    wide.columns = [f'{pattern}_{stat}' for stat, pattern in wide.columns]
+    columns = [f'{pattern}_{stat}' for pattern in PATTERN_KINDS for stat in STAT_COLUMNS]
+    return wide[columns]
@@ -0,0 +1,198 @@
+import numpy as np
+from .pattern_index import PATTERN_KINDS, build_pattern_index
+from .resample import aggregate_ohlcv
+
+
+'''====================1.降采样==========================='''
+
+def bucket_bounds(n: int, n_buckets: int) -> np.array:
+    """
+    把[0, n)均匀划分为n_buckets个连续区间，返回每个区间的起点（长度为n_buckets）
+    """
+    n_buckets = max(1, min(n_buckets, n))
+    return np.unique(np.linspace(0, n, n_buckets + 1)[:-1].astype(np.int64))
+
+
+def ohlc_buckets(open_, high, low, close, n_buckets: int):
+    """
+    K线分桶聚合：每个桶的开盘价取第一根K线，收盘价取最后一根，最高/最低价取桶内极值
+
+    与抽样不同，聚合后每个桶的最高价和最低价保留了原始序列的所有极值，
+    缩小显示时不会漏掉旗杆顶点等尖峰。
+
+    参数:
+    open_, high, low, close: np.array - 原始K线数据
+    n_buckets: int - 桶的数量
+
+    返回:
+    starts: np.array - 每个桶第一根K线的索引
+    o, h, l, c: np.array - 聚合后的K线数据
+    """
+    starts = bucket_bounds(len(close), n_buckets)
+    out = aggregate_ohlcv(starts, open_, high, low, close)
+    return starts, out['open'], out['high'], out['low'], out['close']
+
+
+def lttb(y: np.array, n_out: int) -> np.array:
+    """
+    Largest-Triangle-Three-Buckets降采样，返回保留点的索引
+
+    首尾两点固定保留，中间的点分为n_out-2个桶，每个桶选出与"上一个保留点"和
+    "下一个桶的平均点"构成的三角形面积最大的点。折线的形状（包括局部极值）基本不变。
+
+    参数:
+    y: np.array - 原始序列（横坐标为索引）
+    n_out: int - 保留的点数
+
+    返回:
+    np.array - 保留点的索引（升序）
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # 中间n_out-2个桶的边界
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    a = 0
+    for k in range(n_out - 2):
+        lo, hi = bounds[k], bounds[k + 1]
+        # 下一个桶的平均点（最后一个桶用终点）
+        if k + 2 < len(bounds):
+            nlo, nhi = bounds[k + 1], bounds[k + 2]
+            avg_x, avg_y = (nlo + nhi - 1) / 2.0, y[nlo:nhi].mean()
+        else:
+            avg_x, avg_y = n - 1, y[n - 1]
+        xs = np.arange(lo, hi)
+        # 三角形面积（省略常数1/2）
+        area = np.abs((a - avg_x) * (y[lo:hi] - y[a]) - (a - xs) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[k + 1] = a
+    return keep
+
+
+'''====================2.概览图==========================='''
+
+def _overlay_arrays(patterns, dates):
+    """
+    把同一类形态的旗杆线、趋势线、关键点合并为以NaN分隔的数组（每类形态一条曲线）
+
+    分隔点的纵坐标为NaN，plotly在此处断开折线；分隔点的横坐标沿用前一个点的日期，
+    不需要额外的缺失日期表示。纵坐标使用float32，plotly以二进制编码写入HTML，体积减半。
+    """
+    base_x = np.array([p.base_x for p in patterns], dtype=np.int64)
+    tip_x = np.array([p.tip_x for p in patterns], dtype=np.int64)
+    conf_x = np.array([p.conf_x for p in patterns], dtype=np.int64)
+    base_y = np.array([p.base_y for p in patterns], dtype=float)
+    tip_y = np.array([p.tip_y for p in patterns], dtype=float)
+    conf_y = np.array([p.conf_y for p in patterns], dtype=float)
+    width = np.array([p.flag_width for p in patterns], dtype=float)
+    r0 = np.array([p.resist_intercept for p in patterns], dtype=float)
+    r1 = r0 + np.array([p.resist_slope for p in patterns], dtype=float) * width
+    s0 = np.array([p.support_intercept for p in patterns], dtype=float)
+    s1 = s0 + np.array([p.support_slope for p in patterns], dtype=float) * width
+    gap = np.full(len(patterns), np.nan)
+
+    def xs(*columns):
+        # 按形态交错排列，最后一列重复一次作为分隔点
+        return dates[np.column_stack(columns + (columns[-1],)).ravel()]
+
+    def ys(*columns):
+        return np.column_stack(columns + (gap,)).ravel().astype(np.float32)
+
+    return {
+        'pole': (xs(base_x, tip_x), ys(base_y, tip_y)),
+        # 阻力线和支撑线放在同一条曲线中，减少曲线数量
+        'trend': (np.concatenate([xs(tip_x, conf_x), xs(tip_x, conf_x)]),
+                  np.concatenate([ys(r0, r1), ys(s0, s1)])),
+        'points': (xs(base_x, tip_x, conf_x), ys(base_y, tip_y, conf_y)),
+    }
+
+
+def plot_overview(candle_data: 'pd.DataFrame', patterns_list, pattern_names=None, width_px: int = 1600,
+                  style: str = 'candle', start: int = None, end: int = None, index=None,
+                  title: str = '旗形与三角旗形态识别'):
+    """
+    绘制带形态标注的全历史概览图（plotly）
+
+    原先的plot_all_flags把每一根K线都写进go.Candlestick，HTML大小和浏览器渲染时间随序列长度线性增长。
+    屏幕上一个像素放不下多根K线，因此这里按屏幕宽度降采样：
+    - K线图：每个桶约占3个像素，用分桶聚合保留每个桶的最高/最低价
+    - 收盘价折线：每个像素最多一个点，用LTTB降采样保留折线形状
+    输出的数据量只与width_px有关，与序列长度无关。形态标注每种类型合并为少数几条曲线，
+    价格坐标使用float32，进一步压缩HTML。
+
+    需要查看细节时用start/end只绘制一个窗口：窗口内的K线数少于像素预算时不做降采样。
+
+    参数:
+    candle_data: pd.DataFrame - K线数据，包含Open/High/Low/Close列，索引为日期
+    patterns_list: list - [bull_flags, bear_flags, bull_pennants, bear_pennants]
+    pattern_names: list - 形态名称列表，默认使用PATTERN_KINDS
+    width_px: int - 图表宽度（像素），决定降采样后的数据量
+    style: str - 'candle'绘制K线，'line'只绘制收盘价
+    start, end: int - 只绘制[start, end)范围内的K线和与之重叠的形态，None表示全部；窗口为空时抛出ValueError
+    index: PatternIndex - 形态索引，为None时现场构建
+    title: str - 图表标题
+
+    返回:
+    go.Figure - plotly图表对象
+    """
+    import plotly.graph_objects as go  # plotly只在绘图时需要
+
+    if style not in ('candle', 'line'):
+        raise ValueError(f"未知的绘图类型: {style}")
+    if pattern_names is None:
+        pattern_names = PATTERN_KINDS
+    if index is None:
+        index = build_pattern_index(patterns_list)
+
+    n = len(candle_data)
+    start = 0 if start is None else max(start, 0)
+    end = n if end is None else min(end, n)
+    if start >= end:
+        raise ValueError(f"绘图窗口为空: start={start}, end={end}（共{n}根K线）")
+    dates = np.asarray(candle_data.index, dtype='datetime64[s]')
+    window = slice(start, end)
+
+    fig = go.Figure()
+    if style == 'candle':
+        starts, o, h, l, c = ohlc_buckets(candle_data['Open'].to_numpy()[window], candle_data['High'].to_numpy()[window],
+                                          candle_data['Low'].to_numpy()[window], candle_data['Close'].to_numpy()[window],
+                                          max(1, width_px // 3))
+        fig.add_trace(go.Candlestick(x=dates[window][starts], open=o.astype(np.float32), high=h.astype(np.float32),
+                                     low=l.astype(np.float32), close=c.astype(np.float32), name='K线'))
+    else:
+        close = candle_data['Close'].to_numpy()[window]
+        keep = lttb(close, width_px)
+        fig.add_trace(go.Scatter(x=dates[window][keep], y=close[keep].astype(np.float32), mode='lines',
+                                 name='收盘价', line=dict(color='black', width=1)))
+
+    # 只标注与绘制范围重叠的形态
+    rows = index.overlap(start, end - 1)
+    visible = set(zip(index.kinds[rows].tolist(), index.positions[rows].tolist()))
+
+    colors = ['red', 'green', 'blue', 'orange']
+    for k, (patterns, pattern_name, color) in enumerate(zip(patterns_list, pattern_names, colors)):
+        patterns = [p for pos, p in enumerate(patterns) if (k, pos) in visible]
+        if not patterns:
+            continue
+        overlay = _overlay_arrays(patterns, dates)
+        fig.add_trace(go.Scatter(x=overlay['pole'][0], y=overlay['pole'][1], mode='lines',
+                                 line=dict(color=color, width=2), name=f'{pattern_name}-旗杆'))
+        fig.add_trace(go.Scatter(x=overlay['trend'][0], y=overlay['trend'][1], mode='lines',
+                                 line=dict(color=color, dash='dash'), name=f'{pattern_name}-趋势线'))
+        fig.add_trace(go.Scatter(x=overlay['points'][0], y=overlay['points'][1], mode='markers',
+                                 marker=dict(size=8, color=color), name=f'{pattern_name}-关键点'))
+
+    fig.update_layout(
+        template='plotly',
+        xaxis_title='日期',
+        yaxis_title='价格',
+        showlegend=True,
+        width=width_px,
+        height=800,
+        title=title
+    )
+    fig.update_xaxes(rangeslider_visible=True)
+    return fig
@@ -0,0 +1,302 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, fields, replace
+import numpy as np
+from .important_point_algorithm import find_pips, rw_top, rw_bottom
+from .flag_pattern_algorithm_0328 import FlagPattern, FlagParams, DEFAULT_FLAG_PARAMS
+from .pattern_index import PATTERN_KINDS
+from .range_index import RangeIndex
+from .order_sweep import STAT_COLUMNS, pattern_returns, summarize_returns
+
+
+PARAM_NAMES = [f.name for f in fields(FlagParams)]
+
+# PIP方法至少需要5个点，旗帜宽度（切片长度-1）不能小于4
+_MIN_PIP_WIDTH = 4
+
+
+'''====================1.参数组合==========================='''
+
+def grid_params(base: FlagParams = None, **space) -> list:
+    """
+    网格搜索的参数组合：对给出的每个字段取笛卡尔积，其余字段沿用base
+
+    例如 grid_params(max_flag_width_ratio=[0.3, 0.5, 0.7], divergence_ratio=[0.5, 1.0, 2.0]) 得到9组参数
+    """
+    base = base if base is not None else DEFAULT_FLAG_PARAMS
+    names = list(space)
+    return [replace(base, **dict(zip(names, values))) for values in itertools.product(*space.values())]
+
+
+def random_params(n: int, seed=None, base: FlagParams = None, **space) -> list:
+    """
+    随机搜索的参数组合
+
+    space中每个字段的取值可以是(下限, 上限)元组（均匀分布；两端都是整数时取整数）或列表（从中等概率抽取）。
+
+    参数:
+    n: int - 组合数量
+    seed: int - 随机种子
+    base: FlagParams - 未给出的字段沿用的参数
+    """
+    base = base if base is not None else DEFAULT_FLAG_PARAMS
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, values in space.items():
+        if isinstance(values, tuple):
+            lo, hi = values
+            if isinstance(lo, int) and isinstance(hi, int):
+                columns[name] = rng.integers(lo, hi + 1, size=n).tolist()
+            else:
+                columns[name] = rng.uniform(lo, hi, size=n).tolist()
+        else:
+            columns[name] = [values[k] for k in rng.integers(0, len(values), size=n)]
+    return [replace(base, **{name: col[k] for name, col in columns.items()}) for k in range(n)]
+
+
+'''====================2.阈值无关部分的预计算==========================='''
+
+class ThresholdSearch:
+    """
+    PIP方法阈值参数的快速评估器
+
+    find_flags_pennants_pips每换一组阈值都要从头扫描。但在默认的候选池(max_pending=1)下，
+    每个候选形态的生命周期只由局部极值点决定：从它的极值点被确认的那根K线开始，
+    到同方向下一个极值点出现为止，期间第一根通过检查的K线就是确认点。
+    每个(候选, K线)组合的旗杆顶点、旗杆/旗帜宽度和高度、PIP点及其导出的趋势线都与阈值无关，
+    这里一次性算好，评估一组阈值只需要对这些数组做几次向量化比较，再取每个候选第一个通过的K线。
+
+    PIP点按距离度量分别缓存，只对满足最宽松宽度/高度条件的组合计算，之后评估更宽松的参数时按需补算。
+    对任意一组参数，patterns()的结果与find_flags_pennants_pips(data, order, params=params)完全一致。
+
+    参数:
+    data: np.array - 价格数据数组（通常是对数价格）
+    order: int - 滚动窗口大小参数
+    hold_mult: float - 计算收益时的持有期乘数
+    """
+
+    def __init__(self, data: np.array, order: int, hold_mult: float = 1.0):
+        assert(order >= 3)  # 与find_flags_pennants_pips一致
+        self.data = np.asarray(data, dtype=float)
+        self.order = order
+        self.hold_mult = hold_mult
+        self.index = RangeIndex(self.data)
+
+        n = len(self.data)
+        tops = [i for i in range(n) if rw_top(self.data, i, order)]
+        bottoms = [i for i in range(n) if rw_bottom(self.data, i, order)]
+        # 熊市候选从局部高点开始，牛市候选从局部低点开始
+        self.sides = {'bear': self._build_pairs(tops, bull=False), 'bull': self._build_pairs(bottoms, bull=True)}
+
+    def _build_pairs(self, detections: list, bull: bool) -> dict:
+        """
+        展开一个方向所有的(候选, K线)组合，并计算与阈值无关的旗杆/旗帜几何量
+        """
+        data, order = self.data, self.order
+        ends = detections[1:] + [len(data)]
+        cand, conf, tip = [], [], []
+        for k, (start, end) in enumerate(zip(detections, ends)):
+            base = start - order
+            seg = data[base:end]
+            # 旗杆顶点 = data[base:i+1]的argmax（熊市argmin），取第一次出现的位置，与ndarray.argmax一致
+            if bull:
+                new_ext = np.concatenate([[True], seg[1:] > np.maximum.accumulate(seg)[:-1]])
+            else:
+                new_ext = np.concatenate([[True], seg[1:] < np.minimum.accumulate(seg)[:-1]])
+            ext = np.maximum.accumulate(np.where(new_ext, np.arange(len(seg)), 0))
+            cand.append(np.full(end - start, k))
+            conf.append(np.arange(start, end))
+            tip.append(ext[order:] + base)
+
+        cand = np.concatenate(cand) if cand else np.zeros(0, dtype=np.int64)
+        conf = np.concatenate(conf) if conf else np.zeros(0, dtype=np.int64)
+        tip = np.concatenate(tip) if tip else np.zeros(0, dtype=np.int64)
+        base = np.asarray(detections, dtype=np.int64)[cand] - order
+
+        # 旗帜高度：旗杆顶点到确认点之间的最大回撤（熊市为最大反弹），所有组合一次批量查询
+        if bull:
+            flag_height = data[tip] - self.index.min_many(tip, conf + 1)
+        else:
+            flag_height = self.index.max_many(tip, conf + 1) - data[tip]
+
+        return {
+            'bull': bull,
+            'cand': cand, 'base_x': base, 'tip_x': tip, 'conf_x': conf,
+            'pole_width': tip - base, 'flag_width': conf - tip,
+            'pole_height': data[tip] - data[base] if bull else data[base] - data[tip],
+            'flag_height': flag_height,
+            'pips': {},  # 距离度量 -> PIP导出量
+        }
+
+    def _pip_features(self, side: dict, dist: int, rows: np.array) -> dict:
+        """
+        计算（或从缓存中取出）指定组合的PIP点导出量：形状是否成立、趋势线、交点、是否突破、是否三角旗
+        """
+        cache = side['pips'].get(dist)
+        if cache is None:
+            m = len(side['conf_x'])
+            cache = {'done': np.zeros(m, dtype=bool), 'shape_ok': np.zeros(m, dtype=bool),
+                     'broke': np.zeros(m, dtype=bool), 'pennant': np.zeros(m, dtype=bool),
+                     'intersection': np.zeros(m),
+                     'support_slope': np.zeros(m), 'support_intercept': np.zeros(m),
+                     'resist_slope': np.zeros(m), 'resist_intercept': np.zeros(m)}
+            side['pips'][dist] = cache
+
+        data, bull = self.data, side['bull']
+        for r in rows[~cache['done'][rows]]:
+            fw = side['flag_width'][r]
+            px, py = find_pips(data[side['tip_x'][r]:side['conf_x'][r] + 1], 5, dist)
+            # 与check_*_pattern_pips相同的公式：牛市的阻力线连接第1、3个点，熊市的支撑线连接第1、3个点
+            first_slope = (py[2] - py[0]) / (px[2] - px[0])
+            second_slope = (py[3] - py[1]) / (px[3] - px[1])
+            second_intercept = py[1] + (px[0] - px[1]) * second_slope
+            if bull:
+                resist_slope, resist_intercept = first_slope, py[0]
+                support_slope, support_intercept = second_slope, second_intercept
+                cache['shape_ok'][r] = py[2] > py[1] and py[2] > py[3]
+                cache['broke'][r] = not py[4] < py[0] + resist_slope * px[4]
+                cache['pennant'][r] = support_slope > 0
+            else:
+                support_slope, support_intercept = first_slope, py[0]
+                resist_slope, resist_intercept = second_slope, second_intercept
+                cache['shape_ok'][r] = py[2] < py[1] and py[2] < py[3]
+                cache['broke'][r] = not py[4] > py[0] + support_slope * px[4]
+                cache['pennant'][r] = resist_slope < 0
+            if resist_slope != support_slope:
+                cache['intersection'][r] = (support_intercept - resist_intercept) / (resist_slope - support_slope)
+            else:
+                cache['intersection'][r] = -fw * 100
+            cache['support_slope'][r], cache['support_intercept'][r] = support_slope, support_intercept
+            cache['resist_slope'][r], cache['resist_intercept'][r] = resist_slope, resist_intercept
+            cache['done'][r] = True
+        return cache
+
+    def _geometry_mask(self, side: dict, params: FlagParams) -> np.array:
+        """宽度/高度条件（不需要PIP点）"""
+        min_width = max(params.min_flag_width, self.order * params.min_flag_width_order)
+        if min_width < _MIN_PIP_WIDTH:
+            raise ValueError(f"旗帜最小宽度至少为{_MIN_PIP_WIDTH}（PIP方法需要5个点）: {min_width}")
+        fw = side['flag_width']
+        return ((fw >= min_width) & (fw <= side['pole_width'] * params.max_flag_width_ratio)
+                & (side['flag_height'] <= side['pole_height'] * params.max_flag_height_ratio))
+
+    def prepare(self, params_list):
+        """
+        预先计算一批参数需要的全部PIP点（按距离度量取最宽松的宽度/高度条件的并集），
+        之后逐个评估时不再调用find_pips
+        """
+        by_dist = {}
+        for params in params_list:
+            by_dist.setdefault(params.pip_distance, []).append(params)
+        for dist, group in by_dist.items():
+            for side in self.sides.values():
+                mask = np.zeros(len(side['conf_x']), dtype=bool)
+                for params in group:
+                    mask |= self._geometry_mask(side, params)
+                self._pip_features(side, dist, np.flatnonzero(mask))
+
+    def _confirmed(self, side: dict, params: FlagParams):
+        """一个方向在给定参数下确认的组合（每个候选第一根通过检查的K线）"""
+        rows = np.flatnonzero(self._geometry_mask(side, params))
+        pips = self._pip_features(side, params.pip_distance, rows)
+        fw = side['flag_width'][rows]
+        inter = pips['intersection'][rows]
+        ok = (pips['shape_ok'][rows] & pips['broke'][rows]
+              & ~((inter <= fw) & (inter >= 0))                                   # 交点在旗帜区域内
+              & ~((inter < 0) & (inter > -1.0 * fw * params.divergence_ratio)))  # 严重发散
+        rows = rows[ok]
+        # 组合按(候选, K线)排序，每个候选只保留第一个
+        _, first = np.unique(side['cand'][rows], return_index=True)
+        return rows[first], pips
+
+    def patterns(self, params: FlagParams = None) -> dict:
+        """
+        给定参数下识别出的形态表格，与patterns_to_table(find_flags_pennants_pips(data, order, params=params))一致
+        """
+        params = params if params is not None else DEFAULT_FLAG_PARAMS
+        parts = []
+        for side in (self.sides['bull'], self.sides['bear']):
+            rows, pips = self._confirmed(side, params)
+            pennant = pips['pennant'][rows]
+            flag_kind, pennant_kind = (0, 2) if side['bull'] else (1, 3)
+            part = {
+                'kind': np.where(pennant, pennant_kind, flag_kind).astype(np.int8),
+                'base_x': side['base_x'][rows], 'base_y': self.data[side['base_x'][rows]],
+                'tip_x': side['tip_x'][rows], 'tip_y': self.data[side['tip_x'][rows]],
+                'conf_x': side['conf_x'][rows], 'conf_y': self.data[side['conf_x'][rows]],
+                'pennant': pennant,
+                'flag_width': side['flag_width'][rows], 'flag_height': side['flag_height'][rows],
+                'pole_width': side['pole_width'][rows], 'pole_height': side['pole_height'][rows],
+            }
+            for name in ('support_intercept', 'support_slope', 'resist_intercept', 'resist_slope'):
+                part[name] = pips[name][rows]
+            parts.append(part)
+
+        # 与patterns_to_table相同的行顺序：按形态类型，类型内按确认顺序
+        table = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        order = np.lexsort((table['conf_x'], table['kind']))
+        table = {name: col[order] for name, col in table.items()}
+        return {name: table[name] for name in ['kind'] + [f.name for f in fields(FlagPattern)]}
+
+    def evaluate(self, params: FlagParams = None) -> dict:
+        """
+        给定参数下每种形态的统计：形态类型 -> (数量, 平均收益, 胜率, 总收益)，口径与run_order_sweep一致
+        """
+        table = self.patterns(params)
+        return summarize_returns(table['kind'], pattern_returns(table, self.data, self.hold_mult))
+
+
+'''====================3.搜索==========================='''
+
+def _search_task(task):
+    """工作进程：一个(品种, order)上评估所有参数组合"""
+    symbol, data, order, hold_mult, params_list = task
+    search = ThresholdSearch(data, order, hold_mult)
+    search.prepare(params_list)
+    return symbol, order, [search.evaluate(params) for params in params_list]
+
+
+def run_param_search(series: dict, orders, params_list, hold_mult: float = 1.0,
+                     max_workers: int = None) -> 'pd.DataFrame':
+    """
+    阈值参数的网格/随机搜索（PIP方法，默认候选池）
+
+    每个(品种, order)是一个独立任务：阈值无关的部分（极值点、旗杆顶点、PIP点）只计算一次，
+    之后每组参数只做向量化的过滤和汇总，几百组参数的耗时与一次普通扫描相当。
+
+    参数:
+    series: dict - 品种代码 -> 对数价格数组
+    orders: list - 要测试的order参数
+    params_list: list - FlagParams列表，通常由grid_params或random_params生成
+    hold_mult: float - 持有期乘数
+    max_workers: int - 进程数，默认CPU核数；为1时在当前进程串行执行
+
+    返回:
+    pd.DataFrame - 以(symbol, order, combo, pattern)为索引，列为各参数字段和count/avg/wr/total，
+                   combo是参数组合在params_list中的序号
+    """
+    import pandas as pd  # 只有汇总时才需要pandas
+
+    params_list = list(params_list)
+    tasks = [(symbol, np.asarray(data, dtype=float), order, hold_mult, params_list)
+             for symbol, data in series.items() for order in orders]
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(tasks)) or 1
+    if max_workers <= 1:
+        outputs = [_search_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs = list(pool.map(_search_task, tasks))
+
+    param_rows = [asdict(params) for params in params_list]
+    rows, index = [], []
+    for symbol, order, stats_list in outputs:
+        for combo, stats in enumerate(stats_list):
+            for name in PATTERN_KINDS:
+                index.append((symbol, order, combo, name))
+                rows.append([param_rows[combo][p] for p in PARAM_NAMES] + list(stats[name]))
+    results = pd.DataFrame(rows, columns=PARAM_NAMES + STAT_COLUMNS,
+                           index=pd.MultiIndex.from_tuples(index, names=['symbol', 'order', 'combo', 'pattern']))
+    results['count'] = results['count'].astype(np.int64)
+    return results
@@ -0,0 +1,191 @@
+import numpy as np
+
+
+# pattern_features返回的特征列
+FEATURE_COLUMNS = [
+    'direction',          # 1为牛市、-1为熊市
+    'width_ratio',        # flag_width / pole_width
+    'height_ratio',       # flag_height / pole_height（旗帜回撤占旗杆的比例）
+    'pole_slope',         # 旗杆每根K线的幅度 pole_height / pole_width
+    'breakout_slope',     # 突破线斜率：牛市阻力线、熊市支撑线
+    'counter_slope',      # 另一条边界线的斜率：牛市支撑线、熊市阻力线
+    'breakout_slope_norm',  # 突破线斜率 × 方向 / 旗杆斜率，负值表示旗帜逆着旗杆方向整理
+    'counter_slope_norm',   # 另一条线斜率 × 方向 / 旗杆斜率
+    'channel_start',      # 旗帜起点（tip_x）处两条线的距离 / pole_height
+    'channel_end',        # 确认点处两条线的距离 / pole_height
+    'convergence',        # channel_end / channel_start，小于1表示收敛
+    'pole_atr',           # 旗杆高度 / 确认点的ATR
+    'breakout_atr',       # 确认价越过突破线的幅度（按方向） / 确认点的ATR
+    'volume_ratio',       # 确认K线成交量 / 之前volume_window根K线的平均成交量
+]
+
+# 默认质量评分权重：浅回撤、短旗帜、强旗杆、有力的放量突破得分高
+DEFAULT_QUALITY_WEIGHTS = {
+    'height_ratio': -1.0,
+    'width_ratio': -0.5,
+    'pole_atr': 1.0,
+    'breakout_atr': 1.0,
+    'volume_ratio': 0.5,
+}
+
+
+'''====================1.平均真实波幅==========================='''
+
+def average_true_range(close: np.array, high: np.array = None, low: np.array = None, window: int = 14) -> np.array:
+    """
+    平均真实波幅（ATR，真实波幅的简单移动平均）
+
+    真实波幅 = max(high, 前收盘) - min(low, 前收盘)；没有high/low时退化为收盘价变动的绝对值。
+
+    参数:
+    close, high, low: np.array - 价格数组（与识别时使用的价格一致，通常是对数价格）
+    window: int - 平均的K线数
+
+    返回:
+    np.array - 与close等长，第i个值只用到第i根K线及之前的数据，前window - 1个值为NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    prev = np.concatenate([close[:1], close[:-1]])
+    if high is None or low is None:
+        tr = np.abs(close - prev)
+    else:
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        tr = np.maximum(high, prev) - np.minimum(low, prev)
+    out = np.full(len(close), np.nan)
+    if len(close) >= window:
+        csum = np.concatenate([[0.0], np.cumsum(tr)])
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+'''====================2.特征矩阵==========================='''
+
+def pattern_features(table: dict, close: np.array, high: np.array = None, low: np.array = None,
+                     volume: np.array = None, atr_window: int = 14, volume_window: int = 20,
+                     method: str = 'pips') -> dict:
+    """
+    一次计算所有形态的标准特征（每个特征一列，全部是数组运算）
+
+    以前各处根据FlagPattern字段手工计算比例和斜率，slope列在牛市取resist_slope、在熊市取support_slope，
+    含义不统一。这里统一定义为breakout_slope（突破的那条线）和counter_slope（另一条线），
+    并按方向和旗杆斜率归一化，牛熊两种形态可以直接比较。
+
+    两条趋势线都以tip_x为原点（x = 0），确认点的x与识别时比较突破价的位置相同：
+    PIP方法为conf_x - tip_x（即flag_width，最后一个PIP点）；趋势线方法为flag_width + 1
+    （check_*_pattern_trendline拟合data[tip_x:conf_x]后，在x = flag_width + 1处计算确认价）。
+    形态表格中没有方法列，需要用method指明，否则趋势线形态的突破幅度和channel_end会差一根K线的斜率。
+    突破幅度和旗杆高度除以确认点的ATR，消除不同品种、不同时期波动率的差别。
+
+    参数:
+    table: dict - 形态表格（patterns_to_table或find_shapes_pips的返回值），kind为偶数的是牛市形态
+    close, high, low: np.array - 识别时使用的价格数组（通常是对数价格），high/low缺省时ATR用收盘价变动计算
+    volume: np.array - 成交量（例如get_stock_data返回的Volume列），None时volume_ratio为NaN
+    atr_window: int - ATR的平均窗口
+    volume_window: int - 平均成交量的回看窗口（不含确认K线）
+    method: str - 表格的识别方法，'pips'（包括find_shapes_pips）或'trendline'，决定确认点的x
+
+    返回:
+    dict - 列见FEATURE_COLUMNS，与表格逐行对应；无法计算的值（窗口不足、分母为0）为NaN
+    """
+    if method not in ('pips', 'trendline'):
+        raise ValueError(f"未知的识别方法: {method}")
+    t = {name: np.asarray(col) for name, col in table.items()}
+    direction = np.where(t['kind'] % 2 == 0, 1.0, -1.0)  # PATTERN_KINDS和SHAPE_KINDS中偶数下标是牛市
+    bull = direction > 0
+    pole_width = t['pole_width'].astype(np.float64)
+    pole_height = t['pole_height'].astype(np.float64)
+    flag_width = t['flag_width'].astype(np.float64)
+    conf_x = t['conf_x'].astype(np.int64)
+    tip_x = t['tip_x'].astype(np.int64)
+
+    breakout_b = np.where(bull, t['resist_intercept'], t['support_intercept'])
+    breakout_k = np.where(bull, t['resist_slope'], t['support_slope'])
+    counter_k = np.where(bull, t['support_slope'], t['resist_slope'])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pole_slope = pole_height / pole_width
+        x_conf = (conf_x - tip_x).astype(np.float64)
+        if method == 'trendline':
+            x_conf = x_conf + 1.0
+        channel_start = (t['resist_intercept'] - t['support_intercept']) / pole_height
+        channel_end = ((t['resist_intercept'] + t['resist_slope'] * x_conf)
+                       - (t['support_intercept'] + t['support_slope'] * x_conf)) / pole_height
+
+        atr = average_true_range(close, high, low, atr_window)[conf_x] if len(conf_x) else np.zeros(0)
+        breakout_level = breakout_b + breakout_k * x_conf
+        close = np.asarray(close, dtype=np.float64)
+
+        if volume is not None and len(conf_x):
+            volume = np.asarray(volume, dtype=np.float64)
+            csum = np.concatenate([[0.0], np.cumsum(volume)])
+            start = conf_x - volume_window
+            prior = np.where(start >= 0, (csum[conf_x] - csum[np.maximum(start, 0)]) / volume_window, np.nan)
+            volume_ratio = volume[conf_x] / prior
+        else:
+            volume_ratio = np.full(len(conf_x), np.nan)
+
+        features = {
+            'direction': direction,
+            'width_ratio': flag_width / pole_width,
+            'height_ratio': t['flag_height'] / pole_height,
+            'pole_slope': pole_slope,
+            'breakout_slope': breakout_k.astype(np.float64),
+            'counter_slope': counter_k.astype(np.float64),
+            'breakout_slope_norm': direction * breakout_k / pole_slope,
+            'counter_slope_norm': direction * counter_k / pole_slope,
+            'channel_start': channel_start,
+            'channel_end': channel_end,
+            'convergence': channel_end / channel_start,
+            'pole_atr': pole_height / atr,
+            'breakout_atr': direction * (close[conf_x] - breakout_level) / atr,
+            'volume_ratio': volume_ratio,
+        }
+    # 分母为0得到的±inf按无法计算处理
+    return {name: np.where(np.isfinite(col), col, np.nan) for name, col in features.items()}
+
+
+def feature_matrix(features: dict, columns=None) -> np.array:
+    """
+    把特征字典排成(形态数, 特征数)的矩阵，列顺序为columns（默认FEATURE_COLUMNS）
+    """
+    columns = FEATURE_COLUMNS if columns is None else columns
+    n = len(features['direction'])
+    return np.column_stack([np.asarray(features[name], dtype=np.float64) for name in columns]).reshape(n, len(columns))
+
+
+'''====================3.质量评分==========================='''
+
+def quality_score(features: dict, weights: dict = None, standardize: bool = True) -> np.array:
+    """
+    形态质量评分：各特征的加权和
+
+    standardize=True时每个特征先在这批形态中标准化（减均值、除以标准差），权重可以直接比较；
+    缺失值（NaN）按均值处理，不加分也不扣分。评分可以作为一列加入形态表格，
+    例如portfolio.events_from_table({**table, 'quality': score}, score='quality')按评分挑选信号。
+
+    参数:
+    features: dict - pattern_features的返回值
+    weights: dict - 特征名 -> 权重，默认DEFAULT_QUALITY_WEIGHTS；负权重表示特征越小越好
+    standardize: bool - 是否先标准化；为False时直接对原始特征加权
+
+    返回:
+    np.array - 每个形态的评分，越大越好
+    """
+    weights = DEFAULT_QUALITY_WEIGHTS if weights is None else weights
+    unknown = set(weights) - set(features)
+    if unknown:
+        raise KeyError(f"未知的特征: {', '.join(sorted(unknown))}")
+    n = len(features['direction'])
+    score = np.zeros(n)
+    for name, weight in weights.items():
+        col = np.asarray(features[name], dtype=np.float64)
+        if standardize:
+            valid = ~np.isnan(col)
+            if valid.sum() >= 2:
+                mean, std = col[valid].mean(), col[valid].std()
+                col = (col - mean) / std if std > 0 else col - mean
+            else:
+                col = np.zeros(n)
+        score += weight * np.nan_to_num(col, nan=0.0)
+    return score
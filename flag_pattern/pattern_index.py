@@ -0,0 +1,215 @@
+import bisect
+import numpy as np
+
+
+# 形态类型，顺序与find_flags_pennants_*的返回值一致
+PATTERN_KINDS = ['bull_flag', 'bear_flag', 'bull_pennant', 'bear_pennant']
+
+
+class _CenteredTree:
+    """
+    单个品种的中心区间树（静态构建，只读查询）
+
+    每个节点选取一个中心点center，跨过center的区间存放在该节点，
+    分别按起点升序和终点降序保存；完全在center左边/右边的区间递归放入左右子树。
+    树高为O(log n)，点查询在每个节点只扫描命中的区间，总复杂度O(log n + k)。
+    """
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, starts: np.array, ends: np.array, rows: np.array):
+        # 以所有端点的中位数作为中心点，保证左右子树规模大致平衡
+        self.center = float(np.median(np.concatenate([starts, ends])))
+
+        here = (starts <= self.center) & (ends >= self.center)  # 跨过中心点的区间
+        lo = ends < self.center                                 # 完全在中心点左侧
+        hi = starts > self.center                               # 完全在中心点右侧
+
+        s, e, r = starts[here], ends[here], rows[here]
+        by_start = np.argsort(s, kind='stable')
+        by_end = np.argsort(-e, kind='stable')
+        self.by_start = (s[by_start], r[by_start])
+        self.by_end = (e[by_end], r[by_end])
+
+        self.left = _CenteredTree(starts[lo], ends[lo], rows[lo]) if lo.any() else None
+        self.right = _CenteredTree(starts[hi], ends[hi], rows[hi]) if hi.any() else None
+
+    def stab(self, q: float, out: list):
+        node = self
+        while node is not None:
+            if q < node.center:
+                # 区间都跨过center，只需检查起点是否 <= q
+                s, r = node.by_start
+                out.extend(r[:np.searchsorted(s, q, side='right')])
+                node = node.left
+            elif q > node.center:
+                # 只需检查终点是否 >= q（终点降序保存）
+                e, r = node.by_end
+                out.extend(r[:np.searchsorted(-e, -q, side='right')])
+                node = node.right
+            else:
+                out.extend(node.by_start[1])
+                return
+
+
+class PatternIndex:
+    """
+    形态时间跨度索引
+
+    把所有形态的[base_x, conf_x]区间连同品种、形态类型一起建立索引，
+    用于回答"某一天有哪些旗形处于活跃状态"、"哪些形态与这个时间窗口重叠"之类的问题，
+    不再需要对四个形态列表做线性扫描。
+
+    每个品种单独构建一棵中心区间树：
+    - 点查询（stab）: O(log n + k)
+    - 区间重叠查询（overlap）: 与起点重合的点查询 + 起点有序数组上的二分，O(log n + k)
+
+    参数:
+    symbols: np.array - 每个形态所属的品种
+    kinds: np.array - 形态类型编码，对应PATTERN_KINDS的下标
+    starts: np.array - 形态起点索引（base_x）
+    ends: np.array - 形态确认点索引（conf_x）
+    positions: np.array - 形态在原始同类列表中的位置，便于取回FlagPattern对象
+    """
+
+    def __init__(self, symbols, kinds, starts, ends, positions):
+        self.symbols = np.asarray(symbols, dtype=str)
+        self.kinds = np.asarray(kinds, dtype=np.int8)
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.positions = np.asarray(positions, dtype=np.int64)
+
+        # 按品种分组构建区间树和起点有序数组
+        self._trees = {}
+        self._sorted = {}
+        for symbol in np.unique(self.symbols):
+            rows = np.flatnonzero(self.symbols == symbol)
+            self._trees[symbol] = _CenteredTree(self.starts[rows], self.ends[rows], rows)
+            order = np.argsort(self.starts[rows], kind='stable')
+            self._sorted[symbol] = (self.starts[rows][order], rows[order])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _select(self, rows: list, kind):
+        rows = np.array(sorted(rows), dtype=np.int64)
+        if kind is not None and len(rows):
+            rows = rows[self.kinds[rows] == PATTERN_KINDS.index(kind)]
+        return rows
+
+    def _targets(self, symbol):
+        return self._trees.keys() if symbol is None else [symbol] if symbol in self._trees else []
+
+    def stab(self, x: int, symbol=None, kind=None) -> np.array:
+        """
+        点查询：返回在索引x处处于活跃状态（base_x <= x <= conf_x）的形态行号
+
+        参数:
+        x: int - K线索引
+        symbol: str - 只查询指定品种，None表示所有品种
+        kind: str - 只返回指定类型（PATTERN_KINDS之一），None表示所有类型
+        """
+        rows = []
+        for s in self._targets(symbol):
+            self._trees[s].stab(x, rows)
+        return self._select(rows, kind)
+
+    def overlap(self, lo: int, hi: int, symbol=None, kind=None) -> np.array:
+        """
+        区间查询：返回与[lo, hi]有重叠的形态行号
+
+        与[lo, hi]重叠的区间可以分成不相交的两部分：
+        1. 起点 <= lo 且跨过lo的区间 —— 即lo处的点查询
+        2. 起点落在(lo, hi]内的区间 —— 起点有序数组上的二分
+        """
+        rows = []
+        for s in self._targets(symbol):
+            tree_rows = []
+            self._trees[s].stab(lo, tree_rows)
+            rows.extend(tree_rows)
+            sorted_starts, sorted_rows = self._sorted[s]
+            a = bisect.bisect_right(sorted_starts, lo)
+            b = bisect.bisect_right(sorted_starts, hi)
+            rows.extend(sorted_rows[a:b])
+        return self._select(rows, kind)
+
+    def span(self, symbol=None):
+        """
+        返回所有形态的最早起点和最晚确认点，没有形态时返回None
+        """
+        mask = np.ones(len(self), dtype=bool) if symbol is None else self.symbols == symbol
+        if not mask.any():
+            return None
+        return int(self.starts[mask].min()), int(self.ends[mask].max())
+
+    def lookup(self, rows, patterns_list):
+        """
+        根据行号取回原始形态对象
+
+        参数:
+        rows: np.array - stab/overlap返回的行号
+        patterns_list: list/dict - 与构建索引时相同的[bull_flags, bear_flags, bull_pennants, bear_pennants]；
+                       合并了多个品种的索引（merge_pattern_indexes）需要传入 品种代码 -> 四个形态列表 的字典，
+                       positions只在各自品种的列表中有意义
+        """
+        if isinstance(patterns_list, dict):
+            return [patterns_list[self.symbols[r]][self.kinds[r]][self.positions[r]] for r in rows]
+        if len(rows) and len(np.unique(self.symbols[np.asarray(rows)])) > 1:
+            raise ValueError("行号属于多个品种，请传入 品种代码 -> 形态列表 的字典")
+        return [patterns_list[self.kinds[r]][self.positions[r]] for r in rows]
+
+    def save(self, path: str):
+        """保存为.npz文件，与扫描结果放在一起"""
+        np.savez(path, symbols=self.symbols, kinds=self.kinds, starts=self.starts,
+                 ends=self.ends, positions=self.positions)
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as z:
+            return cls(z['symbols'], z['kinds'], z['starts'], z['ends'], z['positions'])
+
+
+def build_pattern_index(patterns_list, symbol: str = ''):
+    """
+    从一次扫描的结果构建形态索引
+
+    参数:
+    patterns_list: list - [bull_flags, bear_flags, bull_pennants, bear_pennants]
+    symbol: str - 品种代码
+
+    返回:
+    PatternIndex - 形态索引
+    """
+    kinds, starts, ends, positions = [], [], [], []
+    for kind, patterns in enumerate(patterns_list):
+        for pos, pattern in enumerate(patterns):
+            kinds.append(kind)
+            starts.append(pattern.base_x)
+            ends.append(pattern.conf_x)
+            positions.append(pos)
+    return PatternIndex([symbol] * len(starts), kinds, starts, ends, positions)
+
+
+def merge_pattern_indexes(indexes):
+    """
+    合并多个品种的形态索引（例如全市场扫描后汇总）
+    """
+    indexes = list(indexes)
+    if not indexes:
+        return PatternIndex([], [], [], [], [])
+    return PatternIndex(np.concatenate([ix.symbols for ix in indexes]),
+                        np.concatenate([ix.kinds for ix in indexes]),
+                        np.concatenate([ix.starts for ix in indexes]),
+                        np.concatenate([ix.ends for ix in indexes]),
+                        np.concatenate([ix.positions for ix in indexes]))
+
+
+def date_to_bar(dates: np.array, date) -> int:
+    """
+    把日期转换为K线索引（不晚于该日期的最后一根K线），用于按日期查询
+
+    参数:
+    dates: np.array - K线日期数组（升序）
+    date: 日期
+    """
+    return int(np.searchsorted(np.asarray(dates), np.datetime64(date), side='right')) - 1
@@ -0,0 +1,184 @@
+import heapq
+from collections import deque
+import numpy as np
+
+
+'''====================1.待确认形态池==========================='''
+
+class PendingPool:
+    """
+    有容量上限的待确认形态池
+
+    原先的扫描函数对每个方向只保留一个pending_bull/pending_bear，新的局部极值点一出现就把旧的候选覆盖掉。
+    这个池子可以同时保留多个候选形态，超过容量时按优先级淘汰优先级最低的那个，因此内存占用是有界的。
+
+    参数:
+    capacity: int - 池子容量，capacity=1时行为与原先的"新候选覆盖旧候选"完全一致
+    priority: callable - 计算候选优先级的函数，数值越大越优先保留；默认按起点索引base_x（越新越优先）
+    """
+
+    __slots__ = ('capacity', 'priority', '_heap', '_seq')
+
+    def __init__(self, capacity: int = 1, priority=None):
+        assert(capacity >= 1)  # 池子至少要能放下一个候选
+        self.capacity = capacity
+        self.priority = priority if priority is not None else recency_priority
+        self._heap = []  # 小顶堆，元素为(优先级, 插入序号, 形态)，堆顶是最先被淘汰的候选
+        self._seq = 0    # 插入序号，优先级相同时先插入的先淘汰
+
+    def push(self, pattern):
+        """
+        加入一个新候选，返回被淘汰的候选（没有淘汰则返回None）
+        """
+        item = (self.priority(pattern), self._seq, pattern)
+        self._seq += 1
+
+        if len(self._heap) < self.capacity:
+            heapq.heappush(self._heap, item)
+            return None
+
+        # 池子已满：新候选与堆顶比较，淘汰两者中优先级较低的那个
+        if item[:2] < self._heap[0][:2]:
+            return pattern
+        return heapq.heapreplace(self._heap, item)[2]
+
+    def remove(self, patterns):
+        """
+        移除已经确认（或不再需要）的候选
+        """
+        if not patterns:
+            return
+        drop = set(id(p) for p in patterns)
+        self._heap = [item for item in self._heap if id(item[2]) not in drop]
+        heapq.heapify(self._heap)
+
+    def expire(self, min_base: int):
+        """
+        移除起点早于min_base的候选（形态跨度上限，见find_flags_pennants_*的max_span参数）
+        """
+        if any(item[2].base_x < min_base for item in self._heap):
+            self._heap = [item for item in self._heap if item[2].base_x >= min_base]
+            heapq.heapify(self._heap)
+
+    def reprioritize(self):
+        """
+        重新计算所有候选的优先级（候选的坐标整体平移后调用，例如增量扫描丢弃历史数据时）
+        """
+        self._heap = [(self.priority(item[2]), item[1], item[2]) for item in self._heap]
+        heapq.heapify(self._heap)
+
+    def clear(self):
+        self._heap = []
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __iter__(self):
+        # 按插入顺序遍历，保证同一根K线上多个候选同时确认时输出顺序稳定
+        return iter([item[2] for item in sorted(self._heap, key=lambda item: item[1])])
+
+
+def recency_priority(pattern) -> float:
+    """默认优先级：起点越新越优先"""
+    return pattern.base_x
+
+
+def pole_priority(bullish: bool):
+    """
+    按旗杆起点的极端程度排序的优先级函数：牛市候选起点越低越优先，熊市候选起点越高越优先
+
+    两个方向需要不同的函数，传给识别函数时分别作为bull_priority和bear_priority：
+    find_flags_pennants_pips(data, order, 3, bull_priority=pole_priority(True), bear_priority=pole_priority(False))
+
+    参数:
+    bullish: bool - True表示用于牛市池，False表示用于熊市池
+    """
+    if bullish:
+        return lambda pattern: -pattern.base_y
+    return lambda pattern: pattern.base_y
+
+
+'''====================2.重叠形态去重==========================='''
+
+def pattern_direction(pattern) -> int:
+    """
+    返回形态方向：1表示牛市（旗杆向上），-1表示熊市（旗杆向下）
+    """
+    return 1 if pattern.tip_y > pattern.base_y else -1
+
+
+def dedup_patterns(patterns, tol: int = 2):
+    """
+    合并起点、旗杆顶点、确认点都在容差范围内的近似重复形态
+
+    典型场景是order参数扫描：相邻order往往会重复识别出几乎相同的形态。
+    做法是先按(方向, 形态类型, conf_x, base_x, tip_x)排序（O(k log k)），
+    再按确认点顺序扫描，把(base_x, tip_x)量化到边长为tol+1的网格中，
+    只与相邻网格内、确认点仍在容差内的代表形态比较，每个形态的比较次数是常数级。
+
+    参数:
+    patterns: list - 形态列表（可以混合不同方向、不同order的结果）
+    tol: int - 三个关键点索引允许的最大偏差（K线根数）
+
+    返回:
+    kept: list - 去重后的形态列表，按确认点排序
+    counts: np.array - 每个保留形态合并掉的形态数量（包括它自己）
+    """
+    assert(tol >= 0)
+    if len(patterns) == 0:
+        return [], np.zeros(0, dtype=np.int64)
+
+    # 排序键：方向和类型不同的形态不会被合并
+    order_idx = sorted(range(len(patterns)), key=lambda k: (
+        pattern_direction(patterns[k]), patterns[k].pennant,
+        patterns[k].conf_x, patterns[k].base_x, patterns[k].tip_x))
+
+    cell = tol + 1  # 网格边长，保证容差范围内的两个点最多相差一个网格
+    kept = []
+    anchors = []     # 代表形态的原始关键点(conf_x, base_x, tip_x)，合并替换代表后仍按原始位置匹配
+    counts = []
+    grid = {}        # (base格, tip格) -> 代表形态在kept中的下标队列（按确认点升序）
+    group = None     # 当前(方向, 类型)分组
+
+    for k in order_idx:
+        p = patterns[k]
+        key = (pattern_direction(p), p.pennant)
+        if key != group:
+            # 进入新的分组，清空网格
+            group = key
+            grid = {}
+
+        cb, ct = p.base_x // cell, p.tip_x // cell
+        match = -1
+        for db in (-1, 0, 1):
+            for dt in (-1, 0, 1):
+                reps = grid.get((cb + db, ct + dt))
+                if not reps:
+                    continue
+                # 确认点按升序到达，已经超出容差的代表形态可以直接丢弃
+                while reps and p.conf_x - anchors[reps[0]][0] > tol:
+                    reps.popleft()
+                for r in reps:
+                    _, base_x, tip_x = anchors[r]
+                    if abs(base_x - p.base_x) <= tol and abs(tip_x - p.tip_x) <= tol:
+                        match = r
+                        break
+                if match != -1:
+                    break
+            if match != -1:
+                break
+
+        if match == -1:
+            grid.setdefault((cb, ct), deque()).append(len(kept))
+            kept.append(p)
+            anchors.append((p.conf_x, p.base_x, p.tip_x))
+            counts.append(1)
+        else:
+            counts[match] += 1
+            # 合并时保留旗杆更高的那个形态作为代表
+            if p.pole_height > kept[match].pole_height:
+                kept[match] = p
+
+    # 最终结果按确认点排序
+    final = sorted(range(len(kept)), key=lambda r: (kept[r].conf_x, kept[r].base_x))
+    return [kept[r] for r in final], np.array([counts[r] for r in final], dtype=np.int64)
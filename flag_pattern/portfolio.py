@@ -0,0 +1,223 @@
+import heapq
+from dataclasses import dataclass
+import numpy as np
+from .pattern_index import PATTERN_KINDS
+
+
+# 同一时刻的事件先处理平仓再处理开仓，平仓释放的资金和仓位可以立即被新信号使用
+_EXIT = 0
+_ENTRY = 1
+
+_BULL_KINDS = (PATTERN_KINDS.index('bull_flag'), PATTERN_KINDS.index('bull_pennant'))
+
+
+@dataclass
+class PortfolioConfig:
+    """
+    组合模拟参数
+
+    属性:
+    initial_capital: float - 初始资金
+    max_positions: int - 同时持有的最大仓位数
+    max_per_symbol: int - 单个品种同时持有的最大仓位数
+    position_fraction: float - 每笔交易的名义金额占当前账面权益的比例
+    cost_bps: float - 单边交易成本（基点），包括佣金和滑点，开仓和平仓各收一次
+    log_prices: bool - 价格数组是否为对数价格（识别时通常使用对数价格）
+    """
+    initial_capital: float = 1_000_000.0
+    max_positions: int = 10
+    max_per_symbol: int = 1
+    position_fraction: float = 0.1
+    cost_bps: float = 5.0
+    log_prices: bool = True
+
+
+@dataclass
+class PortfolioResult:
+    """
+    组合模拟结果
+
+    属性:
+    trades: dict - 逐笔成交记录（列式），record_trades=False时为空
+    equity_times: np.array - 每次平仓后的时间
+    equity: np.array - 每次平仓后的已实现权益
+    n_signals: int - 收到的信号数
+    n_rejected: int - 因仓位/资金限制被拒绝的信号数
+    n_skipped: int - 持有期超出数据范围而跳过的信号数
+    """
+    trades: dict
+    equity_times: np.array
+    equity: np.array
+    n_signals: int = 0
+    n_rejected: int = 0
+    n_skipped: int = 0
+    initial_capital: float = 0.0
+
+    def stats(self) -> dict:
+        """
+        汇总组合表现：总收益、交易数、胜率、最大回撤等
+        """
+        final = self.equity[-1] if len(self.equity) else self.initial_capital
+        curve = np.concatenate([[self.initial_capital], self.equity])
+        drawdown = 1.0 - curve / np.maximum.accumulate(curve)
+        n_trades = len(self.equity)
+        pnl = self.trades.get('pnl')
+        return {
+            'final_equity': final,
+            'total_return': final / self.initial_capital - 1.0,
+            'n_trades': n_trades,
+            'win_rate': float((pnl > 0).mean()) if pnl is not None and len(pnl) else np.nan,
+            'max_drawdown': float(drawdown.max()),
+            'n_signals': self.n_signals,
+            'n_rejected': self.n_rejected,
+            'n_skipped': self.n_skipped,
+        }
+
+
+def events_from_table(table: dict, hold_mult: float = 1.0, score: str = 'pole_height'):
+    """
+    把扫描结果（形态表格）转换为按确认点排序的信号事件流，同一确认点的信号按score从高到低排列
+
+    参数:
+    table: dict - 形态表格（patterns_to_table的返回值，可以是缓存中的内存映射数组）
+    hold_mult: float - 持有期乘数，持有K线数 = int(flag_width * hold_mult)
+    score: str - 同一时刻信号过多时用于排序的字段，数值越大越优先
+
+    返回:
+    生成器，每个元素为(conf_x, 方向, 形态类型, 持有K线数, 优先级)，方向1为做多、-1为做空
+    """
+    conf_x = np.asarray(table['conf_x'])
+    scores = np.asarray(table[score], dtype=float)
+    # 先按确认点、再按优先级从高到低排序：每个品种在调度队列中只有一个待处理的信号，
+    # 同一根K线上的多个信号必须在这里就按优先级排好，否则会按表格顺序先占用仓位
+    order = np.lexsort((-scores, conf_x))
+    kinds = np.asarray(table['kind'])[order]
+    hold = (np.asarray(table['flag_width'])[order] * hold_mult).astype(np.int64)
+    scores = scores[order]
+    direction = np.where(np.isin(kinds, _BULL_KINDS), 1, -1)
+    for k in range(len(order)):
+        yield int(conf_x[order[k]]), int(direction[k]), int(kinds[k]), int(hold[k]), float(scores[k])
+
+
+class PortfolioSimulator:
+    """
+    事件驱动的多品种组合模拟器
+
+    逐个形态统计胜率时，每个信号都被认为可以成交；实盘中信号会重叠，并受资金和仓位数限制。
+    这个模拟器按时间顺序处理所有品种的确认事件：
+    - 调度器是一个优先队列(heapq)，元素为(时间, 阶段, -优先级, 序号)，
+      每个品种只在队列中保留下一个待处理的信号，信号从各品种的迭代器中按需拉取，
+      因此内存占用只与品种数和持仓数有关，不需要构建"品种 × 日期"的稠密矩阵，可以流式处理上百万个事件
+    - 开仓时安排一个平仓事件放回同一个队列；同一时刻先平仓后开仓，同时到达的信号按优先级分配仓位
+    - 仓位大小为当前账面权益（现金 + 持仓成本）的固定比例，开平仓各收一次交易成本
+
+    参数:
+    config: PortfolioConfig - 模拟参数
+    """
+
+    def __init__(self, config: PortfolioConfig = None):
+        self.config = config if config is not None else PortfolioConfig()
+
+    def run(self, streams: dict, record_trades: bool = True) -> PortfolioResult:
+        """
+        运行模拟
+
+        参数:
+        streams: dict - 品种代码 -> (事件迭代器, 日期数组, 价格数组)
+                 事件迭代器按conf_x升序产生(conf_x, 方向, 形态类型, 持有K线数, 优先级)，例如events_from_table的返回值；
+                 日期数组用于跨品种对齐时间（datetime64或整数），为None时直接使用K线序号
+        record_trades: bool - 是否保存逐笔成交记录
+
+        返回:
+        PortfolioResult - 模拟结果
+        """
+        cfg = self.config
+        cost = cfg.cost_bps / 1e4
+        heap = []
+        seq = 0
+        sources = {}
+
+        def time_of(symbol, x):
+            times = sources[symbol][1]
+            return int(x) if times is None else int(times[x])
+
+        def pull(symbol):
+            # 从品种的事件流中取出下一个信号放入队列
+            nonlocal seq
+            event = next(sources[symbol][0], None)
+            if event is not None:
+                heapq.heappush(heap, (time_of(symbol, event[0]), _ENTRY, -event[4], seq, symbol, event))
+                seq += 1
+
+        for symbol, (events, dates, prices) in streams.items():
+            times = None
+            if dates is not None:
+                # 日期统一转换为整数时间戳，作为跨品种排序的键
+                times = np.asarray(dates)
+                if np.issubdtype(times.dtype, np.datetime64):
+                    times = times.astype('datetime64[s]').astype(np.int64)
+            sources[symbol] = (iter(events), times, np.asarray(prices, dtype=float))
+            pull(symbol)
+
+        cash = cfg.initial_capital
+        book = 0.0                 # 持仓的成本（名义金额）合计
+        open_total = 0
+        open_by_symbol = {}
+        n_signals = n_rejected = n_skipped = 0
+        equity_times, equity = [], []
+        trades = {name: [] for name in ('symbol', 'entry_x', 'exit_x', 'entry_time', 'exit_time',
+                                        'direction', 'kind', 'notional', 'ret', 'pnl')}
+
+        while heap:
+            t, phase, _, _, symbol, payload = heapq.heappop(heap)
+            prices = sources[symbol][2]
+
+            if phase == _EXIT:
+                entry_x, exit_x, entry_t, direction, kind, notional = payload
+                move = prices[exit_x] - prices[entry_x]
+                if cfg.log_prices:
+                    ret = np.expm1(move) if direction > 0 else -np.expm1(move)
+                else:
+                    ret = direction * move / prices[entry_x]
+                proceeds = notional * (1.0 + ret)
+                proceeds -= abs(proceeds) * cost
+                cash += proceeds
+                book -= notional
+                open_total -= 1
+                open_by_symbol[symbol] -= 1
+                equity_times.append(t)
+                equity.append(cash + book)
+                if record_trades:
+                    pnl = proceeds - notional * (1.0 + cost)
+                    for name, value in zip(trades, (symbol, entry_x, exit_x, entry_t, t, direction, kind,
+                                                    notional, ret, pnl)):
+                        trades[name].append(value)
+                continue
+
+            # 开仓信号：先从该品种拉取下一个信号，保持队列中每个品种都有一个待处理信号
+            pull(symbol)
+            n_signals += 1
+            conf_x, direction, kind, hold, _ = payload
+            exit_x = conf_x + hold
+            if hold <= 0 or exit_x >= len(prices):
+                n_skipped += 1
+                continue
+            if open_total >= cfg.max_positions or open_by_symbol.get(symbol, 0) >= cfg.max_per_symbol:
+                n_rejected += 1
+                continue
+            notional = min((cash + book) * cfg.position_fraction, cash / (1.0 + cost))
+            if notional <= 0:
+                n_rejected += 1
+                continue
+
+            cash -= notional * (1.0 + cost)
+            book += notional
+            open_total += 1
+            open_by_symbol[symbol] = open_by_symbol.get(symbol, 0) + 1
+            heapq.heappush(heap, (time_of(symbol, exit_x), _EXIT, 0.0, seq, symbol,
+                                  (conf_x, exit_x, t, direction, kind, notional)))
+            seq += 1
+
+        trades = {name: np.asarray(values) for name, values in trades.items()} if record_trades else {}
+        return PortfolioResult(trades, np.asarray(equity_times, dtype=np.int64), np.asarray(equity, dtype=float),
+                               n_signals, n_rejected, n_skipped, cfg.initial_capital)
@@ -0,0 +1,132 @@
+import numpy as np
+
+
+'''====================1.稀疏表区间最值==========================='''
+
+class RangeIndex:
+    """
+    区间最大/最小值索引（稀疏表，Sparse Table）
+
+    检查函数在每根K线上都要对同一个价格数组求区间最值，例如data[tip_x + 1:i].max()、
+    data[base_x:i + 1].argmin()，每次都是O(区间长度)。稀疏表预先保存每个位置起长度为2^k的区间的
+    最大/最小值下标，构建O(n log n)，之后任意区间[a, b)的查询只需要比较两个重叠的2^k区间，O(1)。
+
+    并列最值取最靠前的位置，与ndarray.argmax/argmin一致，因此替换切片计算后识别结果完全相同。
+    所有区间都是左闭右开的[a, b)，与切片data[a:b]对应，要求a < b。
+
+    参数:
+    data: np.array - 价格数组（构建后不应再修改）
+    """
+
+    def __init__(self, data: np.array):
+        self.data = np.ascontiguousarray(data, dtype=np.float64)
+        n = len(self.data)
+        dtype = np.int32 if n < 2 ** 31 else np.int64
+        self._max = [np.arange(n, dtype=dtype)]
+        self._min = [np.arange(n, dtype=dtype)]
+        k = 1
+        while (1 << k) <= n:
+            half = 1 << (k - 1)
+            m = n - (1 << k) + 1
+            self._max.append(self._merge(self._max[-1][:m], self._max[-1][half:half + m], True))
+            self._min.append(self._merge(self._min[-1][:m], self._min[-1][half:half + m], False))
+            k += 1
+
+    def _merge(self, left: np.array, right: np.array, is_max: bool) -> np.array:
+        # 值相等时取左边（更靠前）的下标
+        lv, rv = self.data[left], self.data[right]
+        return np.where(lv >= rv if is_max else lv <= rv, left, right)
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        """稀疏表占用的字节数"""
+        return sum(t.nbytes for t in self._max) + sum(t.nbytes for t in self._min)
+
+    def argmax(self, a: int, b: int) -> int:
+        """data[a:b]中最大值的下标（全序列索引）"""
+        k = (b - a).bit_length() - 1
+        table = self._max[k]
+        i, j = table[a], table[b - (1 << k)]
+        return int(i) if self.data[i] >= self.data[j] else int(j)
+
+    def argmin(self, a: int, b: int) -> int:
+        """data[a:b]中最小值的下标（全序列索引）"""
+        k = (b - a).bit_length() - 1
+        table = self._min[k]
+        i, j = table[a], table[b - (1 << k)]
+        return int(i) if self.data[i] <= self.data[j] else int(j)
+
+    def max(self, a: int, b: int) -> float:
+        """data[a:b].max()"""
+        k = (b - a).bit_length() - 1
+        table = self._max[k]
+        return max(self.data[table[a]], self.data[table[b - (1 << k)]])
+
+    def min(self, a: int, b: int) -> float:
+        """data[a:b].min()"""
+        k = (b - a).bit_length() - 1
+        table = self._min[k]
+        return min(self.data[table[a]], self.data[table[b - (1 << k)]])
+
+    '''批量查询：a、b为等长数组，一次向量化计算所有区间'''
+
+    def _levels(self, a: np.array, b: np.array) -> np.array:
+        # 区间长度的以2为底的对数（向下取整），frexp对整数是精确的
+        return np.frexp(np.asarray(b) - np.asarray(a))[1] - 1
+
+    def _many(self, tables: list, a: np.array, b: np.array, is_max: bool) -> np.array:
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        k = self._levels(a, b)
+        i = np.empty(len(a), dtype=np.int64)
+        j = np.empty(len(a), dtype=np.int64)
+        for level in np.unique(k):
+            sel = k == level
+            i[sel] = tables[level][a[sel]]
+            j[sel] = tables[level][b[sel] - (1 << int(level))]
+        vi, vj = self.data[i], self.data[j]
+        return np.where(vi >= vj if is_max else vi <= vj, i, j)
+
+    def argmax_many(self, a: np.array, b: np.array) -> np.array:
+        """每个区间[a[r], b[r])中最大值的下标"""
+        return self._many(self._max, a, b, True)
+
+    def argmin_many(self, a: np.array, b: np.array) -> np.array:
+        """每个区间[a[r], b[r])中最小值的下标"""
+        return self._many(self._min, a, b, False)
+
+    def max_many(self, a: np.array, b: np.array) -> np.array:
+        """每个区间[a[r], b[r])的最大值"""
+        return self.data[self.argmax_many(a, b)]
+
+    def min_many(self, a: np.array, b: np.array) -> np.array:
+        """每个区间[a[r], b[r])的最小值"""
+        return self.data[self.argmin_many(a, b)]
+
+
+class SliceRangeIndex:
+    """
+    与RangeIndex接口相同、直接对切片求值的实现
+
+    检查函数被单独调用（没有传入RangeIndex）时使用，不需要预先构建，适合只查询少数几次的场景。
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data: np.array):
+        self.data = data
+
+    def argmax(self, a: int, b: int) -> int:
+        return int(self.data[a:b].argmax()) + a
+
+    def argmin(self, a: int, b: int) -> int:
+        return int(self.data[a:b].argmin()) + a
+
+    def max(self, a: int, b: int) -> float:
+        return self.data[a:b].max()
+
+    def min(self, a: int, b: int) -> float:
+        return self.data[a:b].min()
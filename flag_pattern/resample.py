@@ -0,0 +1,193 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+
+'''====================1.分桶边界==========================='''
+
+_INTRADAY = re.compile(r'^(\d+)(min|h)$')
+
+
+def bucket_keys(dates: np.array, freq: str, label: str = 'start') -> np.array:
+    """
+    每根基础K线所属时间桶的整数编号（同一个桶内的K线编号相同）
+
+    参数:
+    dates: np.array - 基础K线的时间戳（datetime64，升序）
+    freq: str - 'D'日、'W'周（周一开始）、'M'月、'Q'季、'Y'年，或'5min'、'30min'、'1h'等分钟/小时周期
+    label: str - 基础K线时间戳的含义：'start'表示K线开始时间，'end'表示K线结束时间
+                 （很多分钟线数据用结束时间标记，09:31的K线属于09:30-09:31；'end'时先减去1秒再分桶）
+
+    返回:
+    np.array - int64编号
+    """
+    ts = np.asarray(dates, dtype='datetime64[s]')
+    if label == 'end':
+        ts = ts - np.timedelta64(1, 's')
+    elif label != 'start':
+        raise ValueError(f"未知的时间戳标记方式: {label}")
+
+    if freq == 'D':
+        return ts.astype('datetime64[D]').astype(np.int64)
+    if freq == 'W':
+        # 1970-01-01是周四，加3天后按7天整除，每周从周一开始
+        return (ts.astype('datetime64[D]').astype(np.int64) + 3) // 7
+    if freq == 'M':
+        return ts.astype('datetime64[M]').astype(np.int64)
+    if freq == 'Q':
+        return ts.astype('datetime64[M]').astype(np.int64) // 3
+    if freq == 'Y':
+        return ts.astype('datetime64[Y]').astype(np.int64)
+    match = _INTRADAY.match(freq)
+    if match:
+        seconds = int(match.group(1)) * (60 if match.group(2) == 'min' else 3600)
+        return ts.astype(np.int64) // seconds
+    raise ValueError(f"未知的周期: {freq}")
+
+
+def bucket_starts(keys: np.array) -> np.array:
+    """桶编号变化的位置，即每个桶第一根基础K线的索引"""
+    keys = np.asarray(keys)
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1]).astype(np.int64)
+
+
+'''====================2.K线聚合==========================='''
+
+def aggregate_ohlcv(starts: np.array, open_=None, high=None, low=None, close=None, volume=None) -> dict:
+    """
+    按桶起点聚合K线：开盘价取桶内第一根，收盘价取最后一根，最高/最低价取桶内极值，成交量求和
+
+    用ufunc.reduceat一次完成所有桶的聚合，不需要逐桶循环或pandas的groupby。
+    未提供的列不输出。
+
+    返回:
+    dict - 'open'/'high'/'low'/'close'/'volume' -> 聚合后的数组
+    """
+    starts = np.asarray(starts, dtype=np.int64)
+    out = {}
+    if open_ is not None:
+        out['open'] = np.asarray(open_)[starts]
+    if high is not None:
+        out['high'] = np.maximum.reduceat(np.asarray(high), starts)
+    if low is not None:
+        out['low'] = np.minimum.reduceat(np.asarray(low), starts)
+    if close is not None:
+        close = np.asarray(close)
+        out['close'] = close[np.append(starts[1:], len(close)) - 1]
+    if volume is not None:
+        out['volume'] = np.add.reduceat(np.asarray(volume), starts)
+    return out
+
+
+class Timeframe:
+    """
+    一个周期的分桶结果
+
+    分桶边界只计算一次，之后每一列都用reduceat聚合；形态在该周期上的K线索引
+    可以映射回基础K线：周期K线x的收盘价就是基础K线ends[x]的收盘价。
+
+    参数:
+    dates: np.array - 基础K线的时间戳
+    freq: str - 周期，见bucket_keys；'base'表示不做重采样
+    label: str - 基础K线时间戳的含义，见bucket_keys
+    """
+
+    def __init__(self, dates: np.array, freq: str, label: str = 'start'):
+        self.freq = freq
+        n = len(dates)
+        if freq == 'base':
+            self.starts = np.arange(n, dtype=np.int64)
+        else:
+            self.starts = bucket_starts(bucket_keys(dates, freq, label))
+        self.ends = np.append(self.starts[1:], n).astype(np.int64) - 1  # 每个桶最后一根基础K线
+        self.dates = np.asarray(dates)[self.ends] if n else np.asarray(dates)[:0]
+
+    def __len__(self):
+        return len(self.starts)
+
+    def aggregate(self, open_=None, high=None, low=None, close=None, volume=None) -> dict:
+        """聚合基础K线，见aggregate_ohlcv"""
+        if self.freq == 'base':
+            return {name: np.asarray(col) for name, col in
+                    zip(('open', 'high', 'low', 'close', 'volume'), (open_, high, low, close, volume))
+                    if col is not None}
+        return aggregate_ohlcv(self.starts, open_, high, low, close, volume)
+
+    def to_base(self, x: np.array) -> np.array:
+        """周期K线索引 -> 该K线收盘时对应的基础K线索引（因果：形态在这根基础K线收盘时才可见）"""
+        return self.ends[np.asarray(x, dtype=np.int64)]
+
+    def to_base_start(self, x: np.array) -> np.array:
+        """周期K线索引 -> 该K线第一根基础K线的索引"""
+        return self.starts[np.asarray(x, dtype=np.int64)]
+
+
+'''====================3.多周期扫描==========================='''
+
+def _scan_timeframe(task):
+    """工作进程：在一个周期的收盘价上运行识别"""
+    freq, order, close, method, kwargs = task
+    from .flag_pattern_algorithm_0328 import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                             patterns_to_table)
+
+    if method == 'pips':
+        result = find_flags_pennants_pips(close, order, **kwargs)
+    else:
+        result = find_flags_pennants_trendline(close, order, **kwargs)
+    return freq, patterns_to_table(result)
+
+
+def scan_timeframes(dates: np.array, close: np.array, freqs=('base', 'W', 'M'), orders=10, method: str = 'pips',
+                    label: str = 'start', max_workers: int = None, **kwargs) -> dict:
+    """
+    在多个周期上识别旗形，并把形态的K线索引映射回基础K线
+
+    每个周期的分桶边界只计算一次，收盘价用分桶结果直接取出，不需要为每个周期单独准备数据文件。
+    各周期的识别相互独立，分发到进程池并行执行。
+
+    输出的每张形态表格保留周期内的索引（base_x/tip_x/conf_x等，可直接在该周期的K线上绘图），
+    另外增加以下列：
+    - src_base_x / src_tip_x / src_conf_x: 对应的基础K线索引（周期K线收盘时的那根基础K线）
+    - conf_time: 确认点的时间戳（基础K线时间）
+
+    参数:
+    dates: np.array - 基础K线的时间戳（升序）
+    close: np.array - 基础K线的收盘价（通常是对数价格）
+    freqs: list - 周期列表，见Timeframe；'base'表示基础周期本身
+    orders: int/dict - 每个周期使用的order，整数表示所有周期相同
+    method: str - 'pips'或'trendline'
+    label: str - 基础K线时间戳的含义，见bucket_keys
+    max_workers: int - 进程数，默认CPU核数；为1时在当前进程串行执行
+    kwargs: 传给find_flags_pennants_*的其他参数（如max_pending、params）
+
+    返回:
+    tables: dict - 周期 -> 形态表格
+    timeframes: dict - 周期 -> Timeframe（用于聚合其他列或绘图）
+    """
+    if method not in ('pips', 'trendline'):
+        raise ValueError(f"未知的识别方法: {method}")
+    dates = np.asarray(dates)
+    close = np.asarray(close, dtype=np.float64)
+    timeframes = {freq: Timeframe(dates, freq, label) for freq in freqs}
+    tasks = [(freq, orders[freq] if isinstance(orders, dict) else orders,
+              tf.aggregate(close=close)['close'], method, kwargs) for freq, tf in timeframes.items()]
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(tasks)) or 1
+    if max_workers <= 1:
+        outputs = [_scan_timeframe(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs = list(pool.map(_scan_timeframe, tasks))
+
+    tables = {}
+    for freq, table in outputs:
+        tf = timeframes[freq]
+        for name in ('base_x', 'tip_x', 'conf_x'):
+            table['src_' + name] = tf.to_base(table[name])
+        table['conf_time'] = dates[table['src_conf_x']]
+        tables[freq] = table
+    return tables, timeframes
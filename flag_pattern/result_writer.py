@@ -0,0 +1,281 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+
+
+# 分区键，目录结构为 <root>/<dataset>/symbol=.../method=.../order=.../part-*.parquet（Hive风格）
+PARTITION_KEYS = ['symbol', 'method', 'order']
+
+
+def _require_pyarrow():
+    """
+    按需导入pyarrow，只有真正读写列式文件时才需要安装
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("列式结果存储需要pyarrow，请先执行 pip install pyarrow") from exc
+    return pyarrow
+
+
+def _to_frame(table) -> pd.DataFrame:
+    """把形态表格（字段名 -> 数组的dict）或DataFrame统一转换为DataFrame"""
+    if isinstance(table, pd.DataFrame):
+        return table
+    return pd.DataFrame({name: np.asarray(col) for name, col in table.items()})
+
+
+def _partition_value(value) -> str:
+    # 分区值会出现在目录名中，去掉路径分隔符避免生成多级目录
+    return str(value).replace('/', '_').replace(os.sep, '_')
+
+
+class ResultWriter:
+    """
+    流式列式结果写入器
+
+    扫描任务每完成一个就调用write()，结果先按分区(数据集, 品种, 方法, order)缓存在内存中，
+    缓存的总行数超过max_buffer_rows时把所有分区一次性写成Parquet文件并清空缓存，
+    因此内存占用有上限，与扫描任务的数量无关。
+
+    没有任何形态的扫描结果也会写出一个0行的part文件，记录这个分区已经扫描过（count为0），
+    overwrite时同样替换该分区的旧结果。
+
+    每次写出都生成一个新的part文件（文件名包含时间戳和进程号），已有文件不会被覆盖，
+    所以多次运行、多个进程都可以向同一个目录追加结果；读取时所有part文件自动合并。
+    part文件先写入临时文件再原子重命名，读取方不会看到写了一半的文件。
+
+    参数:
+    root: str - 结果存储的根目录
+    max_buffer_rows: int - 内存中最多缓存的行数，超过后写出到磁盘
+    compression: str - Parquet压缩算法
+    overwrite: bool - 为True时，本写入器第一次写出某个分区前先删除该分区已有的文件
+                      （重新运行同一组扫描时替换旧结果，而不是重复追加）
+    """
+
+    def __init__(self, root: str, max_buffer_rows: int = 200_000, compression: str = 'zstd',
+                 overwrite: bool = False):
+        _require_pyarrow()
+        self.root = root
+        self.max_buffer_rows = max_buffer_rows
+        self.compression = compression
+        self.overwrite = overwrite
+        self._buffers = {}   # (数据集, 品种, 方法, order) -> 待写出的DataFrame列表
+        self._buffered = 0   # 当前缓存的总行数
+        self._seq = 0        # 本写入器生成的part文件序号
+        self._written = set()  # 本写入器已经写出过的分区
+        os.makedirs(root, exist_ok=True)
+
+    def write(self, dataset: str, table, symbol: str, method: str, order):
+        """
+        追加一个扫描结果
+
+        参数:
+        dataset: str - 数据集名称，如'patterns'、'extremes'
+        table: dict或pd.DataFrame - 结果表格（例如patterns_to_table的返回值）
+        symbol: str - 品种代码
+        method: str - 识别方法
+        order: 识别参数（order、sigma、n_pips等）
+        """
+        df = _to_frame(table)
+        key = (dataset, _partition_value(symbol), _partition_value(method), _partition_value(order))
+        # 空结果同样登记分区：overwrite时要删除旧文件，并写出一个只有表头的part文件，
+        # 否则重新运行后旧结果仍然留在存储中，summarize_store也看不到这个分区
+        self._buffers.setdefault(key, []).append(df)
+        self._buffered += len(df)
+        if self._buffered >= self.max_buffer_rows:
+            self.flush()
+
+    def flush(self):
+        """
+        把所有缓存的分区写出为Parquet文件
+        """
+        pa = _require_pyarrow()
+        for (dataset, symbol, method, order), frames in self._buffers.items():
+            path = os.path.join(self.root, dataset, f'symbol={symbol}', f'method={method}', f'order={order}')
+            os.makedirs(path, exist_ok=True)
+            if self.overwrite and path not in self._written:
+                for name in os.listdir(path):
+                    if name.endswith('.parquet'):
+                        os.remove(os.path.join(path, name))
+            self._written.add(path)
+            frames = [df for df in frames if len(df)] or frames[:1]  # 全部为空时保留一个空表作为表头
+            if len(frames[0].columns) == 0:
+                continue  # 没有任何列的空结果无法写成Parquet，只清理旧文件
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            name = f'part-{time.time_ns()}-{os.getpid()}-{self._seq:05d}.parquet'
+            self._seq += 1
+            tmp = os.path.join(path, '.' + name + '.tmp')
+            pa.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp,
+                                   compression=self.compression)
+            os.replace(tmp, os.path.join(path, name))
+        self._buffers = {}
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_results(root: str, dataset: str, columns=None, **filters) -> pd.DataFrame:
+    """
+    读取列式存储中的结果
+
+    只读取满足分区条件的文件，例如read_results(root, 'patterns', symbol='000001.SH', order=12)
+    不会打开其他品种、其他order的文件。
+
+    参数:
+    root: str - 结果存储的根目录
+    dataset: str - 数据集名称
+    columns: list - 只读取这些列，None表示全部
+    filters: 分区条件，键为symbol/method/order，值为单个值或值的列表
+
+    返回:
+    pd.DataFrame - 结果数据，包含symbol、method、order分区列；数据集不存在时返回空表
+    """
+    dataset_, expr = _open_dataset(root, dataset, filters)
+    if dataset_ is None:
+        return pd.DataFrame()
+    return dataset_.to_table(columns=columns, filter=expr).to_pandas()
+
+
+def _open_dataset(root: str, dataset: str, filters: dict):
+    """
+    打开数据集并把分区条件转换为过滤表达式
+
+    返回:
+    tuple - (pyarrow数据集, 过滤表达式)，数据集不存在时为(None, None)
+    """
+    pa = _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    path = os.path.join(root, dataset)
+    if not os.path.isdir(path):
+        return None, None
+    for key in filters:
+        if key not in PARTITION_KEYS:
+            raise ValueError(f"未知的分区键: {key}")
+
+    dataset_ = ds.dataset(path, format='parquet', partitioning='hive',
+                          exclude_invalid_files=True, ignore_prefixes=['.', '_'])
+    expr = None
+    for key, value in filters.items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        # 分区值的类型由目录名推断（order一般推断为整数），与推断出的类型保持一致再比较
+        field_type = dataset_.schema.field(key).type
+        cond = ds.field(key).isin(pa.array(list(values)).cast(field_type))
+        expr = cond if expr is None else expr & cond
+    return dataset_, expr
+
+
+def list_partitions(root: str, dataset: str, **filters) -> list:
+    """
+    数据集中满足分区条件的所有分区，包括只有0行part文件的分区（扫描过但没有识别到形态）
+
+    返回:
+    list - 排序后的(symbol, method, order)元组，值的类型与read_results返回的分区列相同
+    """
+    import pyarrow.dataset as ds
+
+    dataset_, expr = _open_dataset(root, dataset, filters)
+    if dataset_ is None:
+        return []
+    partitions = set()
+    for fragment in dataset_.get_fragments(filter=expr):
+        keys = ds.get_partition_keys(fragment.partition_expression)
+        partitions.add(tuple(keys[name] for name in PARTITION_KEYS))
+    return sorted(partitions)
+
+
+def summarize_store(root: str, dataset: str = 'patterns', **filters) -> pd.DataFrame:
+    """
+    从列式存储汇总每个(品种, 方法, order, 形态类型)的数量、平均收益、胜率和总收益
+
+    返回格式与run_order_sweep的结果相同，可以直接传给to_wide；
+    没有识别到形态的分区同样列出，count为0
+    """
+    from .order_sweep import STAT_COLUMNS, summarize_returns
+    from .pattern_index import PATTERN_KINDS
+
+    df = read_results(root, dataset, columns=PARTITION_KEYS + ['kind', 'return'], **filters)
+    groups = dict(iter(df.groupby(PARTITION_KEYS, sort=False, observed=True))) if len(df) else {}
+    empty = np.zeros(0)
+    rows, index = [], []
+    for symbol, method, order in list_partitions(root, dataset, **filters):
+        group = groups.get((symbol, method, order))
+        if group is None:
+            stats = summarize_returns(empty.astype(np.int8), empty)
+        else:
+            stats = summarize_returns(group['kind'].to_numpy(), group['return'].to_numpy())
+        for name in PATTERN_KINDS:
+            index.append((symbol, method, order, name))
+            rows.append(stats[name])
+    results = pd.DataFrame(rows, columns=STAT_COLUMNS,
+                           index=pd.MultiIndex.from_tuples(index, names=PARTITION_KEYS + ['pattern']))
+    results['count'] = results['count'].astype(np.int64)
+    return results
+
+
+def write_excel_summary(root: str, path: str, dataset: str = 'patterns', details: bool = False,
+                        dates=None, **filters):
+    """
+    按需从列式存储生成Excel汇总报告
+
+    汇总表每个(品种, 方法)一个工作表，格式与原先的pattern_performance_summary.xlsx相同。
+    details=True时每种形态类型再写一个明细工作表（以order列区分），
+    不再按order拆分工作表，避免工作表数量随order线性增长。
+
+    参数:
+    root: str - 结果存储的根目录
+    path: str - 输出的Excel文件路径
+    dataset: str - 形态数据集名称
+    details: bool - 是否同时写出形态明细
+    dates: pd.Index - K线日期索引，提供时明细中增加起始/顶点/确认日期列
+    filters: 分区条件，同read_results
+    """
+    from .order_sweep import to_wide
+    from .pattern_index import PATTERN_KINDS
+
+    summary = summarize_store(root, dataset, **filters)
+    with pd.ExcelWriter(path) as writer:
+        for symbol, method in summary.index.droplevel(['order', 'pattern']).unique():
+            wide = to_wide(summary, symbol=symbol, method=method)
+            wide.to_excel(writer, sheet_name=f'{symbol}_{method}'[:31])  # Excel工作表名最长31个字符
+
+        if details:
+            df = read_results(root, dataset, **filters)
+            for k, name in enumerate(PATTERN_KINDS):
+                part = df[df['kind'] == k].sort_values(PARTITION_KEYS + ['conf_x'])
+                if len(part) and dates is not None:
+                    part = part.assign(start_date=dates[part['base_x'].to_numpy()],
+                                       end_date=dates[part['tip_x'].to_numpy()],
+                                       conf_date=dates[part['conf_x'].to_numpy()])
+                if len(part):
+                    part.to_excel(writer, sheet_name=name, index=False)
+
+
+def dataset_to_excel(root: str, dataset: str, path: str, sheet_by: str = None, **filters):
+    """
+    把列式存储中的一个数据集导出为Excel（例如极值点数据），只在需要人工查看时调用
+
+    参数:
+    root: str - 结果存储的根目录
+    dataset: str - 数据集名称
+    path: str - 输出的Excel文件路径
+    sheet_by: str - 按该列的取值拆分工作表，None表示全部写入一个工作表
+    filters: 分区条件，同read_results
+    """
+    df = read_results(root, dataset, **filters)
+    with pd.ExcelWriter(path) as writer:
+        if sheet_by is None:
+            df.to_excel(writer, sheet_name=dataset[:31], index=False)
+        else:
+            for value, part in df.groupby(sheet_by, sort=False):
+                part.drop(columns=sheet_by).to_excel(writer, sheet_name=str(value)[:31], index=False)
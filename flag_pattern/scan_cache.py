@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from dataclasses import fields, is_dataclass
+import numpy as np
+
+
+# 参与计算代码版本号的源文件：这些文件有任何改动，旧的缓存都会自动失效
+# （pattern_index.py定义PATTERN_KINDS的顺序，缓存表格的kind列依赖它）
+_SOURCE_FILES = ['flag_pattern_algorithm_0328.py', 'important_point_algorithm.py',
+                 'trendline_automation.py', 'pattern_pool.py', 'range_index.py', 'pattern_index.py']
+
+# 只影响速度、不影响结果的参数（data自身的区间最值索引），不计入缓存键
+_KEY_EXCLUDED = ('index',)
+
+_code_version = None
+
+
+def code_version() -> str:
+    """
+    计算识别算法源码的哈希值，作为缓存键的一部分
+    """
+    global _code_version
+    if _code_version is None:
+        h = hashlib.sha256()
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in _SOURCE_FILES:
+            path = os.path.join(here, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as fh:
+                    h.update(fh.read())
+        _code_version = h.hexdigest()[:16]
+    return _code_version
+
+
+def data_hash(data: np.array) -> str:
+    """
+    计算价格序列内容的哈希值（包含dtype和长度，避免不同类型的数组碰撞）
+    """
+    data = np.ascontiguousarray(data)
+    h = hashlib.sha256()
+    h.update(str(data.dtype).encode())
+    h.update(str(data.shape).encode())
+    h.update(data.tobytes())
+    return h.hexdigest()
+
+
+def _key_value(name: str, value) -> str:
+    """
+    把一个阈值参数转换为稳定的字符串：基本类型、元组/列表和数据类（如FlagParams）按值表示
+
+    函数（如bull_priority/bear_priority）和其他对象的repr带有内存地址，每次运行都不同，
+    写进缓存键后永远不会命中，只会不断写入新条目，因此直接拒绝。
+    """
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        value = value.item()
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return repr(value)
+    if isinstance(value, (tuple, list)):
+        return '(' + ', '.join(_key_value(name, v) for v in value) + ')'
+    if is_dataclass(value) and not isinstance(value, type):
+        # 与数据类默认的repr相同：类名(字段=值, ...)
+        items = ', '.join(f"{f.name}={_key_value(name, getattr(value, f.name))}" for f in fields(value))
+        return f"{type(value).__name__}({items})"
+    raise TypeError(f"参数{name}={value!r}无法作为缓存键（函数和一般对象没有稳定的表示），"
+                    f"请不使用缓存直接调用find_flags_pennants_*")
+
+
+def scan_key(data: np.array, method: str, order: int, **thresholds) -> str:
+    """
+    生成缓存键：(序列内容哈希, 识别方法, order, 阈值参数, 代码版本)
+
+    阈值参数只能是基本类型、元组或数据类（见_key_value），否则抛出TypeError；
+    index等只影响速度的参数不计入缓存键。
+    """
+    payload = json.dumps({
+        'data': data_hash(data),
+        'method': method,
+        'order': int(order),
+        'thresholds': {k: _key_value(k, v) for k, v in sorted(thresholds.items()) if k not in _KEY_EXCLUDED},
+        'code': code_version(),
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class ScanCache:
+    """
+    扫描结果的磁盘缓存
+
+    每个缓存条目是一个目录，形态表格的每一列保存为一个.npy文件（紧凑的二进制列式格式），
+    命中时用内存映射(mmap)方式加载，不需要把整张表读入内存。
+    目录的修改时间记录最近一次访问，超出磁盘预算时按LRU（最久未访问）淘汰。
+
+    参数:
+    cache_dir: str - 缓存目录
+    max_bytes: int - 磁盘预算（字节），默认256MB
+    """
+
+    def __init__(self, cache_dir: str = '.scan_cache', max_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key: str):
+        """
+        读取缓存条目，未命中返回None
+
+        返回:
+        table: dict - 字段名 -> 内存映射的只读np.array
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        try:
+            table = {name[:-4]: np.load(os.path.join(path, name), mmap_mode='r')
+                     for name in os.listdir(path) if name.endswith('.npy')}
+        except (OSError, ValueError):
+            # 条目损坏（例如写入过程中进程被杀），删除后按未命中处理
+            shutil.rmtree(path, ignore_errors=True)
+            return None
+        os.utime(path)  # 更新访问时间，供LRU淘汰使用
+        return table
+
+    def put(self, key: str, table: dict):
+        """
+        写入缓存条目：先写入临时目录再原子重命名，避免读到写了一半的条目
+        """
+        tmp = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp-')
+        for name, column in table.items():
+            np.save(os.path.join(tmp, name + '.npy'), np.ascontiguousarray(column))
+        path = self._path(key)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp, path)
+        self.evict(keep=path)
+
+    def entries(self):
+        """
+        返回所有缓存条目的(最近访问时间, 占用字节数, 路径)，按访问时间升序
+        """
+        result = []
+        for name in os.listdir(self.cache_dir):
+            path = self._path(name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+            result.append((os.path.getmtime(path), size, path))
+        result.sort()
+        return result
+
+    def evict(self, keep: str = None):
+        """
+        按LRU顺序删除条目，直到总占用不超过磁盘预算
+
+        参数:
+        keep: str - 不参与淘汰的条目路径（刚写入的条目，即使单独超出预算也保留）
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def cached_patterns_table(data: np.array, order: int, method: str = 'pips', cache: ScanCache = None,
+                          **thresholds) -> dict:
+    """
+    带缓存的旗形识别，返回形态表格（patterns_to_table的格式）
+
+    命中时各列是内存映射的只读数组，只有实际访问的部分才从磁盘读入；
+    统计、收益、显著性检验等按列计算的场景应使用这个函数，不要先还原成FlagPattern对象。
+
+    参数:
+    data: np.array - 价格数据数组
+    order: int - 滚动窗口大小参数
+    method: str - 'pips'或'trendline'
+    cache: ScanCache - 缓存对象，为None时使用默认目录
+    thresholds: 传给find_flags_pennants_*的其他参数（如max_pending、params），也会计入缓存键；
+                bull_priority等函数参数无法计入缓存键，传入时抛出TypeError
+
+    返回:
+    dict - 形态表格
+    """
+    from .flag_pattern_algorithm_0328 import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                             patterns_to_table)
+
+    if method not in ('pips', 'trendline'):
+        raise ValueError(f"未知的识别方法: {method}")
+    if cache is None:
+        cache = ScanCache()
+    key = scan_key(data, method, order, **thresholds)
+
+    table = cache.get(key)
+    if table is not None:
+        return table
+
+    finder = find_flags_pennants_pips if method == 'pips' else find_flags_pennants_trendline
+    table = patterns_to_table(finder(data, order, **thresholds))
+    cache.put(key, table)
+    return table
+
+
+def cached_find_flags_pennants(data: np.array, order: int, method: str = 'pips',
+                               cache: ScanCache = None, **thresholds):
+    """
+    带缓存的旗形识别：数据、参数和代码都没有变化时直接读取缓存，完全跳过识别过程
+
+    返回FlagPattern对象需要读取并转换表格的全部内容；只做按列计算时用cached_patterns_table。
+    参数同cached_patterns_table。
+
+    返回:
+    bull_flags, bear_flags, bull_pennants, bear_pennants
+    """
+    from .flag_pattern_algorithm_0328 import table_to_patterns
+
+    return tuple(table_to_patterns(cached_patterns_table(data, order, method, cache, **thresholds)))
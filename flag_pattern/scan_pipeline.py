@@ -0,0 +1,243 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import numpy as np
+from .pattern_index import PATTERN_KINDS
+from .order_sweep import STAT_COLUMNS, _scan_table, summarize_returns
+
+
+'''====================1.数据加载==========================='''
+
+def load_prices(path: str, column: str = 'close', log: bool = True) -> np.array:
+    """
+    读取一个品种的价格文件（CSV或Excel），返回一列价格
+
+    参数:
+    path: str - .csv或.xlsx/.xls文件
+    column: str - 价格列名，不区分大小写（'close'可以匹配'Close'）
+    log: bool - 是否取自然对数
+
+    返回:
+    np.array - float64价格数组
+    """
+    import pandas as pd  # 加载阶段在线程中执行，pandas读取文件时会释放GIL
+
+    if path.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(path)
+    else:
+        df = pd.read_csv(path)
+    names = {str(name).lower(): name for name in df.columns}
+    if column.lower() not in names:
+        raise KeyError(f"{path}中没有价格列: {column}")
+    values = df[names[column.lower()]].to_numpy(dtype=np.float64)
+    return np.log(values) if log else values
+
+
+def _load(source, column: str, log: bool) -> np.array:
+    # 数据源可以是文件路径、返回价格数组的函数，或者已经在内存中的数组
+    if isinstance(source, (str, os.PathLike)):
+        return load_prices(os.fspath(source), column, log)
+    if callable(source):
+        return np.asarray(source(), dtype=np.float64)
+    return np.asarray(source, dtype=np.float64)
+
+
+def _scan_symbol(symbol, data, methods, orders, hold_mult, want_tables, kwargs):
+    """
+    工作进程：一个品种的所有(方法, order)，共用同一组区间最值索引
+    """
+    indexes = {}
+    outputs = []
+    for method in methods:
+        for order in orders:
+            table = _scan_table(data, method, order, hold_mult, indexes, kwargs)
+            stats = summarize_returns(table['kind'], table['return'])
+            outputs.append((symbol, method, order, stats, table if want_tables else None))
+    return outputs
+
+
+'''====================2.阶段计时==========================='''
+
+class StageMeter:
+    """
+    记录流水线一个阶段的忙碌与等待时间
+
+    - busy: 实际工作（读文件、识别、写出）的时间
+    - wait_in: 等待上游队列有数据的时间，占比高说明上游是瓶颈
+    - wait_out: 下游队列已满、被反压阻塞的时间，占比高说明下游是瓶颈
+    """
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.wait_in = 0.0
+        self.wait_out = 0.0
+
+    async def get(self, queue: asyncio.Queue):
+        start = time.perf_counter()
+        item = await queue.get()
+        self.wait_in += time.perf_counter() - start
+        return item
+
+    async def put(self, queue: asyncio.Queue, item):
+        start = time.perf_counter()
+        await queue.put(item)
+        self.wait_out += time.perf_counter() - start
+
+    async def run(self, loop, executor, fn, *args):
+        start = time.perf_counter()
+        result = await loop.run_in_executor(executor, fn, *args)
+        self.busy += time.perf_counter() - start
+        self.items += 1
+        return result
+
+    def row(self, wall: float) -> dict:
+        capacity = self.workers * wall if wall > 0 else np.nan
+        return {'stage': self.name, 'workers': self.workers, 'items': self.items, 'busy_s': self.busy,
+                'utilization': self.busy / capacity, 'wait_in_s': self.wait_in, 'wait_out_s': self.wait_out}
+
+
+'''====================3.异步流水线==========================='''
+
+async def run_pipeline_async(sources: dict, orders, methods=('pips',), hold_mult: float = 1.0, prefetch: int = 4,
+                             load_workers: int = 2, scan_workers: int = None, writer=None,
+                             return_patterns: bool = False, column: str = 'close', log: bool = True, **kwargs):
+    """
+    加载、识别、写出三个阶段并发执行的品种扫描流水线（异步版本，可在已有事件循环中await）
+
+    原先逐个品种"读文件 -> 取对数 -> 识别 -> 写结果"串行执行，读文件时CPU空闲、识别时磁盘空闲。
+    这里三个阶段用有界队列连接：
+    - 加载：load_workers个协程在线程池中读取并解码文件，最多提前准备prefetch个品种；
+    - 识别：scan_workers个协程把品种分发到进程池，一个品种的所有(方法, order)在同一个进程中完成；
+    - 写出：一个协程在单独的线程中调用writer.write（ResultWriter不是线程安全的，由单线程串行写出），
+      Parquet的写出与后续品种的识别重叠。
+    队列满时上游阻塞（反压），内存中最多同时存在 prefetch + load_workers + scan_workers 个品种的价格，
+    以及prefetch个等待写出的结果；写出之后只保留每个(品种, 方法, order)的统计，
+    形态表格由writer缓存（不超过其max_buffer_rows行）并写出到磁盘。
+    return_patterns=True时所有形态表格都保留在内存中直到返回，占用随品种数增长。
+
+    参数:
+    sources: dict - 品种代码 -> 文件路径 / 返回价格数组的函数 / 价格数组
+    orders: list - order参数
+    methods: tuple - 识别方法，'pips'和/或'trendline'
+    hold_mult: float - 持有期乘数
+    prefetch: int - 各队列的容量
+    load_workers: int - 加载线程数
+    scan_workers: int - 识别进程数，默认CPU核数
+    writer: ResultWriter - 结果写入器，None时不写出
+    return_patterns: bool - 是否同时返回形态表格
+    column, log: 读取文件时的价格列名和是否取对数，见load_prices
+    kwargs: 传给find_flags_pennants_*的其他参数
+
+    返回:
+    results: pd.DataFrame - 与run_order_sweep相同的统计表
+    stages: pd.DataFrame - 每个阶段的工作数、处理数、忙碌时间、利用率（忙碌时间/(工作数*总时间)）和等待时间
+    patterns: dict - (symbol, method, order) -> 形态表格，仅当return_patterns=True时返回
+    """
+    import pandas as pd
+
+    for method in methods:
+        if method not in ('pips', 'trendline'):
+            raise ValueError(f"未知的识别方法: {method}")
+    scan_workers = scan_workers or os.cpu_count() or 1
+    want_tables = return_patterns or writer is not None
+    loop = asyncio.get_running_loop()
+
+    todo = asyncio.Queue()
+    for symbol, source in sources.items():
+        todo.put_nowait((symbol, source))
+    loaded = asyncio.Queue(maxsize=prefetch)
+    scanned = asyncio.Queue(maxsize=prefetch)
+    meters = {'load': StageMeter('load', load_workers), 'scan': StageMeter('scan', scan_workers),
+              'write': StageMeter('write', 1)}
+    outputs = []
+
+    async def load_stage():
+        meter = meters['load']
+        while not todo.empty():
+            symbol, source = todo.get_nowait()
+            data = await meter.run(loop, io_pool, _load, source, column, log)
+            await meter.put(loaded, (symbol, data))
+
+    async def scan_stage():
+        meter = meters['scan']
+        while True:
+            item = await meter.get(loaded)
+            if item is None:
+                break
+            symbol, data = item
+            result = await meter.run(loop, cpu_pool, _scan_symbol, symbol, data, tuple(methods), tuple(orders),
+                                     hold_mult, want_tables, kwargs)
+            await meter.put(scanned, result)
+
+    async def write_stage():
+        meter = meters['write']
+        while True:
+            result = await meter.get(scanned)
+            if result is None:
+                break
+            if writer is not None:
+                await meter.run(loop, write_pool, _write_all, writer, result)
+            else:
+                meter.items += 1
+            # 写出后只保留统计；不返回形态表格时丢弃表格，内存占用不随品种数增长
+            outputs.extend(out if return_patterns else out[:4] + (None,) for out in result)
+        if writer is not None:
+            await meter.run(loop, write_pool, writer.flush)
+
+    async def loaders_then_stop():
+        await asyncio.gather(*[load_stage() for _ in range(load_workers)])
+        for _ in range(scan_workers):
+            await loaded.put(None)
+
+    async def scanners_then_stop():
+        await asyncio.gather(*[scan_stage() for _ in range(scan_workers)])
+        await scanned.put(None)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(load_workers) as io_pool, ThreadPoolExecutor(1) as write_pool, \
+            ProcessPoolExecutor(scan_workers) as cpu_pool:
+        tasks = [asyncio.ensure_future(coro) for coro in (loaders_then_stop(), scanners_then_stop(), write_stage())]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # 任一阶段出错时取消其他阶段，避免它们阻塞在队列上
+            for task in tasks:
+                task.cancel()
+            raise
+    wall = time.perf_counter() - start
+
+    # 结果按到达顺序收集，整理成与输入相同的(品种, 方法, order)顺序
+    position = {symbol: k for k, symbol in enumerate(sources)}
+    outputs.sort(key=lambda out: (position[out[0]], list(methods).index(out[1]), list(orders).index(out[2])))
+    rows, index, patterns = [], [], {}
+    for symbol, method, order, stats, table in outputs:
+        for name in PATTERN_KINDS:
+            index.append((symbol, method, order, name))
+            rows.append(stats[name])
+        if return_patterns:
+            patterns[(symbol, method, order)] = table
+    results = pd.DataFrame(rows, columns=STAT_COLUMNS,
+                           index=pd.MultiIndex.from_tuples(index, names=['symbol', 'method', 'order', 'pattern']))
+    results['count'] = results['count'].astype(np.int64)
+    stages = pd.DataFrame([meter.row(wall) for meter in meters.values()]).set_index('stage')
+    if return_patterns:
+        return results, stages, patterns
+    return results, stages
+
+
+def _write_all(writer, result):
+    for symbol, method, order, _, table in result:
+        writer.write('patterns', table, symbol, method, order)
+
+
+def run_pipeline(sources: dict, orders, methods=('pips',), **kwargs):
+    """
+    run_pipeline_async的同步版本，参数和返回值相同
+
+    Jupyter中已经有运行中的事件循环，应直接使用 await run_pipeline_async(...)。
+    """
+    return asyncio.run(run_pipeline_async(sources, orders, methods, **kwargs))
@@ -0,0 +1,342 @@
+"""
+本地形态扫描服务（HTTP/JSON）
+
+分析时每次都要重新运行识别旗形形态_主程序.py或notebook：重新解析Excel、从头扫描。
+这个服务常驻内存，保存各品种的价格数组和扫描结果：
+- 同一(品种, 方法, order, 参数)的结果只计算一次，之后直接从内存返回；
+- 多个并发的相同请求合并为一次计算，其他请求等待同一个结果；
+- 价格和结果按最近最少使用（LRU）淘汰，总占用不超过memory_budget。
+
+用法:
+python -m flag_pattern.scan_service 上证指数数据.xlsx 旗形/BTCUSDT3600.csv --port 8765
+curl "http://127.0.0.1:8765/patterns?symbol=BTCUSDT3600&method=pips&order=12"
+curl "http://127.0.0.1:8765/pending?symbol=上证指数数据&method=trendline&order=10&within=0.005"
+
+接口（GET，参数放在查询字符串中）:
+/symbols                    可用的品种
+/patterns?symbol=&method=&order=[&max_pending=&阈值参数...]
+                            已确认的形态，列式JSON（与patterns_to_table的列相同，kind为形态名称）
+/pending?symbol=&method=&order=[&within=...]
+                            尚未确认的候选形态及其突破线（见breakout.pending_breakouts），
+                            within给出时只返回distance <= within的候选，按distance升序
+/stats                      缓存命中、合并、淘汰次数和内存占用
+
+参数错误（缺少symbol、order<3、max_pending<1、pip_distance不是1/2/3、未知参数）返回400，
+未知的品种或路径返回404，扫描过程中的其他错误返回500，响应体为{"error": 说明}。
+
+只使用标准库的http.server，适合本机或内网使用，不做鉴权。
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import fields, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+from .flag_pattern_algorithm_0328 import FlagParams, DEFAULT_FLAG_PARAMS, patterns_to_table
+from .incremental_scan import ResumableScanner
+from .breakout import pending_breakouts
+from .pattern_index import PATTERN_KINDS
+
+
+'''====================1.请求合并与LRU缓存==========================='''
+
+def _nbytes(value) -> int:
+    # 缓存条目的内存占用：数组或数组字典
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    return 0
+
+
+class CoalescingLRU:
+    """
+    合并并发请求的LRU缓存
+
+    get_or_compute(key, compute)：命中时直接返回；同一个key正在计算时，后来的请求等待同一个Future，
+    不重复计算；否则由当前线程计算并放入缓存。计算出错时异常传给所有等待者，结果不进入缓存。
+    总占用（按数组的nbytes计）超过budget时，从最久未使用的条目开始淘汰；单个条目超过budget时照常返回但不缓存。
+
+    参数:
+    budget: int - 内存预算（字节）
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._inflight = {}            # key -> Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+                owner = True
+        if not owner:
+            return future.result()
+
+        try:
+            value = compute()
+        except BaseException as exc:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            self._insert(key, value)
+        future.set_result(value)
+        return value
+
+    def _insert(self, key, value):
+        size = _nbytes(value)
+        if size > self.budget:
+            return
+        self._entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.budget:
+            _, (_, old) = self._entries.popitem(last=False)
+            self.nbytes -= old
+            self.evictions += 1
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'nbytes': self.nbytes, 'budget': self.budget,
+                    'hits': self.hits, 'misses': self.misses, 'coalesced': self.coalesced,
+                    'evictions': self.evictions}
+
+
+'''====================2.扫描服务==========================='''
+
+class ScanService:
+    """
+    常驻内存的形态扫描服务（不依赖HTTP，可以直接在Python中调用）
+
+    每个(品种, 方法, order, max_pending, 阈值参数)用一个ResumableScanner扫描完整序列，
+    保存已确认形态的表格和当前候选的突破线表格；价格数组按品种单独缓存，
+    同一品种的不同方法、order共用一次文件解析。价格和扫描结果共用一个LRU内存预算。
+
+    参数:
+    sources: dict - 品种代码 -> 文件路径（CSV/Excel）/ 返回价格数组的函数 / 价格数组
+    memory_budget: int - 缓存的内存预算（字节）
+    column, log: 读取文件时的价格列名和是否取对数，见scan_pipeline.load_prices
+    """
+
+    def __init__(self, sources: dict, memory_budget: int = 256 * 2 ** 20, column: str = 'close', log: bool = True):
+        self.sources = dict(sources)
+        self.column = column
+        self.log = log
+        self.cache = CoalescingLRU(memory_budget)
+
+    def prices(self, symbol: str) -> np.array:
+        """品种的价格数组（首次访问时加载）"""
+        if symbol not in self.sources:
+            raise KeyError(f"未知的品种: {symbol}")
+
+        def load():
+            from .scan_pipeline import _load  # 文件解析需要pandas，只在加载时导入
+            return _load(self.sources[symbol], self.column, self.log)
+        return self.cache.get_or_compute(('prices', symbol), load)
+
+    def scan(self, symbol: str, method: str = 'pips', order: int = 12, max_pending: int = 1,
+             params: FlagParams = None) -> dict:
+        """
+        品种的扫描结果
+
+        返回:
+        dict - {'patterns': 形态表格, 'pending': 候选突破线表格, 'bars': K线数, 'elapsed_ms': 计算耗时}
+        """
+        if method not in ('pips', 'trendline'):
+            raise ValueError(f"未知的识别方法: {method}")
+        key = ('scan', symbol, method, int(order), int(max_pending), params or DEFAULT_FLAG_PARAMS)
+
+        def compute():
+            data = self.prices(symbol)
+            start = time.perf_counter()
+            scanner = ResumableScanner(order, method, max_pending, params)
+            table = patterns_to_table(scanner.update(data))
+            pending = pending_breakouts(scanner)
+            return {'patterns': table, 'pending': pending, 'bars': np.int64(len(data)),
+                    'elapsed_ms': np.float64((time.perf_counter() - start) * 1000)}
+        return self.cache.get_or_compute(key, compute)
+
+    def patterns(self, symbol: str, method: str = 'pips', order: int = 12, **kwargs) -> dict:
+        """已确认的形态表格（与patterns_to_table(find_flags_pennants_*(...))相同）"""
+        return self.scan(symbol, method, order, **kwargs)['patterns']
+
+    def pending(self, symbol: str, method: str = 'pips', order: int = 12, within: float = None, **kwargs) -> dict:
+        """
+        接近突破的候选形态
+
+        参数:
+        within: float - 只返回distance <= within的候选（对数价格下0.005约为0.5%），None时返回全部
+        """
+        table = self.scan(symbol, method, order, **kwargs)['pending']
+        if within is None:
+            return table
+        keep = table['distance'] <= within
+        return {name: col[keep] for name, col in table.items()}
+
+
+'''====================3.HTTP接口==========================='''
+
+_PARAM_TYPES = {f.name: f.type for f in fields(FlagParams)}
+
+
+def _table_to_json(table: dict) -> dict:
+    # 列式表格 -> JSON，kind换成形态名称，NaN换成null
+    out = {}
+    for name, col in table.items():
+        if name == 'kind':
+            out[name] = [PATTERN_KINDS[k] for k in col.tolist()]
+        elif col.dtype.kind == 'f':
+            out[name] = [None if v != v else v for v in col.tolist()]
+        else:
+            out[name] = col.tolist()
+    return out
+
+
+def _scan_args(query: dict) -> dict:
+    # 查询字符串 -> ScanService.scan的参数；FlagParams的字段名可以直接作为阈值参数传入
+    args = {'method': query.pop('method', 'pips'), 'order': int(query.pop('order', 12)),
+            'max_pending': int(query.pop('max_pending', 1))}
+    overrides = {name: _PARAM_TYPES[name](query.pop(name)) for name in list(query) if name in _PARAM_TYPES}
+    if overrides:
+        args['params'] = replace(DEFAULT_FLAG_PARAMS, **overrides)
+    if query:
+        raise ValueError(f"未知的参数: {', '.join(sorted(query))}")
+    # 超出范围的参数在扫描中会得到IndexError等难以理解的错误，这里先拒绝并返回400
+    if args['order'] < 3:
+        raise ValueError(f"order至少为3: {args['order']}")
+    if args['max_pending'] < 1:
+        raise ValueError(f"max_pending至少为1: {args['max_pending']}")
+    if overrides.get('pip_distance', 3) not in (1, 2, 3):
+        raise ValueError(f"pip_distance只能是1、2、3: {overrides['pip_distance']}")
+    return args
+
+
+def make_handler(service: ScanService):
+    """
+    生成绑定到service的请求处理类，供ThreadingHTTPServer使用
+    """
+
+    class ScanHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            start = time.perf_counter()
+            try:
+                if url.path == '/symbols':
+                    body = {'symbols': list(service.sources)}
+                elif url.path == '/stats':
+                    body = service.cache.stats()
+                elif url.path in ('/patterns', '/pending'):
+                    symbol = query.pop('symbol', None)
+                    if symbol is None:
+                        raise ValueError("缺少参数: symbol")
+                    if symbol not in service.sources:
+                        return self._send(404, {'error': f"未知的品种: {symbol}"})
+                    within = query.pop('within', None)
+                    args = _scan_args(query)
+                    result = service.scan(symbol, **args)
+                    if url.path == '/patterns':
+                        table = result['patterns']
+                    else:
+                        table = service.pending(symbol, within=None if within is None else float(within), **args)
+                    body = {'symbol': symbol, **args, 'bars': int(result['bars']),
+                            'scan_ms': float(result['elapsed_ms']), 'count': int(len(table['kind'])),
+                            'columns': _table_to_json(table)}
+                    if 'params' in body:
+                        body['params'] = {f.name: getattr(body['params'], f.name) for f in fields(FlagParams)}
+                else:
+                    return self._send(404, {'error': f"未知的路径: {url.path}"})
+            except ValueError as exc:
+                return self._send(400, {'error': str(exc)})
+            except Exception as exc:
+                # 扫描中的其他错误（包括KeyError）是服务端的问题，返回500而不是让连接直接断开
+                return self._send(500, {'error': f"{type(exc).__name__}: {exc}"})
+            body['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            self._send(200, body)
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # 不在标准错误上逐条打印请求
+
+    return ScanHandler
+
+
+def serve(sources: dict, host: str = '127.0.0.1', port: int = 8765, memory_budget: int = 256 * 2 ** 20,
+          column: str = 'close', log: bool = True, block: bool = True):
+    """
+    启动扫描服务
+
+    参数:
+    sources: dict - 品种代码 -> 数据源，见ScanService
+    host, port: 监听地址，port=0时由系统分配（server.server_address[1]）
+    block: bool - True时在当前线程中运行直到中断；False时在后台线程中运行并立即返回
+
+    返回:
+    ThreadingHTTPServer - 服务器对象，service属性是对应的ScanService，shutdown()停止服务
+    """
+    service = ScanService(sources, memory_budget, column, log)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    server.service = service
+    if not block:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return server
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='本地形态扫描服务')
+    parser.add_argument('files', nargs='+', help='价格文件（CSV/Excel），品种代码取文件名（不含扩展名）')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--memory-mb', type=float, default=256.0, help='缓存的内存预算（MB）')
+    parser.add_argument('--column', default='close', help='价格列名（不区分大小写）')
+    args = parser.parse_args()
+
+    sources = {os.path.splitext(os.path.basename(path))[0]: path for path in args.files}
+    print(f"serving {len(sources)} symbols on http://{args.host}:{args.port}")
+    serve(sources, args.host, args.port, int(args.memory_mb * 2 ** 20), args.column)
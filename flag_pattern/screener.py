@@ -0,0 +1,167 @@
+import numpy as np
+from .incremental_scan import ResumableScanner
+from .breakout import pending_breakouts
+from .flag_pattern_algorithm_0328 import FlagParams
+
+
+# screen返回的列
+SCREEN_COLUMNS = ['symbol', 'kind', 'distance', 'level', 'last_y', 'slope', 'base_x', 'tip_x', 'level_x']
+
+
+'''====================1.全市场候选形态筛选器==========================='''
+
+class BreakoutScreener:
+    """
+    全市场"接近突破"筛选器
+
+    以前要回答"哪些品种有距离突破线不到0.5%的候选旗形"，只能对每个品种在全部历史上逐个调用检查函数。
+    这里每个品种保留一个ResumableScanner（候选池与尾部缓冲区），每个候选的突破线
+    （起点、旗杆顶点、突破价level、斜率slope、level对应的K线level_x，见breakout.pending_breakouts）
+    保存在形状为(品种数, 2 * max_pending)的紧凑数组中，空位的level为NaN。
+
+    - update：新K线收盘后推进各品种的扫描器，并重新计算这些品种所在的行；
+    - screen：用一次向量化运算计算全部品种全部候选到突破线的距离，筛选并排序，不再逐品种调用Python代码。
+
+    update仍然逐品种执行Python代码：每个收到新K线的品种都要推进扫描器、对每个候选重新计算突破线
+    （趋势线方法要重新拟合，PIP方法要重新寻找PIP点，level随新K线变化，不能沿用上一根K线的结果），
+    耗时与品种数 × 候选数成正比。粗略地说每个品种每根K线约0.1ms（max_pending=1）到0.4ms（max_pending=5），
+    200个品种每根K线需要几十到上百毫秒，具体取决于机器和候选数量；候选池为空的品种只清空所在的行。
+    适合按K线收盘批量更新；盘中只需要比较最新价时，不要调用update，把价格传给screen(prices=...)即可。
+    distance的定义与pending_breakouts相同（牛市level - 价格，熊市价格 - level），
+    价格按项目惯例为对数价格时，0.005约等于0.5%。
+
+    参数:
+    symbols: list - 品种代码
+    order: int - 滚动窗口大小参数
+    method: str - 'pips'或'trendline'
+    max_pending: int - 每个方向的候选池容量
+    params: FlagParams - 形态检查的阈值参数
+    max_span: int - 形态跨度上限，设置后每个品种的缓冲区长度有界（见ResumableScanner）
+    """
+
+    def __init__(self, symbols, order: int, method: str = 'pips', max_pending: int = 1, params: FlagParams = None,
+                 max_span: int = None):
+        self.symbols = np.array(list(symbols), dtype=object)
+        self._slot = {symbol: k for k, symbol in enumerate(self.symbols)}
+        self.scanners = [ResumableScanner(order, method, max_pending, params, max_span) for _ in self.symbols]
+
+        n, m = len(self.symbols), 2 * max_pending  # 每个方向最多max_pending个候选
+        self.kind = np.full((n, m), -1, dtype=np.int8)
+        self.level = np.full((n, m), np.nan)
+        self.slope = np.zeros((n, m))
+        self.base_x = np.full((n, m), -1, dtype=np.int64)
+        self.tip_x = np.full((n, m), -1, dtype=np.int64)
+        self.level_x = np.full((n, m), -1, dtype=np.int64)
+        self.last_y = np.full(n, np.nan)  # 各品种最后一根已收盘K线的价格
+
+    def __len__(self):
+        return len(self.symbols)
+
+    @property
+    def nbytes(self) -> int:
+        """候选数组与扫描器缓冲区占用的字节数"""
+        arrays = (self.kind, self.level, self.slope, self.base_x, self.tip_x, self.level_x, self.last_y)
+        return sum(a.nbytes for a in arrays) + sum(s.buffer.nbytes for s in self.scanners)
+
+    def _refresh(self, k: int):
+        # 重新计算第k个品种的候选突破线，写入第k行
+        scanner = self.scanners[k]
+        if len(scanner.pending_bulls) or len(scanner.pending_bears):
+            table = pending_breakouts(scanner)
+            count = len(table['kind'])
+        else:
+            table, count = None, 0  # 没有候选，不需要逐个计算突破线
+        for name in ('kind', 'level', 'slope', 'base_x', 'tip_x', 'level_x'):
+            row = getattr(self, name)[k]
+            if count:
+                row[:count] = table[name]
+            row[count:] = np.nan if name == 'level' else (0 if name == 'slope' else -1)
+        if len(scanner.buffer):
+            self.last_y[k] = scanner.buffer[-1]
+
+    def update(self, bars) -> list:
+        """
+        追加新收盘的K线
+
+        参数:
+        bars: dict/np.array - 品种代码 -> 新K线价格（一个值或一段数组）；
+              或与symbols对齐的数组，NaN表示该品种这一根K线没有数据（停牌等）
+
+        返回:
+        list - 本次新确认的形态，(品种代码, (bull_flags, bear_flags, bull_pennants, bear_pennants))，只包含有确认的品种
+        """
+        if not isinstance(bars, dict):
+            values = np.asarray(bars, dtype=np.float64)
+            assert(len(values) == len(self.symbols))
+            bars = {self.symbols[k]: values[k] for k in np.flatnonzero(~np.isnan(values))}
+        confirmed = []
+        for symbol, new in bars.items():
+            k = self._slot[symbol]
+            found = self.scanners[k].update(np.atleast_1d(np.asarray(new, dtype=np.float64)))
+            if any(found):
+                confirmed.append((symbol, found))
+            self._refresh(k)
+        return confirmed
+
+    def distances(self, prices: np.array = None, bars_ahead: int = 0) -> np.array:
+        """
+        全部候选到突破线的距离，形状(品种数, 2 * max_pending)，空位为NaN
+
+        参数:
+        prices: np.array - 与symbols对齐的当前价格（例如盘中最新价），None时使用各品种最后一根收盘价
+        bars_ahead: int - 在level_x之后第几根K线上比较，突破线按slope外推（0即下一根K线）
+        """
+        price = self.last_y if prices is None else np.asarray(prices, dtype=np.float64)
+        level = self.level + self.slope * bars_ahead
+        sign = np.where(self.kind % 2 == 0, 1.0, -1.0)  # PATTERN_KINDS中偶数下标是牛市
+        return sign * (level - price[:, None])
+
+    def screen(self, within: float = None, prices: np.array = None, bars_ahead: int = 0, top: int = None,
+               include_crossed: bool = False) -> dict:
+        """
+        筛选接近突破的候选，按distance升序排列
+
+        参数:
+        within: float - 只保留distance <= within的候选，None时不限制
+        prices, bars_ahead: 见distances
+        top: int - 只返回距离最近的top个
+        include_crossed: bool - 是否保留distance < 0（已越过突破线、尚未确认）的候选
+
+        返回:
+        dict - 列见SCREEN_COLUMNS，symbol为品种代码，kind为PATTERN_KINDS中的序号
+        """
+        dist = self.distances(prices, bars_ahead)
+        keep = ~np.isnan(dist)
+        if within is not None:
+            keep &= dist <= within
+        if not include_crossed:
+            keep &= dist >= 0
+        rows, cols = np.nonzero(keep)
+        d = dist[rows, cols]
+        if top is not None and top < len(d):
+            part = np.argpartition(d, top)[:top]
+            rows, cols, d = rows[part], cols[part], d[part]
+        order = np.argsort(d, kind='stable')
+        rows, cols, d = rows[order], cols[order], d[order]
+
+        price = self.last_y if prices is None else np.asarray(prices, dtype=np.float64)
+        return {'symbol': self.symbols[rows], 'kind': self.kind[rows, cols], 'distance': d,
+                'level': self.level[rows, cols] + self.slope[rows, cols] * bars_ahead, 'last_y': price[rows],
+                'slope': self.slope[rows, cols], 'base_x': self.base_x[rows, cols],
+                'tip_x': self.tip_x[rows, cols], 'level_x': self.level_x[rows, cols] + bars_ahead}
+
+
+def build_screener(series: dict, order: int, method: str = 'pips', **kwargs) -> BreakoutScreener:
+    """
+    用各品种的历史价格初始化筛选器
+
+    参数:
+    series: dict - 品种代码 -> 历史价格数组（对数价格）
+    其他参数见BreakoutScreener
+
+    返回:
+    BreakoutScreener - 已扫描完历史、可以继续update的筛选器
+    """
+    screener = BreakoutScreener(list(series), order, method, **kwargs)
+    screener.update(series)
+    return screener
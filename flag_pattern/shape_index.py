@@ -0,0 +1,284 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+'''====================1.批量PIP点==========================='''
+
+def find_pips_many(windows: np.array, n_pips: int, dist_measure: int):
+    """
+    对许多等长窗口同时计算PIP点，逐行结果与find_pips(windows[r], n_pips, dist_measure)相同
+
+    find_pips逐点循环，每个窗口几十微秒，上百万个历史窗口需要几十分钟。
+    这里每轮对所有窗口的所有点一次性计算到所在区间连线的距离：用累积最大/最小值找出每个点左右相邻的PIP点，
+    距离公式与find_pips逐项相同，取每行第一个最大值（与find_pips中严格大于的比较一致）。
+    所有点都落在连线上（距离全为0）的退化窗口，find_pips的结果没有意义，这里取第一个非PIP点。
+
+    参数:
+    windows: np.array - 形状(m, w)的价格窗口，w >= n_pips
+    n_pips: int - PIP点数量
+    dist_measure: int - 距离度量，见find_pips
+
+    返回:
+    pips_x: np.array - 形状(m, n_pips)的PIP点位置（窗口内索引，升序）
+    pips_y: np.array - 形状(m, n_pips)的PIP点价格
+    """
+    windows = np.asarray(windows, dtype=np.float64)
+    m, w = windows.shape
+    rows = np.arange(m)[:, None]
+    pos = np.arange(w)
+    is_pip = np.zeros((m, w), dtype=bool)
+    is_pip[:, [0, w - 1]] = True
+
+    for _ in range(2, n_pips):
+        # 每个点左右相邻的PIP点
+        left = np.maximum.accumulate(np.where(is_pip, pos, 0), axis=1)
+        right = np.minimum.accumulate(np.where(is_pip, pos, w - 1)[:, ::-1], axis=1)[:, ::-1]
+        left_y = windows[rows, left]
+        right_y = windows[rows, right]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (right_y - left_y) / (right - left)  # PIP点本身right == left，结果不会被使用
+        intercept = left_y - left * slope
+        if dist_measure == 1:
+            d = ((left - pos) ** 2 + (left_y - windows) ** 2) ** 0.5
+            d += ((right - pos) ** 2 + (right_y - windows) ** 2) ** 0.5
+        elif dist_measure == 2:
+            d = np.abs((slope * pos + intercept) - windows) / (slope ** 2 + 1) ** 0.5
+        else:
+            d = np.abs((slope * pos + intercept) - windows)
+        d[is_pip] = -np.inf
+        is_pip[np.arange(m), d.argmax(axis=1)] = True
+
+    pips_x = np.nonzero(is_pip)[1].reshape(m, n_pips)
+    return pips_x, windows[rows, pips_x]
+
+
+'''====================2.形状描述向量==========================='''
+
+def pip_descriptor(pips_x: np.array, pips_y: np.array) -> np.array:
+    """
+    把PIP点归一化为定长的形状描述向量
+
+    横坐标除以窗口长度缩放到[0, 1]，去掉恒为0和1的首尾两个；纵坐标按窗口内PIP点的最高、最低价缩放到[0, 1]。
+    描述向量与价格水平、波动幅度和窗口长度无关，n个PIP点对应2n - 2维，可以直接用欧氏距离比较。
+
+    参数:
+    pips_x, pips_y: np.array - 一组PIP点（一维），或形状(m, n_pips)的多组PIP点
+
+    返回:
+    np.array - float32描述向量，形状(2 * n_pips - 2,)或(m, 2 * n_pips - 2)
+    """
+    x = np.atleast_2d(np.asarray(pips_x, dtype=np.float64))
+    y = np.atleast_2d(np.asarray(pips_y, dtype=np.float64))
+    span = x[:, -1:] - x[:, :1]
+    low = y.min(axis=1, keepdims=True)
+    height = y.max(axis=1, keepdims=True) - low
+    xs = (x[:, 1:-1] - x[:, :1]) / np.where(span > 0, span, 1.0)
+    ys = (y - low) / np.where(height > 0, height, 1.0)
+    out = np.ascontiguousarray(np.hstack([xs, ys]), dtype=np.float32)
+    return out[0] if np.ndim(pips_x) == 1 else out
+
+
+def window_descriptors(data: np.array, window: int, step: int = 1, n_pips: int = 5, dist_measure: int = 3,
+                       chunk: int = 65536):
+    """
+    所有长度为window的滑动窗口的描述向量
+
+    参数:
+    data: np.array - 价格数组
+    window: int - 窗口长度
+    step: int - 相邻窗口起点的间隔
+    n_pips, dist_measure: 见find_pips
+    chunk: int - 每批计算的窗口数，限制临时数组的内存
+
+    返回:
+    descriptors: np.array - 形状(窗口数, 2 * n_pips - 2)的float32描述向量
+    starts: np.array - 每个窗口的起点，窗口为data[start:start + window]
+    """
+    data = np.asarray(data, dtype=np.float64)
+    views = sliding_window_view(data, window)[::step] if len(data) >= window else np.zeros((0, window))
+    starts = np.arange(len(views), dtype=np.int64) * step
+    out = np.empty((len(views), 2 * n_pips - 2), dtype=np.float32)
+    for pos in range(0, len(views), chunk):
+        pips_x, pips_y = find_pips_many(views[pos:pos + chunk], n_pips, dist_measure)
+        out[pos:pos + chunk] = pip_descriptor(pips_x, pips_y)
+    return out, starts
+
+
+def pattern_descriptors(table: dict, data: np.array, n_pips: int = 5, dist_measure: int = 3) -> np.array:
+    """
+    已确认形态的描述向量：旗帜部分data[tip_x:conf_x + 1]的PIP点，与check_*_pattern_pips确认时使用的窗口相同
+
+    参数:
+    table: dict - 形态表格（patterns_to_table的返回值）
+    data: np.array - 识别时使用的价格数组
+    n_pips, dist_measure: 见find_pips（PIP方法的默认值为5和FlagParams.pip_distance=3）
+
+    返回:
+    np.array - 形状(形态数, 2 * n_pips - 2)的float32描述向量，与表格逐行对应
+    """
+    return _span_descriptors(data, np.asarray(table['tip_x']), np.asarray(table['conf_x']) + 1, n_pips, dist_measure)
+
+
+def pending_descriptors(scanner, n_pips: int = 5, dist_measure: int = 3) -> dict:
+    """
+    增量扫描器中各候选形态当前的描述向量，用于查找历史上形状相似的形态
+
+    旗帜部分取旗杆顶点（熊市为底点）到最后一根K线，与PIP方法检查下一根K线时的窗口只差确认K线本身。
+
+    返回:
+    dict - 'bull'（是否牛市候选）、'base_x'、'tip_x'（绝对索引）和'descriptor'（形状(候选数, 2 * n_pips - 2)）；
+           旗帜部分不足n_pips根K线的候选不包含在内
+    """
+    data = scanner.buffer
+    end = len(data)
+    bull, base, tip = [], [], []
+    for is_bull, pool in ((True, scanner.pending_bulls), (False, scanner.pending_bears)):
+        for pending in pool:
+            if scanner.method == 'trendline':
+                t = pending.tip_x
+            else:
+                part = data[pending.base_x:end]
+                t = pending.base_x + int(part.argmax() if is_bull else part.argmin())
+            if end - t >= n_pips:
+                bull.append(is_bull)
+                base.append(pending.base_x)
+                tip.append(t)
+    tip = np.array(tip, dtype=np.int64)
+    return {'bull': np.array(bull, dtype=bool), 'base_x': np.array(base, dtype=np.int64) + scanner.offset,
+            'tip_x': tip + scanner.offset,
+            'descriptor': _span_descriptors(data, tip, np.full(len(tip), end), n_pips, dist_measure)}
+
+
+def _span_descriptors(data: np.array, start: np.array, end: np.array, n_pips: int, dist_measure: int) -> np.array:
+    # 长度不同的窗口按长度分组，每组用find_pips_many一次计算
+    data = np.asarray(data, dtype=np.float64)
+    out = np.zeros((len(start), 2 * n_pips - 2), dtype=np.float32)
+    length = end - start
+    for w in np.unique(length):
+        sel = np.flatnonzero(length == w)
+        windows = data[start[sel, None] + np.arange(w)]
+        out[sel] = pip_descriptor(*find_pips_many(windows, n_pips, dist_measure))
+    return out
+
+
+'''====================3.相似形态索引==========================='''
+
+class ShapeIndex:
+    """
+    描述向量的最近邻索引（向量化暴力搜索）
+
+    描述向量只有2 * n_pips - 2维（默认8维），暴力搜索就是一次矩阵乘法：
+    ‖x - q‖² = ‖x‖² - 2x·q + ‖q‖²，向量按连续的float32矩阵保存，‖x‖²预先算好，
+    再用argpartition取前k个。百万级窗口单次查询在几十毫秒内完成，没有KD树的构建和维护成本。
+
+    每个向量可以附带任意元数据列（品种、起点、形态类型等），查询结果按行号返回，可以用meta取回。
+
+    参数:
+    dim: int - 描述向量维数
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+        self.meta = {}
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @property
+    def nbytes(self) -> int:
+        """向量与元数据占用的字节数"""
+        return self.vectors.nbytes + self.norms.nbytes + sum(col.nbytes for col in self.meta.values())
+
+    def add(self, vectors: np.array, **meta):
+        """
+        追加描述向量
+
+        参数:
+        vectors: np.array - 形状(m, dim)的描述向量
+        meta: 与vectors逐行对应的元数据列，例如symbol=..., start=...；已有的列每次都要提供
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        m = len(vectors)
+        if len(self) and set(meta) != set(self.meta):
+            raise ValueError(f"元数据列不一致: {sorted(meta)} != {sorted(self.meta)}")
+        for name, col in meta.items():
+            col = np.asarray(col)
+            if col.ndim == 0:
+                col = np.full(m, col)
+            if len(col) != m:
+                raise ValueError(f"元数据列{name}的长度{len(col)}与向量数{m}不一致")
+            self.meta[name] = np.concatenate([self.meta[name], col]) if name in self.meta and len(self) else col
+        norms = np.einsum('ij,ij->i', vectors, vectors)
+        self.vectors = np.concatenate([self.vectors, vectors]) if len(self) else vectors
+        self.norms = np.concatenate([self.norms, norms])
+
+    def query(self, q: np.array, k: int = 10, mask: np.array = None):
+        """
+        与q最相似的k个向量
+
+        参数:
+        q: np.array - 一个描述向量（dim,），或形状(m, dim)的一批查询
+        k: int - 返回的数量
+        mask: np.array - 与索引等长的布尔数组，只在为True的向量中搜索（例如只搜索某类形态、排除查询自身所在的区间）
+
+        返回:
+        indices: np.array - 行号，按距离升序；批量查询时形状为(m, k)；
+                 mask保留的向量不足k个时只返回保留的向量
+        distances: np.array - 对应的欧氏距离
+        """
+        q = np.asarray(q, dtype=np.float32)
+        single = q.ndim == 1
+        q = q.reshape(-1, self.dim)
+        d2 = self.norms[None, :] - 2.0 * (q @ self.vectors.T) + np.einsum('ij,ij->i', q, q)[:, None]
+        n = d2.shape[1]
+        if mask is not None:
+            mask = np.asarray(mask, dtype=bool)
+            d2[:, ~mask] = np.inf
+            n = int(mask.sum())  # 被排除的向量距离为inf，排在最后，只取前n个即可把它们去掉
+        k = min(k, n)
+        if 0 < k < d2.shape[1]:
+            part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+        else:
+            part = np.tile(np.arange(k), (len(q), 1))
+        rows = np.arange(len(q))[:, None]
+        order = np.argsort(d2[rows, part], axis=1, kind='stable')
+        indices = part[rows, order]
+        distances = np.sqrt(np.maximum(d2[rows, indices], 0.0))
+        if single:
+            return indices[0], distances[0]
+        return indices, distances
+
+    def save(self, path: str):
+        """保存为.npz文件"""
+        np.savez(path, vectors=self.vectors, **{'meta_' + name: col for name, col in self.meta.items()})
+
+    @classmethod
+    def load(cls, path: str):
+        """从save保存的.npz文件恢复"""
+        with np.load(path, allow_pickle=False) as f:
+            index = cls(f['vectors'].shape[1])
+            meta = {name[5:]: f[name] for name in f.files if name.startswith('meta_')}
+            if len(f['vectors']):
+                index.add(f['vectors'], **meta)
+        return index
+
+
+def build_window_index(series: dict, window: int, step: int = 1, n_pips: int = 5, dist_measure: int = 3) -> ShapeIndex:
+    """
+    为多个品种的所有历史滑动窗口建立相似形态索引
+
+    参数:
+    series: dict - 品种代码 -> 价格数组
+    window, step, n_pips, dist_measure: 见window_descriptors
+
+    返回:
+    ShapeIndex - 元数据列symbol（品种代码）和start（窗口起点）
+    """
+    index = ShapeIndex(2 * n_pips - 2)
+    for symbol, data in series.items():
+        descriptors, starts = window_descriptors(data, window, step, n_pips, dist_measure)
+        if len(descriptors):
+            index.add(descriptors, symbol=np.full(len(starts), str(symbol)), start=starts)
+    return index
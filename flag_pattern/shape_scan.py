@@ -0,0 +1,158 @@
+from dataclasses import replace
+import numpy as np
+from .important_point_algorithm import find_pips, rw_top, rw_bottom
+from .flag_pattern_algorithm_0328 import FlagPattern, FlagParams, DEFAULT_FLAG_PARAMS, patterns_to_table
+from .pattern_pool import PendingPool
+from .pattern_index import PATTERN_KINDS
+from .range_index import RangeIndex
+
+
+# 形态类型：前四种与PATTERN_KINDS相同，楔形和三角形排在后面
+SHAPE_KINDS = PATTERN_KINDS + ['bull_wedge', 'bear_wedge', 'bull_triangle', 'bear_triangle']
+
+
+'''====================1.单个候选的形态分类==========================='''
+
+def classify_pips(base_x: int, base_y: float, y: np.array, i: int, order: int, params: FlagParams,
+                  index: RangeIndex):
+    """
+    在第i根K线上对一个候选计算一次旗杆、旗帜宽高、PIP点和两条边界线，再分给各形态的判定条件
+
+    y是按牛市方向摆正的价格：牛市候选传入data和base_y，熊市候选传入-data和-base_y。取负是精确的，
+    比较、减法、除法在取负后结果只差一个符号，因此熊市候选得到的判断与check_bear_pattern_pips完全相同。
+    在摆正后的坐标中，upper是连接第1、3个PIP点的突破线（牛市阻力线、熊市支撑线），lower是连接第2、4个PIP点的另一条线。
+
+    - 旗形/三角旗：与check_*_pattern_pips的条件完全相同；
+    - 楔形/三角形：两条线在旗帜区域内相交（交点在[0, pips_x[4]]之间，原检查函数因此拒绝的候选），
+      且最后一个PIP点突破了upper。两条线斜率同号为楔形，否则为三角形。
+
+    返回:
+    tuple - (类型, 几何参数)，类型为'flag'、'pennant'、'wedge'、'triangle'或None（不构成任何形态）；
+            几何参数是摆正坐标中的tip_x、flag_width、flag_height、pole_width、pole_height和两条线
+    """
+    tip = index.argmax(base_x, i + 1)
+    pole_width = tip - base_x
+    if i - tip < max(params.min_flag_width, order * params.min_flag_width_order):
+        return None, None
+    flag_width = i - tip
+    if flag_width > pole_width * params.max_flag_width_ratio:
+        return None, None
+    pole_height = y[tip] - base_y
+    flag_height = y[tip] - index.min(tip, i + 1)
+    if flag_height > pole_height * params.max_flag_height_ratio:
+        return None, None
+
+    pips_x, pips_y = find_pips(y[tip:i + 1], 5, params.pip_distance)
+    if not (pips_y[2] > pips_y[1] and pips_y[2] > pips_y[3]):
+        return None, None
+
+    upper_slope = (pips_y[2] - pips_y[0]) / (pips_x[2] - pips_x[0])
+    upper_intercept = pips_y[0]
+    lower_slope = (pips_y[3] - pips_y[1]) / (pips_x[3] - pips_x[1])
+    lower_intercept = pips_y[1] + (pips_x[0] - pips_x[1]) * lower_slope
+    if upper_slope != lower_slope:
+        intersection = (lower_intercept - upper_intercept) / (upper_slope - lower_slope)
+    else:
+        intersection = -flag_width * 100
+
+    if pips_y[4] < pips_y[0] + upper_slope * pips_x[4]:
+        return None, None  # 没有突破
+    if 0 <= intersection <= pips_x[4]:
+        kind = 'wedge' if upper_slope * lower_slope > 0 else 'triangle'
+    elif intersection < 0 and intersection > -1.0 * flag_width * params.divergence_ratio:
+        return None, None  # 严重发散
+    else:
+        kind = 'pennant' if lower_slope > 0 else 'flag'
+
+    geometry = {'tip_x': tip, 'flag_width': flag_width, 'flag_height': flag_height, 'pole_width': pole_width,
+                'pole_height': pole_height, 'upper': (upper_slope, upper_intercept),
+                'lower': (lower_slope, lower_intercept)}
+    return kind, geometry
+
+
+def _fill(pending: FlagPattern, geometry: dict, data: np.array, i: int, bull: bool):
+    # 把摆正坐标中的几何参数写回候选（熊市候选的价格和截距取回负号）
+    sign = 1.0 if bull else -1.0
+    tip = geometry['tip_x']
+    upper = (geometry['upper'][0] * sign, geometry['upper'][1] * sign)
+    lower = (geometry['lower'][0] * sign, geometry['lower'][1] * sign)
+    resist, support = (upper, lower) if bull else (lower, upper)
+    pending.tip_x = tip
+    pending.tip_y = data[tip]
+    pending.conf_x = i
+    pending.conf_y = data[i]
+    pending.flag_width = geometry['flag_width']
+    pending.flag_height = geometry['flag_height']
+    pending.pole_width = geometry['pole_width']
+    pending.pole_height = geometry['pole_height']
+    pending.support_slope, pending.support_intercept = support
+    pending.resist_slope, pending.resist_intercept = resist
+
+
+'''====================2.一次扫描识别所有形态==========================='''
+
+def find_shapes_pips(data: np.array, order: int, max_pending: int = 1, bull_priority=None, bear_priority=None,
+                     params: FlagParams = None, max_span: int = None) -> dict:
+    """
+    一次扫描同时识别旗形、三角旗、楔形和三角形（PIP方法）
+
+    check_*_pattern_pips拒绝两条边界线在旗帜区域内相交的候选，这些正是楔形/三角形；
+    单独写楔形检测需要把同样的数据再扫描一遍，重新计算局部极值、PIP点和边界线。
+    这里每个候选在每根K线上只计算一次（classify_pips），再按条件分到各形态：
+    - 旗形/三角旗与find_flags_pennants_pips(data, order, max_pending, bull_priority, bear_priority, params,
+      max_span=max_span)完全相同，确认后移出候选池；
+    - 楔形/三角形不移出候选池（否则会改变之后旗形的识别结果），同一个候选只记录第一次突破。
+
+    参数:
+    data: np.array - 价格数组
+    其他参数见find_flags_pennants_pips
+
+    返回:
+    dict - 形态表格（与patterns_to_table的列相同），kind是SHAPE_KINDS中的下标；
+           kind < 4 的行与patterns_to_table(find_flags_pennants_pips(...))逐行相同
+    """
+    assert(order >= 3)
+    if params is None:
+        params = DEFAULT_FLAG_PARAMS
+    data = np.asarray(data, dtype=np.float64)
+    mirrored = -data
+    sides = {True: (data, RangeIndex(data)), False: (mirrored, RangeIndex(mirrored))}
+    pending_bulls = PendingPool(max_pending, bull_priority)
+    pending_bears = PendingPool(max_pending, bear_priority)
+    found = {name: [] for name in SHAPE_KINDS}
+    recorded = set()  # 已记录楔形/三角形的候选：(方向, base_x)
+
+    def confirm(pool: PendingPool, bull: bool, i: int):
+        y, index = sides[bull]
+        prefix = 'bull_' if bull else 'bear_'
+        confirmed = []
+        for pending in pool:
+            base_y = pending.base_y if bull else -pending.base_y  # 熊市候选的起点价格同样取负
+            kind, geometry = classify_pips(pending.base_x, base_y, y, i, order, params, index)
+            if kind is None:
+                continue
+            if kind in ('flag', 'pennant'):
+                _fill(pending, geometry, data, i, bull)
+                pending.pennant = kind == 'pennant'
+                found[prefix + kind].append(pending)
+                confirmed.append(pending)
+            elif (bull, pending.base_x) not in recorded:
+                recorded.add((bull, pending.base_x))
+                shape = replace(pending)
+                _fill(shape, geometry, data, i, bull)
+                found[prefix + kind].append(shape)
+        pool.remove(confirmed)
+
+    for i in range(len(data)):
+        # 与find_flags_pennants_pips的循环体保持一致
+        if max_span is not None:
+            pending_bulls.expire(i - max_span)
+            pending_bears.expire(i - max_span)
+        if rw_top(data, i, order):
+            pending_bears.push(FlagPattern(i - order, data[i - order]))
+        if rw_bottom(data, i, order):
+            pending_bulls.push(FlagPattern(i - order, data[i - order]))
+        confirm(pending_bears, False, i)
+        confirm(pending_bulls, True, i)
+
+    return patterns_to_table([found[name] for name in SHAPE_KINDS])
@@ -0,0 +1,237 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .pattern_index import PATTERN_KINDS
+from .order_sweep import pattern_returns
+
+
+# 每种形态输出的检验指标
+SIGNIFICANCE_COLUMNS = ['count', 'avg', 'wr', 'null_avg', 'null_wr', 'p_avg', 'p_wr', 'p_perm',
+                        'ci_low', 'ci_high', 'p_boot']
+
+_BULL_KINDS = (PATTERN_KINDS.index('bull_flag'), PATTERN_KINDS.index('bull_pennant'))
+
+# 每批重抽样的矩阵元素上限，限制内存占用
+_CHUNK_ELEMENTS = 1 << 22
+
+
+def _as_seed_sequence(seed) -> np.random.SeedSequence:
+    """整数/None/SeedSequence统一转换为SeedSequence，子任务用spawn派生互不相关的随机流"""
+    return seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+
+def _chunks(n_resamples: int, width: int):
+    """把n_resamples次重抽样分批，每批的(批大小 × width)不超过_CHUNK_ELEMENTS"""
+    step = max(1, _CHUNK_ELEMENTS // max(width, 1))
+    for lo in range(0, n_resamples, step):
+        yield lo, min(lo + step, n_resamples)
+
+
+'''====================1.随机入场基准==========================='''
+
+def random_entry_returns(data: np.array, hold: np.array, direction: np.array, size: int,
+                         rng: np.random.Generator) -> np.array:
+    """
+    随机入场日期的持有期收益，持有期和方向与形态一一对应
+
+    第j列的入场点在[0, n - hold[j])中均匀抽取，持有hold[j]根K线，方向为direction[j]，
+    因此每一行都是与形态样本"持有期分布、多空方向"完全相同的一组随机交易。
+
+    参数:
+    data: np.array - 对数价格数组
+    hold: np.array - 每个形态的持有K线数
+    direction: np.array - 每个形态的方向，1为做多、-1为做空
+    size: int - 行数（随机交易组数）
+    rng: np.random.Generator - 随机数生成器
+
+    返回:
+    np.array - 形状为(size, 形态数)的收益矩阵
+    """
+    entry = rng.integers(0, len(data) - hold, size=(size, len(hold)))
+    return direction * (data[entry + hold] - data[entry])
+
+
+def block_bootstrap_indices(m: int, block_size: int, size: int, rng: np.random.Generator) -> np.array:
+    """
+    移动块自助法(moving block bootstrap)的重抽样下标
+
+    形态按确认时间排序后，相邻形态的收益往往相关（持有期重叠、同一段行情），
+    逐个独立重抽样会低估方差。这里每次抽取若干个长度为block_size的连续块拼接，保留块内的相关性。
+
+    返回:
+    np.array - 形状为(size, m)的下标矩阵
+    """
+    block_size = max(1, min(block_size, m))
+    n_blocks = -(-m // block_size)
+    starts = rng.integers(0, m - block_size + 1, size=(size, n_blocks))
+    return (starts[:, :, None] + np.arange(block_size)).reshape(size, -1)[:, :m]
+
+
+'''====================2.单个形态类型的检验==========================='''
+
+def _test_kind(returns: np.array, hold: np.array, direction: np.array, data: np.array, n_resamples: int,
+               block_size: int, confidence: float, rng: np.random.Generator) -> tuple:
+    """
+    对一种形态的收益样本（已按确认时间排序、已去掉NaN）做三项检验
+
+    - 随机入场检验：每次重抽样生成一组持有期匹配的随机交易，p值为随机组的平均收益/胜率
+      不低于形态样本的比例
+    - 置换检验：形态样本与一个大的随机入场样本合并，随机打乱标签，检验两组平均收益之差
+    - 块自助法：形态收益的平均值置信区间，p值为自助平均值不高于随机入场基准的比例
+    """
+    m = len(returns)
+    avg = returns.mean()
+    wr = (returns > 0).mean()
+
+    # 随机入场检验
+    null_avg = np.empty(n_resamples)
+    null_wr = np.empty(n_resamples)
+    for lo, hi in _chunks(n_resamples, m):
+        r = random_entry_returns(data, hold, direction, hi - lo, rng)
+        null_avg[lo:hi] = r.mean(axis=1)
+        null_wr[lo:hi] = (r > 0).mean(axis=1)
+    base_avg = null_avg.mean()
+
+    # 置换检验：参考样本取20倍形态数量（至少5000笔）的随机入场交易，持有期和方向按形态循环使用，
+    # 参考样本越大，观测统计量受这一次随机抽取的影响越小
+    reps = max(20, -(-5000 // m))
+    reference = random_entry_returns(data, np.tile(hold, reps), np.tile(direction, reps), 1, rng)[0]
+    pooled = np.concatenate([returns, reference])
+    total = pooled.sum()
+    observed = avg - (total - returns.sum()) / len(reference)
+    perm_hits = 0
+    for lo, hi in _chunks(n_resamples, len(pooled)):
+        # 每行随机选出m个位置作为"形态组"，等价于打乱标签后取前m个
+        pick = np.argpartition(rng.random((hi - lo, len(pooled))), m - 1, axis=1)[:, :m]
+        group = pooled[pick].sum(axis=1)
+        diff = group / m - (total - group) / len(reference)
+        perm_hits += int((diff >= observed).sum())
+
+    # 块自助法
+    if block_size is None:
+        block_size = int(np.ceil(m ** (1 / 3)))
+    boot = np.empty(n_resamples)
+    for lo, hi in _chunks(n_resamples, m):
+        boot[lo:hi] = returns[block_bootstrap_indices(m, block_size, hi - lo, rng)].mean(axis=1)
+    alpha = (1.0 - confidence) / 2.0
+    ci_low, ci_high = np.quantile(boot, [alpha, 1.0 - alpha])
+
+    # p值都加1平滑，避免有限次重抽样得到0
+    return (m, avg, wr, base_avg, null_wr.mean(),
+            (1 + int((null_avg >= avg).sum())) / (n_resamples + 1),
+            (1 + int((null_wr >= wr).sum())) / (n_resamples + 1),
+            (1 + perm_hits) / (n_resamples + 1),
+            ci_low, ci_high,
+            (1 + int((boot <= base_avg).sum())) / (n_resamples + 1))
+
+
+def _significance_rows(table: dict, data: np.array, hold_mult: float, n_resamples: int, block_size: int,
+                       confidence: float, seed) -> dict:
+    """
+    计算一个品种所有形态类型的检验结果，返回 形态类型 -> 指标元组（只依赖NumPy，供工作进程调用）
+    """
+    data = np.asarray(data, dtype=float)
+    conf_x = np.asarray(table['conf_x'], dtype=np.int64)
+    kinds = np.asarray(table['kind'])
+    hold = (np.asarray(table['flag_width']) * hold_mult).astype(np.int64)
+    returns = pattern_returns(table, data, hold_mult)
+
+    # 每种形态一个独立的随机流，某种形态的数量变化不影响其他形态的结果
+    streams = _as_seed_sequence(seed).spawn(len(PATTERN_KINDS))
+    rows = {}
+    for k, name in enumerate(PATTERN_KINDS):
+        # 与pattern_returns口径一致：持有期超出数据范围的形态不参与检验；持有期为0的形态收益恒为0，也不参与
+        mask = (kinds == k) & ~np.isnan(returns) & (hold > 0)
+        if not mask.any():
+            rows[name] = (0,) + (np.nan,) * (len(SIGNIFICANCE_COLUMNS) - 1)
+            continue
+        order = np.argsort(conf_x[mask], kind='stable')
+        direction = 1.0 if k in _BULL_KINDS else -1.0
+        rows[name] = _test_kind(returns[mask][order], hold[mask][order], np.full(int(mask.sum()), direction),
+                                data, n_resamples, block_size, confidence, np.random.default_rng(streams[k]))
+    return rows
+
+
+'''====================3.对外接口==========================='''
+
+def run_significance(table: dict, data: np.array, hold_mult: float = 1.0, n_resamples: int = 10000,
+                     block_size: int = None, confidence: float = 0.95, seed=None) -> 'pd.DataFrame':
+    """
+    检验形态收益是否显著优于随机入场
+
+    原先的统计只给出胜率和平均收益，无法判断它们是否只是行情本身的漂移（例如长期上涨的市场里
+    任意做多都有超过50%的胜率）。这里用持有期和方向都与形态匹配的随机入场交易作为基准：
+    - p_avg / p_wr: 随机入场检验，随机组平均收益/胜率不低于形态的比例
+    - p_perm: 置换检验，形态与随机入场交易的平均收益之差
+    - ci_low / ci_high / p_boot: 移动块自助法的平均收益置信区间，以及自助平均值不高于随机基准的比例
+    所有重抽样都按批向量化计算；结果由seed完全确定。
+
+    参数:
+    table: dict - 形态表格（patterns_to_table的返回值）
+    data: np.array - 对数价格数组（与识别时使用的一致）
+    hold_mult: float - 持有期乘数，持有K线数 = int(flag_width * hold_mult)
+    n_resamples: int - 重抽样次数
+    block_size: int - 自助法的块长度，默认为形态数的立方根（向上取整）
+    confidence: float - 置信区间的置信水平
+    seed: int/SeedSequence - 随机种子，None时每次结果不同
+
+    返回:
+    pd.DataFrame - 以形态类型为索引，列为SIGNIFICANCE_COLUMNS
+    """
+    import pandas as pd  # 只有汇总时才需要pandas
+
+    rows = _significance_rows(table, data, hold_mult, n_resamples, block_size, confidence, seed)
+    df = pd.DataFrame([rows[name] for name in PATTERN_KINDS], columns=SIGNIFICANCE_COLUMNS,
+                      index=pd.Index(PATTERN_KINDS, name='pattern'))
+    df['count'] = df['count'].astype(np.int64)
+    return df
+
+
+def _run_symbol(task):
+    """工作进程：检验一个品种"""
+    symbol, table, data, hold_mult, n_resamples, block_size, confidence, seed = task
+    return symbol, _significance_rows(table, data, hold_mult, n_resamples, block_size, confidence, seed)
+
+
+def run_universe_significance(series: dict, tables: dict, hold_mult: float = 1.0, n_resamples: int = 10000,
+                              block_size: int = None, confidence: float = 0.95, seed=None,
+                              max_workers: int = None) -> 'pd.DataFrame':
+    """
+    对多个品种并行做显著性检验
+
+    每个品种是一个独立任务，分发到进程池执行。每个品种的随机流由seed按品种顺序派生(SeedSequence.spawn)，
+    因此结果与进程数、任务完成顺序无关，也与单独对该品种调用run_significance(seed=派生的子种子)一致。
+
+    参数:
+    series: dict - 品种代码 -> 对数价格数组
+    tables: dict - 品种代码 -> 形态表格（例如run_order_sweep(return_patterns=True)的输出中对应的表格）
+    max_workers: int - 进程数，默认CPU核数；为1时在当前进程串行执行
+    其余参数同run_significance
+
+    返回:
+    pd.DataFrame - 以(symbol, pattern)为索引，列为SIGNIFICANCE_COLUMNS
+    """
+    import pandas as pd
+
+    symbols = list(series)
+    seeds = _as_seed_sequence(seed).spawn(len(symbols))
+    tasks = [(symbol, tables[symbol], np.asarray(series[symbol], dtype=float), hold_mult, n_resamples,
+              block_size, confidence, s) for symbol, s in zip(symbols, seeds)]
+
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, len(tasks)) or 1
+    if max_workers <= 1:
+        outputs = [_run_symbol(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            outputs = list(pool.map(_run_symbol, tasks))
+
+    rows, index = [], []
+    for symbol, stats in outputs:
+        for name in PATTERN_KINDS:
+            index.append((symbol, name))
+            rows.append(stats[name])
+    df = pd.DataFrame(rows, columns=SIGNIFICANCE_COLUMNS,
+                      index=pd.MultiIndex.from_tuples(index, names=['symbol', 'pattern']))
+    df['count'] = df['count'].astype(np.int64)
+    return df
@@ -0,0 +1,250 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .flag_pattern_algorithm_0328 import DEFAULT_FLAG_PARAMS, find_flags_pennants_trendline, patterns_to_table
+from .pattern_index import PATTERN_KINDS
+from .order_sweep import pattern_returns
+from .param_search import ThresholdSearch
+from .scan_cache import ScanCache, scan_key
+
+
+# 训练集上选择参数时可用的目标函数
+OBJECTIVES = ('avg', 'total', 'wr', 'tstat')
+
+
+'''====================1.样本划分==========================='''
+
+def walk_forward_splits(n: int, train_size: int, test_size: int, step: int = None, anchored: bool = False,
+                        gap: int = 0) -> list:
+    """
+    滚动（或锚定）的训练/测试窗口
+
+    参数:
+    n: int - 序列长度
+    train_size: int - 训练窗口长度（K线数）；anchored=True时为第一个训练窗口的长度
+    test_size: int - 测试窗口长度
+    step: int - 窗口每次前移的K线数，默认等于test_size（测试窗口首尾相接、互不重叠）
+    anchored: bool - True时训练窗口起点固定在0，只向后扩展
+    gap: int - 训练窗口结束与测试窗口开始之间空出的K线数
+
+    返回:
+    list - 每个元素为(训练区间列表, 测试区间)，区间为左闭右开的(start, end)
+    """
+    step = step if step is not None else test_size
+    splits = []
+    train_end = train_size
+    while train_end + gap + test_size <= n:
+        train_start = 0 if anchored else train_end - train_size
+        test_start = train_end + gap
+        splits.append(([(train_start, train_end)], (test_start, test_start + test_size)))
+        train_end += step
+    return splits
+
+
+def blocked_kfold_splits(n: int, k: int, embargo: int = 0) -> list:
+    """
+    分块K折交叉验证：序列等分为k个连续块，每块轮流作为测试集，其余部分作为训练集
+
+    测试块前后各空出embargo根K线不用于训练，避免持有期跨越测试块边界的形态把测试期的信息带进训练集。
+
+    返回:
+    list - 每个元素为(训练区间列表, 测试区间)
+    """
+    bounds = np.linspace(0, n, k + 1).astype(np.int64)
+    splits = []
+    for f in range(k):
+        lo, hi = int(bounds[f]), int(bounds[f + 1])
+        train = [(0, max(lo - embargo, 0)), (min(hi + embargo, n), n)]
+        splits.append(([(a, b) for a, b in train if b > a], (lo, hi)))
+    return splits
+
+
+'''====================2.候选参数的全序列扫描==========================='''
+
+def _scan_key_kwargs(params) -> dict:
+    # 默认参数不写入缓存键，与主程序中cached_find_flags_pennants(data, order, method)的缓存条目共用
+    return {} if params == DEFAULT_FLAG_PARAMS else {'params': params}
+
+
+def _scan_order(task):
+    """
+    工作进程：在全序列上扫描一个order下的所有阈值参数，返回每组参数的紧凑列
+    """
+    data, order, method, params_list, hold_mult, cache_config = task
+    # 工作进程按调用方的目录和磁盘预算重建缓存对象（ScanCache本身不跨进程传递）
+    cache = ScanCache(*cache_config) if cache_config is not None else None
+    search = None
+    columns = []
+    for params in params_list:
+        key = scan_key(data, method, order, **_scan_key_kwargs(params)) if cache is not None else None
+        table = cache.get(key) if cache is not None else None
+        if table is None:
+            if method == 'pips':
+                if search is None:
+                    # PIP方法的阈值无关部分只计算一次，见param_search.ThresholdSearch
+                    search = ThresholdSearch(data, order)
+                    search.prepare(params_list)
+                table = search.patterns(params)
+            else:
+                table = patterns_to_table(find_flags_pennants_trendline(data, order, params=params))
+            if cache is not None:
+                cache.put(key, table)
+        conf_x = np.asarray(table['conf_x'], dtype=np.int64)
+        hold = (np.asarray(table['flag_width']) * hold_mult).astype(np.int64)
+        columns.append({'kind': np.asarray(table['kind']), 'conf_x': conf_x, 'exit_x': conf_x + hold,
+                        'return': pattern_returns(table, data, hold_mult)})
+    return order, columns
+
+
+'''====================3.逐折评估==========================='''
+
+_candidates = None  # 每个工作进程持有一份所有候选的紧凑列
+
+
+def _init_worker(candidates):
+    global _candidates
+    _candidates = candidates
+
+
+def _score(returns: np.array, objective: str) -> float:
+    """训练集上的目标函数；收益为NaN（持有期超出数据范围）的形态不计入"""
+    r = returns[~np.isnan(returns)]
+    if len(r) == 0:
+        return np.nan
+    if objective == 'avg':
+        return r.mean()
+    if objective == 'total':
+        return r.sum()
+    if objective == 'wr':
+        return (r > 0).mean()
+    std = r.std(ddof=1) if len(r) > 1 else 0.0
+    return r.mean() / std * np.sqrt(len(r)) if std > 0 else np.nan
+
+
+def _fold_masks(cols: dict, train: list, test: tuple, kinds: np.array):
+    """
+    形态属于训练集：确认点和持有期结束点都在同一个训练区间内（不使用训练区间之后的价格）；
+    形态属于测试集：确认点在测试区间内
+    """
+    use = np.isin(cols['kind'], kinds)
+    in_train = np.zeros(len(cols['conf_x']), dtype=bool)
+    for a, b in train:
+        in_train |= (cols['conf_x'] >= a) & (cols['exit_x'] < b)
+    in_test = (cols['conf_x'] >= test[0]) & (cols['conf_x'] < test[1])
+    return use & in_train, use & in_test
+
+
+def _evaluate_fold(task):
+    """工作进程：一折上所有候选的训练得分和测试结果"""
+    fold, train, test, kinds, objective, min_count = task
+    m = len(_candidates)
+    train_score = np.full(m, np.nan)
+    test_stats = np.full((m, 4), np.nan)  # 数量、平均收益、胜率、总收益
+    for c, cols in enumerate(_candidates):
+        tr, te = _fold_masks(cols, train, test, kinds)
+        r = cols['return'][tr]
+        if (~np.isnan(r)).sum() >= min_count:
+            train_score[c] = _score(r, objective)
+        r = cols['return'][te]
+        valid = r[~np.isnan(r)]
+        test_stats[c] = (len(r), valid.mean() if len(valid) else np.nan,
+                         (r > 0).sum() / len(r) if len(r) else np.nan, valid.sum())
+    return fold, train_score, test_stats
+
+
+'''====================4.对外接口==========================='''
+
+def run_walk_forward(data: np.array, orders, splits: list, params_list=None, method: str = 'pips',
+                     hold_mult: float = 1.0, objective: str = 'avg', min_count: int = 10, kinds=None,
+                     cache=None, max_workers: int = None, return_scores: bool = False):
+    """
+    滚动训练/测试的参数选择与样本外评估
+
+    原先的order扫描在全部历史上比较各个order的胜率/收益，选出的参数在同一段数据上评估，结果过于乐观。
+    这里每一折只用训练区间选择(order, 阈值参数)，再在紧随其后的测试区间上评估所选参数。
+
+    识别算法是因果的：确认点为i的形态只依赖data[:i+1]。因此某个窗口内的信号等于全序列扫描结果中
+    确认点落在该窗口内的形态，每个候选参数只需要在全序列上扫描一次，所有折共用；
+    提供cache时扫描结果写入ScanCache，重复运行（或与主程序共用同一序列和参数）时直接读取。
+    训练集只统计持有期在训练区间内结束的形态，不会用到测试期的价格。
+
+    扫描按order分发到进程池；各折再分发到第二个进程池并行评估，所有候选的紧凑列（确认点、结束点、收益）
+    通过进程初始化函数只传递一次。
+
+    参数:
+    data: np.array - 对数价格数组
+    orders: list - 候选order
+    splits: list - walk_forward_splits或blocked_kfold_splits的返回值
+    params_list: list - 候选FlagParams，默认只有默认参数
+    method: str - 'pips'或'trendline'
+    hold_mult: float - 持有期乘数
+    objective: str - 训练集上的目标函数：'avg'平均收益、'total'总收益、'wr'胜率、'tstat'平均收益的t统计量
+    min_count: int - 训练集上的最少形态数，不足的候选不参与选择
+    kinds: list - 参与统计的形态类型（PATTERN_KINDS中的名称），默认全部
+    cache: ScanCache - 扫描结果缓存，None时不使用缓存
+    max_workers: int - 进程数，默认CPU核数；为1时在当前进程串行执行
+    return_scores: bool - 是否同时返回每折每个候选的训练得分和测试结果
+
+    返回:
+    folds: pd.DataFrame - 每折一行：训练区间列表train（[(起点, 终点), ...]）及其总K线数train_bars、
+            测试区间、所选order和参数序号、训练得分、测试集的count/avg/wr/total
+    scores: dict - 'candidates'为(order, 参数序号)列表，'train'形状为(折数, 候选数)，
+            'test'形状为(折数, 候选数, 4)，仅当return_scores=True时返回
+    """
+    import pandas as pd  # 只有汇总时才需要pandas
+
+    if method not in ('pips', 'trendline'):
+        raise ValueError(f"未知的识别方法: {method}")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"未知的目标函数: {objective}")
+    params_list = list(params_list) if params_list is not None else [DEFAULT_FLAG_PARAMS]
+    kinds = np.array([PATTERN_KINDS.index(k) for k in (kinds if kinds is not None else PATTERN_KINDS)])
+    data = np.ascontiguousarray(data, dtype=np.float64)
+    cache_config = (cache.cache_dir, cache.max_bytes) if cache is not None else None
+
+    scan_tasks = [(data, order, method, params_list, hold_mult, cache_config) for order in orders]
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, max(len(scan_tasks), len(splits))) or 1
+
+    def assemble(scans):
+        by_order = dict(scans)
+        names = [(order, p) for order in orders for p in range(len(params_list))]
+        return names, [by_order[order][p] for order, p in names]
+
+    fold_tasks = [(f, train, test, kinds, objective, min_count) for f, (train, test) in enumerate(splits)]
+    if max_workers <= 1:
+        names, candidates = assemble([_scan_order(task) for task in scan_tasks])
+        _init_worker(candidates)
+        outputs = [_evaluate_fold(task) for task in fold_tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            names, candidates = assemble(pool.map(_scan_order, scan_tasks))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(candidates,)) as pool:
+            outputs = list(pool.map(_evaluate_fold, fold_tasks))
+
+    train_scores = np.full((len(splits), len(names)), np.nan)
+    test_stats = np.full((len(splits), len(names), 4), np.nan)
+    rows = []
+    for fold, score, stats in sorted(outputs, key=lambda out: out[0]):
+        train_scores[fold], test_stats[fold] = score, stats
+        train, test = splits[fold]
+        # 训练集可能由多段组成（分块K折时测试块两侧各一段），不能用一个起止点表示
+        row = {'fold': fold, 'train': [(int(a), int(b)) for a, b in train],
+               'train_bars': sum(b - a for a, b in train), 'test_start': test[0], 'test_end': test[1]}
+        if np.isnan(score).all():
+            # 没有候选在训练集上达到最少形态数
+            row.update({'order': np.nan, 'combo': np.nan, 'train_score': np.nan,
+                        'count': 0, 'avg': np.nan, 'wr': np.nan, 'total': 0.0})
+        else:
+            best = int(np.nanargmax(score))
+            order, combo = names[best]
+            row.update({'order': order, 'combo': combo, 'train_score': score[best],
+                        'count': int(stats[best, 0]), 'avg': stats[best, 1], 'wr': stats[best, 2],
+                        'total': stats[best, 3]})
+        rows.append(row)
+    folds = pd.DataFrame(rows).set_index('fold')
+
+    if return_scores:
+        return folds, {'candidates': names, 'train': train_scores, 'test': test_stats}
+    return folds
@@ -0,0 +1,6 @@
+"""
+兼容入口：实现已移到flag_pattern包（flag_pattern/flag_pattern_algorithm.py）
+
+仓库中的notebook仍按原来的顶层模块名导入，这里原样转出；新代码请直接从flag_pattern包导入。
+"""
+from flag_pattern.flag_pattern_algorithm import *  # noqa: F401,F403
@@ -1,758 +1,6 @@
-import pandas as pd  # 用于数据处理和分析
-import numpy as np   # 用于数值计算
-import matplotlib.pyplot as plt  # 用于数据可视化
-import mplfinance as mpf  # 用于绘制金融图表
-from matplotlib import style
-from important_point_algorithm import find_pips, directional_change, rw_top, rw_bottom # 导入感知重要点(PIP)识别函数
-from trendline_automation import fit_trendlines_single  # 导入趋势线拟合函数
-from dataclasses import dataclass
-
-
-
-
-# 这是Python的一个装饰器,用来简化类的定义。它会自动帮我们生成__init__()等基础方法,让我们只需要定义类的属性就可以了,不用写很多重复的代码。
-#__init__()是类的构造函数,当我们创建类的实例时会自动调用它来初始化实例的属性。比如定义一个普通的类需要写构造函数,而用@dataclass就不用写了。
-@dataclass  
-class FlagPattern:  # 定义一个旗形模式类,用于存储和表示股票价格中的旗形形态特征
-    """
-    这是一个使用Python的dataclass装饰器定义的类，用于表示旗形和三角旗形态。
-    @dataclass是Python的一个装饰器，它会自动为类生成特殊方法，如__init__、__repr__等，
-    简化了数据类的创建过程，使代码更加简洁。
-    """
-
-    # 旗形和三角旗形态的数据结构
-    
-    # 属性:
-    base_x: int         # 趋势起点索引，旗杆的底部
-    base_y: float       # 趋势起点价格
-    
-    tip_x: int   = -1       # 旗杆顶部/底部索引，旗帜开始点。初始化为-1表示尚未找到有效的旗杆顶部/底部点
-    tip_y: float = -1.      # 旗杆顶部/底部价格。初始化为-1表示尚未找到有效的价格点
-    
-    conf_x: int   = -1      # 形态确认点索引（突破点）
-    conf_y: float = -1.     # 形态确认点价格
-    
-    pennant: bool = False   # True表示三角旗，False表示旗形
-    
-    flag_width: int    = -1    # 旗帜宽度（时间跨度）
-    flag_height: float = -1.   # 旗帜高度（价格跨度）
-    
-    pole_width: int    = -1    # 旗杆宽度（时间跨度）
-    pole_height: float = -1.   # 旗杆高度（价格跨度）
-    
-    # 旗帜的上下趋势线，截距在旗杆顶部/底部
-    support_intercept: float = -1.  # 支撑线截距
-    support_slope: float = -1.      # 支撑线斜率
-    resist_intercept: float = -1.   # 阻力线截距
-    resist_slope: float = -1.       # 阻力线斜率
-
-
-def check_bear_pattern_pips(pending: FlagPattern, data: np.array, i:int, order:int):
-    """
-    检查熊市旗形/三角旗形态（基于PIP点方法）
-    
-    参数:
-    pending: FlagPattern - 待填充的旗形对象
-    data: np.array - 价格数据数组
-    i: int - 当前检查的索引位置
-    order: int - 滚动窗口大小参数
-    
-    返回:
-    bool - 如果识别到有效形态则返回True，否则返回False
-    """
-    
-    # 找出自局部顶部以来的最低价格（旗杆底部）
-    # 从旗杆底部(pending.base_x)到当前检查位置(i)的数据切片
-    # data[pending.base_x: i + 1]表示取数据从旗杆底部到当前位置的子集
-    # i+1是因为在Python中切片的右边界是开区间,即不包含i+1这个位置
-    
-    # pending.base_x是旗杆底部的索引位置
-    # 这行代码从旗杆底部(pending.base_x)到当前检查位置(i)提取了一段数据
-    # i+1是因为切片右边界是开区间,所以需要+1才能包含i这个位置
-    data_slice = data[pending.base_x: i + 1]  
-    
-    # 切片(slice)是从数组中提取一段连续数据的操作
-    # 例如data_slice = data[pending.base_x: i + 1]就是一个切片操作
-    # 它从原始数组data中提取了从pending.base_x到i的这一段数据
-    # argmin()返回切片中最小值的索引位置
-    # 由于切片是原始数组的一部分,所以需要加上切片起点pending.base_x才是在原始数组中的实际位置
-    min_i = data_slice.argmin() + pending.base_x  # 自局部顶部以来的最低点索引
-    
-    # 确保从最低点到当前位置有足够的距离来形成旗帜
-    if i - min_i < max(5, order * 0.5):  # 这行代码检查当前位置i到最低点min_i的距离是否小于两个值中的较大值:
-                                         # 1. 固定值5
-                                         # 2. order参数的一半
-                                         # 如果距离太小,说明还没有形成足够宽的旗形形态,返回False
-        return False
-    
-    # 测试旗帜宽度/高度
-    pole_width = min_i - pending.base_x  # 旗杆宽度
-    flag_width = i - min_i  # 旗帜宽度
-    # 旗帜宽度应小于旗杆宽度的一半
-    if flag_width > pole_width * 0.5:
-        return False
-
-    pole_height = pending.base_y - data[min_i]  # 旗杆高度
-    flag_height = data[min_i:i+1].max() - data[min_i]  # 旗帜高度
-    # 旗帜高度应小于旗杆高度的一半
-    if flag_height > pole_height * 0.5:
-        return False
-
-    # 到这里，宽度/高度检查通过
-    
-    # 找出旗帜部分的感知重要点(PIP)
-    # 找出从最低点到当前索引之间的5个PIP点
-    # 5表示要找出5个重要点位(PIP点)
-    # 3表示寻找重要点位时使用的滚动窗口大小
-    pips_x, pips_y = find_pips(data[min_i:i+1], 5, 3)
-
-    # 检查中心PIP点是否低于相邻的两个点，形成/\/\形状
-    if not (pips_y[2] < pips_y[1] and pips_y[2] < pips_y[3]):
-        return False
-    
-    # 计算旗帜的支撑线和阻力线
-    # 支撑线：连接第1个和第3个PIP点
-    support_rise = pips_y[2] - pips_y[0]  # 支撑线上升高度
-    support_run = pips_x[2] - pips_x[0]  # 支撑线水平距离
-    support_slope = support_rise / support_run  # 支撑线斜率
-    support_intercept = pips_y[0]  # 支撑线截距
-    
-    # 阻力线：连接第2个和第4个PIP点
-    resist_rise = pips_y[3] - pips_y[1]  # 阻力线上升高度
-    resist_run = pips_x[3] - pips_x[1]  # 阻力线水平距离
-    resist_slope = resist_rise / resist_run  # 阻力线斜率
-    resist_intercept = pips_y[1] + (pips_x[0] - pips_x[1]) * resist_slope  # 阻力线截距
-
-    # 计算两条线的交点
-    if resist_slope != support_slope:  # 非平行线
-        intersection = (support_intercept - resist_intercept) / (resist_slope - support_slope)
-    else:
-        intersection = -flag_width * 100  # 平行线，设置一个远离旗帜区域的交点
-
-    # 如果交点在旗帜区域内，则不是有效的旗形/三角旗
-    if intersection <= pips_x[4] and intersection >= 0:
-        return False
-
-    # 检查当前点是否突破旗帜下边界（支撑线），确认形态
-    support_endpoint = pips_y[0] + support_slope * pips_x[4]
-    if pips_y[4] > support_endpoint:  # 如果价格高于支撑线，则未突破
-        return False
-    
-    # 判断是旗形还是三角旗
-    # 如果阻力线向下倾斜（斜率为负），则为三角旗
-    if resist_slope < 0:
-        pending.pennant = True
-    else:
-        pending.pennant = False
-    
-    # 过滤严重发散的线（交点太近）
-    if intersection < 0 and intersection > -flag_width:
-        return False
-
-    # 形态确认，填充旗形对象的属性
-    pending.tip_x = min_i  # 旗杆底部索引
-    pending.tip_y = data[min_i]  # 旗杆底部价格
-    pending.conf_x = i  # 确认点索引
-    pending.conf_y = data[i]  # 确认点价格
-    pending.flag_width = flag_width  # 旗帜宽度
-    pending.flag_height = flag_height  # 旗帜高度
-    pending.pole_width = pole_width  # 旗杆宽度
-    pending.pole_height = pole_height  # 旗杆高度
-    pending.support_slope = support_slope  # 支撑线斜率
-    pending.support_intercept = support_intercept  # 支撑线截距
-    pending.resist_slope = resist_slope  # 阻力线斜率
-    pending.resist_intercept = resist_intercept  # 阻力线截距
-    
-    return True  # 返回True表示识别到有效形态
-    
-
-def check_bull_pattern_pips(pending: FlagPattern, data: np.array, i:int, order:int):
-    """
-    检查牛市旗形/三角旗形态（基于PIP点方法）
-    
-    参数:
-    pending: FlagPattern - 待填充的旗形对象
-    pending: FlagPattern是一个参数声明，表示一个待处理的旗形模式对象。
-    这里的pending是参数名，FlagPattern是类型标注，用于存储旗形形态的各种属性（如旗杆高度、宽度等）和状态信息。
-    这个对象会在形态识别过程中被逐步填充完整。
-    data: np.array - 价格数据数组
-    i: int - 当前检查的索引位置
-    order: int - 滚动窗口大小参数
-    
-    返回:
-    bool - 如果识别到有效形态则返回True，否则返回False
-    """
-    
-    # 找出自局部底部以来的最高价格（旗杆顶部）
-    # 这行代码从价格数组data中提取了从pending.base_x（局部底部）到i+1（当前位置）的一段数据。i+1是为了包含当前价格点，因为Python切片是左闭右开的。
-    data_slice = data[pending.base_x: i + 1]  # i + 1包含当前价格
-
-    # 这行代码在寻找从局部底部到当前位置之间的最高价格点的索引。
-    # data_slice.argmax()找到切片中最高价格的位置，加上pending.base_x是为了将这个相对位置转换为在原始数组中的绝对位置。这个索引将用于确定旗杆的顶部位置。
-    max_i = data_slice.argmax() + pending.base_x  # 自局部底部以来的最高点索引
-    pole_width = max_i - pending.base_x  # 旗杆宽度
-    
-    # 确保从最高点到当前位置有足够的距离来形成旗帜
-    if i - max_i < max(5, order * 0.5):
-        return False
-
-    # 测试旗帜宽度/高度
-    flag_width = i - max_i  # 旗帜宽度
-    # 旗帜宽度应小于旗杆宽度的一半
-    if flag_width > pole_width * 0.5:
-        return False
-
-    pole_height = data[max_i] - pending.base_y  # 旗杆高度
-    flag_height = data[max_i] - data[max_i:i+1].min()  # 旗帜高度
-    # 旗帜高度应小于旗杆高度的一半
-    if flag_height > pole_height * 0.5:
-        return False
-
-    # 找出旗帜部分的感知重要点(PIP)
-    # 找出从最高点到当前索引之间的5个PIP点
-    # pips_y[0]是第一个PIP点的价格,代表旗帜区域的起始点
-    # pips_y[4]是最后一个PIP点的价格,代表当前价格点
-    pips_x, pips_y = find_pips(data[max_i:i+1], 5, 3)  
-
-    # 检查中心PIP点是否高于相邻的两个点，形成\/\/形状
-    if not (pips_y[2] > pips_y[1] and pips_y[2] > pips_y[3]):
-        return False
-        
-    # 计算旗帜的阻力线和支撑线
-    # 阻力线：连接第1个和第3个PIP点
-    # 计算阻力线的上升高度，即第3个PIP点(pips_y[2])与第1个PIP点(pips_y[0])的垂直距离
-    resist_rise = pips_y[2] - pips_y[0]  # 阻力线上升高度
-    
-    # 计算阻力线的水平距离，即第3个PIP点(pips_x[2])与第1个PIP点(pips_x[0])的水平距离
-    resist_run = pips_x[2] - pips_x[0]  # 阻力线水平距离
-    
-    # 计算阻力线的斜率，使用上升高度除以水平距离
-    # 斜率为正表示向上倾斜，为负表示向下倾斜
-    resist_slope = resist_rise / resist_run  # 阻力线斜率
-    
-    # 计算阻力线的截距，即阻力线与y轴的交点
-    # 这里直接使用第1个PIP点的y值作为截距
-    resist_intercept = pips_y[0]  # 阻力线截距
-
-    # 支撑线：连接第2个和第4个PIP点
-    support_rise = pips_y[3] - pips_y[1]  # 支撑线上升高度
-    support_run = pips_x[3] - pips_x[1]  # 支撑线水平距离
-    support_slope = support_rise / support_run  # 支撑线斜率
-    support_intercept = pips_y[1] + (pips_x[0] - pips_x[1]) * support_slope  # 支撑线截距
-
-    # 计算两条线的交点
-    if resist_slope != support_slope:  # 非平行线
-        # 计算支撑线和阻力线的交点的x坐标
-        # 使用两条直线方程联立求解:
-        # y = resist_slope * x + resist_intercept
-        # y = support_slope * x + support_intercept
-        # 解出x坐标(intersection)
-        intersection = (support_intercept - resist_intercept) / (resist_slope - support_slope)
-    else:
-        # 当支撑线和阻力线平行时,将交点设置在旗帜区域左侧很远的位置
-        # 这样做是为了确保交点不会落在旗帜区域内
-        # flag_width是旗帜的宽度,乘以100是为了将交点设得足够远
-        intersection = -flag_width * 100  # 平行线，设置一个远离旗帜区域的交点
-
-    # 如果交点在旗帜区域内，则不是有效的旗形/三角旗
-    # 因为有效的旗形/三角旗的支撑线和阻力线应该在旗帜区域外相交
-    # 如果在旗帜区域内相交，说明两条趋势线收敛太快，形成的是一个楔形形态而不是旗形
-    # 楔形形态通常代表趋势的延续或反转，而旗形则代表趋势的暂时休整
-    if intersection <= pips_x[4] and intersection >= 0:
-        return False
-    
-    # 过滤严重发散的线（交点太近）
-    # 如果交点在旗帜宽度的负1倍范围内,说明两条趋势线发散得太快,不是有效形态
-    # 例如:如果旗帜宽度为10,那么交点应该在x<-10的位置,否则说明趋势线发散太快
-    if intersection < 0 and intersection > -1.0 * flag_width:
-        return False
-
-    # 检查当前点是否突破旗帜上边界（阻力线），确认形态
-    resist_endpoint = pips_y[0] + resist_slope * pips_x[4]
-    if pips_y[4] < resist_endpoint:  # 如果价格低于阻力线，则未突破
-        return False
-
-    # 判断是旗形还是三角旗
-    # 如果支撑线向上倾斜（斜率为正），则为三角旗
-    if support_slope > 0:
-        pending.pennant = True
-    else:
-        pending.pennant = False
-
-    # 形态确认，填充旗形对象的属性
-    pending.tip_x = max_i  # 旗杆顶部索引
-    pending.tip_y = data[max_i]  # 旗杆顶部价格
-    pending.conf_x = i  # 确认点索引
-    pending.conf_y = data[i]  # 确认点价格
-    pending.flag_width = flag_width  # 旗帜宽度
-    pending.flag_height = flag_height  # 旗帜高度
-    pending.pole_width = pole_width  # 旗杆宽度
-    pending.pole_height = pole_height  # 旗杆高度
-    
-    pending.support_slope = support_slope  # 支撑线斜率
-    pending.support_intercept = support_intercept  # 支撑线截距
-
-    pending.resist_slope = resist_slope  # 阻力线斜率
-    pending.resist_intercept = resist_intercept  # 阻力线截距
-    
-    return True  # 返回True表示识别到有效形态
-
-
-def find_flags_pennants_pips(data: np.array, order:int):
-    """
-    基于PIP点方法识别旗形和三角旗形态
-    
-    参数:
-    data: np.array - 价格数据数组
-    order: int - 滚动窗口大小参数，用于识别局部极值
-    
-    返回:
-    bull_flags: list - 牛市旗形列表
-    bear_flags: list - 熊市旗形列表
-    bull_pennants: list - 牛市三角旗列表
-    bear_pennants: list - 熊市三角旗列表
-    """
-    assert(order >= 3)  # 确保窗口大小参数至少为3
-    pending_bull = None  # 待处理的牛市形态
-    pending_bear = None  # 待处理的熊市形态
-
-    # 初始化结果列表
-    bull_pennants = []  # 牛市三角旗列表
-    bear_pennants = []  # 熊市三角旗列表
-    bull_flags = []     # 牛市旗形列表
-    bear_flags = []     # 熊市旗形列表
-    
-    '''
-    因为：
-    熊旗形态是从高点开始向下运动，所以需要从局部高点开始寻找
-    牛旗形态是从低点开始向上运动，所以需要从局部低点开始寻找
-    这符合市场趋势的基本原理 - 熊市从高点下跌，牛市从低点上涨。
-        
-    '''
-
-    # 遍历价格数据 len(data)返回7320，而range()函数生成的序列是从0开始到结束值-1，所以i的取值范围是0到7319。这与数据帧的7320行数据相对应。
-    for i in range(len(data)):# range(len(data))的取值范围是从0到7319，因为根据上下文中的数据帧输出显示总共有7320行数据（[7320 rows x 6 columns]）。
-
-        # 识别局部极值点作为形态起点
-        '''
-        rw_top(data, i, order)函数会检查i-order位置的点是否是在[i-2*order, i]这个窗口范围内的局部高点。
-        也就是说，它需要等待后续order个点的数据才能确认i-order位置是否真的是局部高点。
-        这样设计是为了避免在实时分析中的"提前预知"问题。
-        '''
-        if rw_top(data, i, order):   # 如果是局部高点，i是当前遍历到的数据点的索引，order参数为12，表示在前后各12个点(共25个点，包括当前点)的范围内是最高点
-        # 创建新的熊市形态对象，以当前高点为起点
-        # 代码在每次检测到局部高点时(rw_top返回True)，就会创建一个新的熊市旗形对象(pending_bear)。这是因为每个高点都可能是潜在的熊市旗形或三角旗形态的起点。
-        # FlagPattern是一个类，这里创建了该类的实例，传入两个参数：
-        # 第一个参数i - order：形态的基准点位置（索引）
-        # 第二个参数data[i - order]：该位置对应的价格值
-        # 这两个值会被存储为对象的base_x和base_y属性，用于后续旗形形态的识别和分析。
-        # 构造函数只初始化了base_x和base_y这两个属性，其余13个属性此时都是空值。这些属性会在后续的check_bull_pattern_pips或check_bear_pattern_pips函数中被赋值。
-
-        # 代码在每次检测到局部高点时(rw_top返回True)，就会创建一个新的熊市旗形对象(pending_bear)。这是因为每个高点都可能是潜在的熊市旗形或三角旗形态的起点。
-            pending_bear = FlagPattern(i - order, data[i - order])
-        if rw_bottom(data, i, order):  # 如果是局部低点
-            # 创建新的牛市形态对象，以当前低点为起点
-            pending_bull = FlagPattern(i - order, data[i - order])
-
-        # 检查并处理待处理的熊市形态
-        if pending_bear is not None:
-            # 检查是否形成熊市旗形/三角旗
-            if check_bear_pattern_pips(pending_bear, data, i, order):
-                # 根据形态类型添加到相应列表
-                if pending_bear.pennant:
-                    bear_pennants.append(pending_bear)  # 添加熊市三角旗
-                else:
-                    bear_flags.append(pending_bear)     # 添加熊市旗形
-                pending_bear = None  # 重置待处理形态
-
-        # 检查并处理待处理的牛市形态
-        if pending_bull is not None:
-            # 检查是否形成牛市旗形/三角旗
-            if check_bull_pattern_pips(pending_bull, data, i, order):
-                # 根据形态类型添加到相应列表
-                if pending_bull.pennant:
-                    bull_pennants.append(pending_bull)  # 添加牛市三角旗
-                else:
-                    bull_flags.append(pending_bull)     # 添加牛市旗形
-                pending_bull = None  # 重置待处理形态
-
-    # 返回识别结果
-    return bull_flags, bear_flags, bull_pennants, bear_pennants
-
-
-def check_bull_pattern_trendline(pending: FlagPattern, data: np.array, i:int, order:int):
-    """
-    检查牛市旗形/三角旗形态（基于趋势线方法）
-    
-    参数:
-    pending: FlagPattern - 待填充的旗形对象
-    data: np.array - 价格数据数组
-    i: int - 当前检查的索引位置
-    order: int - 滚动窗口大小参数
-    
-    返回:
-    bool - 如果识别到有效形态则返回True，否则返回False
-
-
-    函数的主要逻辑步骤：
-    1.首先检查旗杆顶部之后的价格是否超过旗杆顶部价格，如果超过则返回False（不符合牛市旗形条件）
-    2.找出旗帜部分的最低价格
-    3.计算旗杆和旗帜的高度和宽度
-    4.检查旗帜宽度是否小于旗杆宽度的一半，如果不是则返回False
-    5.检查旗帜高度是否小于旗杆高度的75%，如果不是则返回False
-    6.使用趋势线拟合算法找出旗帜部分的支撑线和阻力线
-    7.检查当前价格是否突破上趋势线（阻力线），如果没有则返回False
-    8.判断是旗形还是三角旗：如果支撑线向上倾斜（斜率为正），则为三角旗
-    9.如果所有条件都满足，填充旗形对象的属性并返回True
-
-    """
-    
-    # 检查旗杆顶部之后的价格是否超过旗杆顶部价格
-    #  切片：array[start:end] 会取出从索引 start 到索引 end-1 的元素。也就是说，它包含起始索引，但不包含结束索引
-    # data[pending.tip_x + 1 : i] 的取值区间是从 pending.tip_x + 1 到 i - 1 的所有元素。
-
-    if data[pending.tip_x + 1 : i].max() > pending.tip_y:
-        return False
-
-    # 找出旗帜部分的最低价格
-    flag_min = data[pending.tip_x:i].min()
-
-    # 计算旗杆和旗帜的高度和宽度
-    pole_height = pending.tip_y - pending.base_y  # 旗杆高度
-    pole_width = pending.tip_x - pending.base_x   # 旗杆宽度
-    
-    flag_height = pending.tip_y - flag_min  # 旗帜高度
-    flag_width = i - pending.tip_x          # 旗帜宽度
-
-    # 旗帜宽度应小于旗杆宽度的一半
-    if flag_width > pole_width * 0.5:
-        return False
-
-    # 旗帜高度应小于旗杆高度的75%
-    if flag_height > pole_height * 0.5:
-        return False
-
-    # 使用趋势线拟合算法找出旗帜部分的支撑线和阻力线
-    support_coefs, resist_coefs = fit_trendlines_single(data[pending.tip_x:i])
-    support_slope, support_intercept = support_coefs[0], support_coefs[1]  # 支撑线系数
-    resist_slope, resist_intercept = resist_coefs[0], resist_coefs[1]      # 阻力线系数
-
-    # 检查当前价格是否突破上趋势线（阻力线），确认形态
-    current_resist = resist_intercept + resist_slope * (flag_width + 1)
-    if data[i] <= current_resist:  # 如果价格未突破阻力线
-        return False
-
-    # 判断是旗形还是三角旗
-    # 如果支撑线向上倾斜（斜率为正），则为三角旗
-    if support_slope > 0:
-        pending.pennant = True
-    else:
-        pending.pennant = False
-
-    # 形态确认，填充旗形对象的属性
-    pending.conf_x = i  # 确认点索引
-    pending.conf_y = data[i]  # 确认点价格
-    pending.flag_width = flag_width  # 旗帜宽度
-    pending.flag_height = flag_height  # 旗帜高度
-    pending.pole_width = pole_width  # 旗杆宽度
-    pending.pole_height = pole_height  # 旗杆高度
-    
-    pending.support_slope = support_slope  # 支撑线斜率
-    pending.support_intercept = support_intercept  # 支撑线截距
-    pending.resist_slope = resist_slope  # 阻力线斜率
-    pending.resist_intercept = resist_intercept  # 阻力线截距
-
-    return True  # 返回True表示识别到有效形态
-
-def check_bear_pattern_trendline(pending: FlagPattern, data: np.array, i:int, order:int):
-    """
-    检查熊市旗形/三角旗形态（基于趋势线方法）
-    
-    参数:
-    pending: FlagPattern - 待填充的旗形对象
-    data: np.array - 价格数据数组
-    i: int - 当前检查的索引位置
-    order: int - 滚动窗口大小参数
-    
-    返回:
-    bool - 如果识别到有效形态则返回True，否则返回False
-    """
-    
-    # 检查旗杆底部之后的价格是否低于旗杆底部价格
-    if data[pending.tip_x + 1 : i].min() < pending.tip_y:
-        return False
-
-    # 找出旗帜部分的最高价格
-    flag_max = data[pending.tip_x:i].max()
-
-    # 计算旗杆和旗帜的高度和宽度
-    pole_height = pending.base_y - pending.tip_y  # 旗杆高度
-    pole_width = pending.tip_x - pending.base_x   # 旗杆宽度
-    
-    flag_height = flag_max - pending.tip_y  # 旗帜高度
-    flag_width = i - pending.tip_x          # 旗帜宽度
-
-    # 旗帜宽度应小于旗杆宽度的一半
-    if flag_width > pole_width * 0.5:
-        return False
-
-    # 旗帜高度应小于旗杆高度的75%
-    if flag_height > pole_height * 0.5:
-        return False
-
-    # 使用趋势线拟合算法找出旗帜部分的支撑线和阻力线
-    support_coefs, resist_coefs = fit_trendlines_single(data[pending.tip_x:i])
-    support_slope, support_intercept = support_coefs[0], support_coefs[1]  # 支撑线系数
-    resist_slope, resist_intercept = resist_coefs[0], resist_coefs[1]      # 阻力线系数
-
-    # 检查当前价格是否突破下趋势线（支撑线），确认形态
-    current_support = support_intercept + support_slope * (flag_width + 1)
-    if data[i] >= current_support:  # 如果价格未突破支撑线
-        return False
-
-    # 判断是旗形还是三角旗
-    # 如果阻力线向下倾斜（斜率为负），则为三角旗
-    if resist_slope < 0:
-        pending.pennant = True
-    else:
-        pending.pennant = False
-
-    # 形态确认，填充旗形对象的属性
-    pending.conf_x = i  # 确认点索引
-    pending.conf_y = data[i]  # 确认点价格
-    pending.flag_width = flag_width  # 旗帜宽度
-    pending.flag_height = flag_height  # 旗帜高度
-    pending.pole_width = pole_width  # 旗杆宽度
-    pending.pole_height = pole_height  # 旗杆高度
-    
-    pending.support_slope = support_slope  # 支撑线斜率
-    pending.support_intercept = support_intercept  # 支撑线截距
-    pending.resist_slope = resist_slope  # 阻力线斜率
-    pending.resist_intercept = resist_intercept  # 阻力线截距
-
-    return True  # 返回True表示识别到有效形态
-
-def find_flags_pennants_trendline(data: np.array, order:int):
-    """
-    基于趋势线方法识别旗形和三角旗形态
-    
-    参数:
-    data: np.array - 价格数据数组
-    order: int - 滚动窗口大小参数，用于识别局部极值
-    
-    返回:
-    bull_flags: list - 牛市旗形列表
-    bear_flags: list - 熊市旗形列表
-    bull_pennants: list - 牛市三角旗列表
-    bear_pennants: list - 熊市三角旗列表
-    """
-    last_bottom = -1  # 最近的局部底部索引
-    last_top = -1     # 最近的局部顶部索引
-    pending_bull = None  # 待处理的牛市形态
-    pending_bear = None  # 待处理的熊市形态
-
-    # 初始化结果列表
-    bull_pennants = []  # 牛市三角旗列表
-    bear_pennants = []  # 熊市三角旗列表
-    bull_flags = []     # 牛市旗形列表
-    bear_flags = []     # 熊市旗形列表
-    
-    # 遍历价格数据
-    for i in range(len(data)):
-
-        '''
-        这段代码是识别股票价格中的"牛市旗形"模式的核心部分。它的主要逻辑是：
-        遍历价格数据：循环处理每个价格点。
-        识别局部高点：使用rw_top函数检测当前位置是否为局部高点（价格峰值）。这个函数使用滚动窗口方法，检查某个点是否高于其前后一定范围内的所有点。
-        构建牛市旗形：
-        当找到局部高点，并且之前已经有局部底部时，可以形成潜在的牛市旗形
-        牛市旗形的结构是：从低点开始上升到高点（形成"旗杆"），然后在高点后形成一个整合区域（"旗帜"部分）
-        创建旗形对象：
-        创建FlagPattern对象，记录旗杆的起点（底部）和终点（顶部）
-        底部作为旗杆的起始点，顶部作为旗杆的终点和旗帜的起始点
-        将这个潜在的旗形保存在pending_bull变量中，等待后续确认
-        这段代码只是识别过程的第一步，后续还会检查这个潜在形态是否符合旗形或三角旗的所有条件。
-        '''
-
-        # 识别局部极值点
-        if rw_top(data, i, order):  # 如果是局部高点
-            # 使用rw_top函数检测当前位置i是否为局部高点（顶部）
-            # 这个函数确实是在检查 i-order 点（即 i - order）是否是局部最大值点。函数的逻辑是：
-            # 计算窗口中心点 k = i - order
-            # 获取中心点的价格值 v = data[k]
-            # 检查中心点前后各 order 个点的价格
-            # 如果窗口内有任何一个点的价格高于中心点，则 k 点不是顶部
-            # 只有当 k 点的价格高于或等于窗口内所有其他点时，才认为它是局部顶部（最大值点）
-            # rw_top函数使用滚动窗口方法，检查窗口中心点是否高于窗口内所有其他点
-            
-            last_top = i - order  # 更新最近的局部顶部索引
-            # 由于rw_top函数中窗口中心点的位置是i-order，所以这里记录实际的顶部位置
-            
-            if last_bottom != -1:  # 如果已有局部底部
-                # 只有当之前已经找到了一个局部底部时，才能形成潜在的牛市旗形
-                # 牛市旗形需要先有底部（起点），然后是顶部（旗杆顶端）
-                
-                # 创建新的牛市形态对象，从底部到顶部
-                pending = FlagPattern(last_bottom, data[last_bottom])
-                # 初始化FlagPattern对象，设置base_x为底部索引，base_y为底部价格
-                # 这里的底部是旗杆的起点（牛市旗形从低到高）
-                
-                pending.tip_x = last_top  # 设置旗杆顶部索引
-                pending.tip_y = data[last_top]  # 设置旗杆顶部价格
-                # tip_x和tip_y表示旗杆的顶端，也是旗帜部分的起始点
-                
-                pending_bull = pending  # 将创建的形态对象赋值给pending_bull变量
-                # 这个对象会在后续循环中被检查是否形成完整的牛市旗形或三角旗
-        
-        if rw_bottom(data, i, order):  # 如果是局部低点
-            last_bottom = i - order  # 更新最近的局部底部索引
-            if last_top != -1:  # 如果已有局部顶部
-                # 创建新的熊市形态对象，从顶部到底部
-                pending = FlagPattern(last_top, data[last_top])
-                pending.tip_x = last_bottom  # 设置旗杆底部
-                pending.tip_y = data[last_bottom]
-                pending_bear = pending
-
-
-                # 这段代码是识别股票价格中"熊市旗形"模式的关键部分。具体逻辑如下：
-                # 检测局部低点：rw_bottom(data, i, order)函数使用滚动窗口方法检查i-order是否为局部低点（价格谷值）。
-                # 记录低点位置：如果检测到局部低点，将last_bottom更新为实际低点位置（i-order）。
-                # 检查旗形条件：if last_top != -1检查是否已有局部顶部记录。熊市旗形需要先有顶部（起点），然后是底部（旗杆底端）。
-                # 创建熊市旗形对象：
-                # 创建FlagPattern对象，设置base_x和base_y为顶部坐标（旗杆起点）
-                # 设置tip_x和tip_y为底部坐标（旗杆底端）
-                # 将这个潜在旗形保存在pending_bear变量中等待后续确认
-                # 这段代码识别的是熊市旗形的"旗杆"部分（从高点到低点的下跌走势），后续代码会继续检查是否形成完整的旗形或三角旗形态。
-
-                # 由于FlagPattern是使用@dataclass装饰器定义的，并且tip_x和tip_y已经有默认值(-1和-1.0)，所以它的构造函数已经支持传入2个或4个参数。
-                # 但要注意参数顺序必须正确。根据类定义，正确的参数顺序应该是：
-                # FlagPattern(base_x, base_y, tip_x, tip_y)
-                # 所以如果要一次性传入四个参数，应该是：
-                # pending = FlagPattern(last_top, data[last_top], last_bottom, data[last_bottom])
-                # 这样base_x和base_y会设置为顶部坐标，tip_x和tip_y会设置为底部坐标，符合熊市旗形的逻辑。
-
-
-
-        # 检查并处理待处理的熊市形态
-        if pending_bear is not None:
-            # 检查是否形成熊市旗形/三角旗
-            if check_bear_pattern_trendline(pending_bear, data, i, order):
-                # 根据形态类型添加到相应列表
-                if pending_bear.pennant:
-                    bear_pennants.append(pending_bear)  # 添加熊市三角旗
-                else:
-                    bear_flags.append(pending_bear)     # 添加熊市旗形
-                pending_bear = None  # 重置待处理形态
-        
-        # 检查并处理待处理的牛市形态
-        if pending_bull is not None:
-            # 检查是否形成牛市旗形/三角旗
-            if check_bull_pattern_trendline(pending_bull, data, i, order):
-                # 根据形态类型添加到相应列表
-                if pending_bull.pennant:
-                    bull_pennants.append(pending_bull)  # 添加牛市三角旗
-                else:
-                    bull_flags.append(pending_bull)     # 添加牛市旗形
-                pending_bull = None  # 重置待处理形态
-
-    # 返回识别结果
-    return bull_flags, bear_flags, bull_pennants, bear_pennants
-
-def plot_flag(candle_data: pd.DataFrame, pattern: FlagPattern, pad=2):
-    """
-    绘制旗形/三角旗形态
-    
-    参数:
-    candle_data: pd.DataFrame - K线数据
-    pattern: FlagPattern - 旗形/三角旗对象
-    pad: int - 图表两侧的额外空间
-    """
-    if pad < 0:
-        pad = 0
-
-    # 截取需要显示的数据范围
-    start_i = pattern.base_x - pad
-    end_i = pattern.conf_x + 1 + pad
-    dat = candle_data.iloc[start_i:end_i]
-    idx = dat.index
-    
-    # 设置绘图风格
-    # 可用的style包括:
-    # 'default', 'classic', 'Solarize_Light2', 'bmh', 'dark_background', 
-    # 'fast', 'fivethirtyeight', 'ggplot', 'grayscale', 'seaborn',
-    # 'seaborn-bright', 'seaborn-colorblind', 'seaborn-dark',
-    # 'seaborn-dark-palette', 'seaborn-darkgrid', 'seaborn-deep',
-    # 'seaborn-muted', 'seaborn-notebook', 'seaborn-paper',
-    # 'seaborn-pastel', 'seaborn-poster', 'seaborn-talk',
-    # 'seaborn-ticks', 'seaborn-white', 'seaborn-whitegrid',
-    # 'tableau-colorblind10'
-    # plt.style.use('seaborn-v0_8-bright')  
-    fig = plt.gcf()
-    ax = fig.gca()  # ax是matplotlib中的坐标轴对象,gca()表示获取当前图形的坐标轴(get current axes)
-
-    # 获取关键点的索引
-    tip_idx = idx[pattern.tip_x - start_i]  # 旗杆顶部/底部索引
-    conf_idx = idx[pattern.conf_x - start_i]  # 确认点索引
-
-    # 定义要绘制的线
-    pole_line = [(idx[pattern.base_x - start_i], pattern.base_y), (tip_idx, pattern.tip_y)]  # 旗杆线
-    upper_line = [(tip_idx, pattern.resist_intercept), (conf_idx, pattern.resist_intercept + pattern.resist_slope * pattern.flag_width)]  # 上趋势线
-    lower_line = [(tip_idx, pattern.support_intercept), (conf_idx, pattern.support_intercept + pattern.support_slope * pattern.flag_width)]  # 下趋势线
-
-    # 绘制K线图和趋势线
-    # 设置K线图的颜色样式
-
-    # 创建自定义样式
-    # 这里使用base_mpl_style而不是base_mpf_style是因为:
-    # 1. base_mpl_style用于设置matplotlib的基础样式,包括颜色、字体等基础绘图元素
-    # 2. base_mpf_style主要用于设置mplfinance专有的金融图表样式
-    # 3. 我们这里想要应用seaborn的整体视觉风格,这属于matplotlib的基础样式范畴
-    
-    # mplfinance提供的base_mpf_style选项包括:
-    # 'binance' - 币安交易所风格
-    # 'charles' - 经典图表风格
-    # 'mike' - 现代简约风格
-    # 'nightclouds' - 深色主题
-    # 'sas' - SAS软件风格
-    # 'starsandstripes' - 星条旗主题
-    # 'yahoo' - 雅虎财经风格
-    
-    # 而base_mpl_style可以使用matplotlib支持的所有样式,包括:
-    # 'seaborn' 系列、'ggplot'、'bmh'等更丰富的选择seaborn-v0_8-bright
-    mc = mpf.make_marketcolors(up='red',          # 上涨蜡烛颜色
-                              down='green',        # 下跌蜡烛颜色
-                              edge='inherit',      # 边框颜色继承自up/down
-                              volume='in',         # 成交量颜色跟随K线
-                              wick='inherit')      # 上下影线继承自up/down
-    
-    # 可用的base_mpf_style包括:
-    # 'binance' - 币安交易所风格
-    # 'charles' - 经典图表风格
-    # 'mike' - 现代简约风格
-    # 'nightclouds' - 深色主题
-    # 'sas' - SAS软件风格
-    # 'starsandstripes' - 星条旗主题
-    # 'yahoo' - 雅虎财经风格
-    
-    # 直接使用make_mpf_style创建样式，不再使用make_base_mpf_style
-    # 'charles'是mplfinance内置的样式之一
-    s = mpf.make_mpf_style(
-        marketcolors=mc,
-        base_mpl_style="seaborn"  # 直接指定基础样式为'charles'
-    )
-    
-    
-    # 绘制K线图和趋势线
-    mpf.plot(dat, 
-             alines=dict(alines=[pole_line, upper_line, lower_line], 
-                        colors=['black', 'blue', 'blue']),  # 旗杆为黄色,趋势线为红色
-             type='candle',
-             style=s,
-             ax=ax,
-             datetime_format='%Y-%m-%d')  # 设置横坐标日期格式为 年-月-日
-    plt.show()
-
-
-
-
+"""
+兼容入口：实现已移到flag_pattern包（flag_pattern/flag_pattern_algorithm_0328.py）
 
+仓库中的notebook仍按原来的顶层模块名导入，这里原样转出；新代码请直接从flag_pattern包导入。
+"""
+from flag_pattern.flag_pattern_algorithm_0328 import *  # noqa: F401,F403
@@ -34,10 +34,37 @@ def get_stock_data(code, start_date, end_date):
     return df
 
 
-data = get_stock_data("000001.SH", "1995-01-01", "2025-02-28")
-# 将数据保存到Excel文件
-excel_path = '上证指数数据.xlsx'
-data.to_excel(excel_path)
-print(f"数据已保存至 {excel_path}")
+def get_stock_data_with_factors(code, start_date, end_date):
+    """
+    从Wind获取不复权价格和复权因子，供adjusted_prices.AdjustedPriceStore按需复权
+
+    前复权数据在每次除权后都会改写全部历史，缓存的扫描结果随之失效；
+    不复权价格加复权因子只在除权日之后变化，见AdjustedPriceStore。
+
+    返回:
+    DataFrame: 与get_stock_data相同的列（价格不复权），另加AdjFactor列（累计复权因子）
+    """
+    w.start()
+    wind_data = w.wsd(code, "close,open,high,low,volume,pct_chg,adjfactor", start_date, end_date)
+
+    if wind_data.ErrorCode != 0:
+        print(f"获取数据出错: {wind_data.Data}")
+        return None
+
+    df = pd.DataFrame(data=wind_data.Data,
+                     index=wind_data.Fields,
+                     columns=wind_data.Times).T
+    df.columns = ['Close', 'Open', 'High', 'Low', 'Volume', 'Change', 'AdjFactor']
+    df.index.name = 'Date'
+    return df
+
+
+# 直接运行本脚本时下载上证指数并保存为Excel；被其他模块导入时只提供函数，不连接Wind
+if __name__ == '__main__':
+    data = get_stock_data("000001.SH", "1995-01-01", "2025-02-28")
+    # 将数据保存到Excel文件
+    excel_path = '上证指数数据.xlsx'
+    data.to_excel(excel_path)
+    print(f"数据已保存至 {excel_path}")
 
-print(data)
\ No newline at end of file
+    print(data)
@@ -0,0 +1,25 @@
+import os
+import numpy as np
+import pytest
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+
+@pytest.fixture(scope='session')
+def sse_baseline():
+    """上证指数对数收盘价及基线版本（d9395a2）的识别结果，见test_baseline_regression"""
+    with np.load(os.path.join(DATA_DIR, 'sse_baseline.npz')) as f:
+        return dict(f)
+
+
+@pytest.fixture(scope='session')
+def sse_close(sse_baseline):
+    return sse_baseline['data']
+
+
+@pytest.fixture(scope='session')
+def random_walk():
+    """带趋势段的随机游走（对数价格），足够产生各类形态"""
+    rng = np.random.default_rng(20250328)
+    steps = rng.standard_normal(6000) * 0.01 + np.repeat(rng.choice([-0.004, 0.0, 0.004], 60), 100)
+    return np.cumsum(steps)
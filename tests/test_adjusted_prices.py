@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from flag_pattern.adjusted_prices import AdjustedPriceStore, AdjustedScanCache
+from flag_pattern.flag_pattern_algorithm import find_flags_pennants_pips, patterns_to_table
+
+
+def test_patterns_after_adjustment_match_direct_scan(sse_close):
+    store = AdjustedPriceStore()
+    store.set_series('sse', np.exp(sse_close[:3000]))
+    cache = AdjustedScanCache(store, checkpoint_every=500)
+    cache.patterns('sse', order=10, adjust='backward')
+
+    store.add_adjustment('sse', 2200, 1.1)
+    table = cache.patterns('sse', order=10, adjust='backward')
+    expected = patterns_to_table(find_flags_pennants_pips(store.prices('sse', 'backward'), 10))
+    for name, col in expected.items():
+        np.testing.assert_array_equal(table[name], col, err_msg=name)
+    assert cache.stats()['reused_bars'] >= 2000
+
+
+def test_unknown_symbol_raises():
+    cache = AdjustedScanCache(AdjustedPriceStore())
+    with pytest.raises(KeyError, match='nope'):
+        cache.patterns('nope')
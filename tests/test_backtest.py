@@ -0,0 +1,24 @@
+import numpy as np
+
+from flag_pattern.backtest import ExitRule, run_event_study
+from flag_pattern.flag_pattern_algorithm import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+from flag_pattern.order_sweep import pattern_returns
+
+
+def test_horizon_rule_matches_pattern_returns(sse_close):
+    hold_mults = [0.5, 1.0, 1.7, 3.0]
+    for finder in (find_flags_pennants_pips, find_flags_pennants_trendline):
+        table = patterns_to_table(finder(sse_close, 8))
+        # chunk_size小于形态数，同时检查分批处理
+        result = run_event_study(table, sse_close, sse_close, sse_close, hold_mults=hold_mults, chunk_size=16)
+        for h, mult in enumerate(hold_mults):
+            np.testing.assert_array_equal(result.pnl[0, h], pattern_returns(table, sse_close, mult))
+
+
+def test_exit_rules_never_hold_longer_than_horizon(sse_close):
+    table = patterns_to_table(find_flags_pennants_pips(sse_close, 8))
+    rules = {'horizon': ExitRule(), 'all': ExitRule(target_mult=1.0, stop=True, trail_mult=1.0)}
+    result = run_event_study(table, sse_close, sse_close, sse_close, rules=rules)
+    valid = ~np.isnan(result.pnl[1, 0])
+    assert (result.bars[1, 0][valid] <= result.bars[0, 0][valid]).all()
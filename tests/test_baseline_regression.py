@@ -0,0 +1,29 @@
+"""
+当前识别结果与基线版本逐位相同
+
+tests/data/sse_baseline.npz由基线提交d9395a2的flag_pattern_algorithm_0328生成：
+对上证指数数据.xlsx的对数收盘价，分别用PIP方法和趋势线方法在几个order下识别，保存每个形态的全部字段。
+性能优化（区间索引、候选池、增量扫描等）都不应改变默认参数下的识别结果。
+"""
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+
+ORDERS = [3, 5, 8, 12, 20]
+FIELDS = ['base_x', 'base_y', 'tip_x', 'tip_y', 'conf_x', 'conf_y', 'pennant', 'flag_width', 'flag_height',
+          'pole_width', 'pole_height', 'support_intercept', 'support_slope', 'resist_intercept', 'resist_slope']
+FINDERS = {'pips': find_flags_pennants_pips, 'trendline': find_flags_pennants_trendline}
+
+
+@pytest.mark.parametrize('method', ['pips', 'trendline'])
+@pytest.mark.parametrize('order', ORDERS)
+def test_matches_baseline(sse_baseline, method, order):
+    table = patterns_to_table(FINDERS[method](sse_baseline['data'], order))
+    prefix = f'{method}_{order}_'
+    np.testing.assert_array_equal(table['kind'], sse_baseline[prefix + 'kind'])
+    for name in FIELDS:
+        # 逐位相同：趋势线的优化过程对初始斜率的末位差异很敏感，近似相等不足以说明结果没有变化
+        np.testing.assert_array_equal(np.asarray(table[name], dtype=np.float64), sse_baseline[prefix + name],
+                                      err_msg=name)
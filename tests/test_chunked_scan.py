@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from flag_pattern.chunked_scan import iter_chunks, scan_chunked
+from flag_pattern.flag_pattern_algorithm import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+
+FINDERS = {'pips': find_flags_pennants_pips, 'trendline': find_flags_pennants_trendline}
+
+
+def _assert_same(result, expected):
+    table, expected = patterns_to_table(result), patterns_to_table(expected)
+    for name, col in expected.items():
+        np.testing.assert_array_equal(table[name], col, err_msg=name)
+
+
+@pytest.mark.parametrize('method', ['pips', 'trendline'])
+def test_chunked_scan_matches_batch(sse_close, method, tmp_path):
+    path = tmp_path / 'prices.npy'
+    np.save(path, sse_close)
+    # 块长小于形态跨度上限，形态经常跨越块边界
+    result = scan_chunked(str(path), 8, max_span=400, method=method, chunk_size=250)
+    _assert_same(result, FINDERS[method](sse_close, 8, max_span=400))
+
+
+def test_iter_chunks_range(sse_close):
+    # start/end只扫描一段，形态索引相对于start
+    found = ([], [], [], [])
+    for stop, new in iter_chunks(sse_close, 8, 400, chunk_size=700, start=1000, end=4000):
+        assert stop <= 3000
+        for patterns, part in zip(found, new):
+            patterns.extend(part)
+    _assert_same(found, find_flags_pennants_pips(sse_close[1000:4000], 8, max_span=400))
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+from flag_pattern.incremental_scan import ResumableScanner
+
+FINDERS = {'pips': find_flags_pennants_pips, 'trendline': find_flags_pennants_trendline}
+
+
+def _assert_same(result, expected):
+    table, expected = patterns_to_table(result), patterns_to_table(expected)
+    for name, col in expected.items():
+        np.testing.assert_array_equal(table[name], col, err_msg=name)
+
+
+@pytest.mark.parametrize('method', ['pips', 'trendline'])
+def test_resumable_scanner_matches_batch(sse_close, method):
+    data = sse_close[:3000]
+    scanner = ResumableScanner(10, method, max_pending=2)
+    results = ([], [], [], [])
+    # 大块、小块和逐根K线交替追加
+    for a, b in [(0, 1000), (1000, 1003), *[(t, t + 1) for t in range(1003, 1200)], (1200, 3000)]:
+        for patterns, new in zip(results, scanner.update(data[a:b])):
+            patterns.extend(new)
+    _assert_same(results, FINDERS[method](data, 10, max_pending=2))
+
+
+@pytest.mark.parametrize('method', ['pips', 'trendline'])
+def test_save_and_resume(sse_close, method, tmp_path):
+    data = sse_close[:3000]
+    first = ResumableScanner(10, method, max_span=300)
+    results = first.update(data[:1700])
+    first.save(tmp_path / 'state.json')
+    second = ResumableScanner.load(tmp_path / 'state.json')
+    results = tuple(a + b for a, b in zip(results, second.update(data[1700:])))
+    _assert_same(results, FINDERS[method](data, 10, max_span=300))
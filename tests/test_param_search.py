@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import FlagParams, find_flags_pennants_pips, patterns_to_table
+from flag_pattern.order_sweep import pattern_returns, summarize_returns
+from flag_pattern.param_search import ThresholdSearch, grid_params
+
+PARAMS = grid_params(max_flag_width_ratio=[0.3, 0.5], max_flag_height_ratio=[0.4, 0.75], pip_distance=[1, 3]) + [
+    FlagParams(min_flag_width=8, min_flag_width_order=0.8, divergence_ratio=0.5)]
+
+
+@pytest.mark.parametrize('order', [5, 12])
+def test_threshold_search_matches_scan(sse_close, order):
+    search = ThresholdSearch(sse_close, order)
+    search.prepare(PARAMS)
+    for params in PARAMS:
+        expected = patterns_to_table(find_flags_pennants_pips(sse_close, order, params=params))
+        table = search.patterns(params)
+        assert list(table) == list(expected)
+        for name, col in expected.items():
+            np.testing.assert_array_equal(table[name], col, err_msg=f'{params} {name}')
+
+
+def test_params_outside_prepare(sse_close):
+    # 比prepare中更宽松的参数需要补算PIP点，结果同样一致
+    search = ThresholdSearch(sse_close, 8)
+    search.prepare(PARAMS[:1])
+    params = FlagParams(max_flag_width_ratio=0.8, max_flag_height_ratio=0.9)
+    expected = patterns_to_table(find_flags_pennants_pips(sse_close, 8, params=params))
+    for name, col in expected.items():
+        np.testing.assert_array_equal(search.patterns(params)[name], col, err_msg=name)
+
+
+def test_evaluate(sse_close):
+    search = ThresholdSearch(sse_close, 8, hold_mult=1.5)
+    table = patterns_to_table(find_flags_pennants_pips(sse_close, 8))
+    np.testing.assert_equal(search.evaluate(), summarize_returns(table['kind'], pattern_returns(table, sse_close, 1.5)))
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+from flag_pattern.pattern_features import average_true_range, pattern_features
+
+
+@pytest.mark.parametrize('method, finder', [('pips', find_flags_pennants_pips),
+                                            ('trendline', find_flags_pennants_trendline)])
+def test_breakout_level_matches_detector(sse_close, method, finder):
+    # 识别时要求确认价越过突破线，按识别时的x计算的突破幅度不会为负
+    table = patterns_to_table(finder(sse_close, 8))
+    features = pattern_features(table, sse_close, method=method)
+    valid = ~np.isnan(features['breakout_atr'])
+    assert valid.sum() > 20
+    assert (features['breakout_atr'][valid] >= 0).all()
+
+
+def test_trendline_level_is_one_bar_past_flag_width(sse_close):
+    table = patterns_to_table(find_flags_pennants_trendline(sse_close, 8))
+    features = pattern_features(table, sse_close, method='trendline')
+    bull = table['kind'] % 2 == 0
+    x = table['flag_width'] + 1.0
+    level = np.where(bull, table['resist_intercept'] + table['resist_slope'] * x,
+                     table['support_intercept'] + table['support_slope'] * x)
+    atr = average_true_range(sse_close)[table['conf_x']]
+    expected = np.where(bull, 1.0, -1.0) * (sse_close[table['conf_x']] - level) / atr
+    np.testing.assert_allclose(features['breakout_atr'], expected, rtol=1e-12)
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        pattern_features(patterns_to_table([[], [], [], []]), np.zeros(10), method='shape')
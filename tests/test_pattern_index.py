@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import find_flags_pennants_pips, find_flags_pennants_trendline
+from flag_pattern.pattern_index import (PATTERN_KINDS, PatternIndex, build_pattern_index, date_to_bar,
+                                        merge_pattern_indexes)
+
+
+@pytest.fixture(scope='module')
+def random_index():
+    rng = np.random.default_rng(7)
+    n = 2000
+    starts = rng.integers(0, 5000, n)
+    ends = starts + rng.integers(0, 200, n)
+    symbols = rng.choice(['a', 'b', 'c'], n)
+    kinds = rng.integers(0, 4, n)
+    return PatternIndex(symbols, kinds, starts, ends, np.arange(n))
+
+
+def test_stab_matches_brute_force(random_index):
+    ix = random_index
+    for x in [-1, 0, 17, 2500, 2501, 5100, 5300]:
+        expected = np.flatnonzero((ix.starts <= x) & (ix.ends >= x))
+        np.testing.assert_array_equal(ix.stab(x), expected)
+        sym = (ix.symbols == 'b') & (ix.kinds == 2)
+        np.testing.assert_array_equal(ix.stab(x, symbol='b', kind='bull_pennant'),
+                                      np.flatnonzero(sym & (ix.starts <= x) & (ix.ends >= x)))
+
+
+def test_overlap_matches_brute_force(random_index):
+    ix = random_index
+    for lo, hi in [(0, 0), (100, 150), (2000, 2000), (4990, 6000), (-50, -1), (0, 10_000)]:
+        expected = np.flatnonzero((ix.starts <= hi) & (ix.ends >= lo))
+        np.testing.assert_array_equal(ix.overlap(lo, hi), expected)
+        np.testing.assert_array_equal(ix.overlap(lo, hi, symbol='c'),
+                                      np.flatnonzero((ix.symbols == 'c') & (ix.starts <= hi) & (ix.ends >= lo)))
+    assert len(ix.overlap(0, 10, symbol='missing')) == 0
+
+
+def test_merge_and_lookup_several_symbols(sse_close):
+    results = {'pips': find_flags_pennants_pips(sse_close, 8), 'trendline': find_flags_pennants_trendline(sse_close, 8)}
+    merged = merge_pattern_indexes(build_pattern_index(found, symbol) for symbol, found in results.items())
+    assert len(merged) == sum(len(p) for found in results.values() for p in found)
+    assert merged.span() == (int(merged.starts.min()), int(merged.ends.max()))
+    assert merged.span('pips') == (min(p.base_x for found in results['pips'] for p in found),
+                                   max(p.conf_x for found in results['pips'] for p in found))
+
+    x = int(np.median(merged.ends))
+    rows = merged.overlap(x - 300, x)
+    patterns = merged.lookup(rows, results)
+    assert len(patterns) == len(rows) > 0
+    for r, p in zip(rows, patterns):
+        # 每个对象都来自所属品种的同类列表
+        assert p is results[merged.symbols[r]][merged.kinds[r]][merged.positions[r]]
+        assert p.base_x <= x and p.conf_x >= x - 300
+    assert {merged.symbols[r] for r in rows} == set(results)
+
+    with pytest.raises(ValueError):
+        merged.lookup(rows, results['pips'])
+    pips_rows = merged.stab(x, symbol='pips')
+    assert merged.lookup(pips_rows, results['pips']) == merged.lookup(pips_rows, results)
+
+
+def test_save_load_and_empty(tmp_path, random_index):
+    path = tmp_path / 'index.npz'
+    random_index.save(path)
+    loaded = PatternIndex.load(path)
+    np.testing.assert_array_equal(loaded.overlap(100, 400), random_index.overlap(100, 400))
+    empty = merge_pattern_indexes([])
+    assert len(empty) == 0 and empty.span() is None and len(empty.stab(5)) == 0
+
+
+def test_date_to_bar():
+    dates = np.array(['2024-01-02', '2024-01-03', '2024-01-05'], dtype='datetime64[D]')
+    assert date_to_bar(dates, '2024-01-04') == 1
+    assert date_to_bar(dates, '2024-01-05') == 2
+    assert date_to_bar(dates, '2024-01-01') == -1
+    assert PATTERN_KINDS[0] == 'bull_flag'
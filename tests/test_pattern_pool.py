@@ -0,0 +1,92 @@
+import numpy as np
+
+from flag_pattern.flag_pattern_algorithm import FlagPattern, find_flags_pennants_pips, patterns_to_table
+from flag_pattern.pattern_pool import PendingPool, dedup_patterns, pole_priority
+
+
+def _pattern(base_x, base_y=0.0, tip_x=-1, tip_y=-1.0, conf_x=-1, pole_height=1.0, pennant=False):
+    return FlagPattern(base_x, base_y, tip_x=tip_x, tip_y=tip_y, conf_x=conf_x, pole_height=pole_height,
+                       pennant=pennant)
+
+
+def test_capacity_one_replaces_old_candidate():
+    pool = PendingPool(1)
+    first, second = _pattern(10), _pattern(20)
+    assert pool.push(first) is None
+    assert pool.push(second) is first
+    assert list(pool) == [second]
+
+
+def test_evicts_lowest_priority():
+    pool = PendingPool(3)
+    patterns = [_pattern(x) for x in (30, 10, 20)]
+    for p in patterns:
+        assert pool.push(p) is None
+    # 默认按起点新旧：最旧的base_x=10先被淘汰；新候选比堆顶还旧时直接被拒绝
+    assert pool.push(_pattern(40)) is patterns[1]
+    old = _pattern(5)
+    assert pool.push(old) is old
+    assert [p.base_x for p in pool] == [30, 20, 40]  # 按插入顺序遍历
+
+
+def test_equal_priority_evicts_first_inserted():
+    pool = PendingPool(2, priority=lambda p: 0)
+    a, b, c = _pattern(1), _pattern(2), _pattern(3)
+    pool.push(a)
+    pool.push(b)
+    assert pool.push(c) is a
+
+
+def test_remove_and_expire():
+    pool = PendingPool(4)
+    patterns = [_pattern(x) for x in (1, 2, 3, 4)]
+    for p in patterns:
+        pool.push(p)
+    pool.remove([patterns[2]])
+    pool.expire(2)
+    assert [p.base_x for p in pool] == [2, 4]
+
+
+def test_pole_priority_per_direction():
+    bulls, bears = PendingPool(2, pole_priority(True)), PendingPool(2, pole_priority(False))
+    low, mid, high = _pattern(1, -1.0), _pattern(2, 0.0), _pattern(3, 1.0)
+    for p in (low, mid):
+        bulls.push(p)
+        bears.push(p)
+    # 牛市池保留起点更低的候选，熊市池保留起点更高的候选
+    assert bulls.push(high) is high
+    assert bears.push(high) is low
+
+
+def test_finders_use_separate_priorities(sse_close):
+    kwargs = {'bull_priority': pole_priority(True), 'bear_priority': pole_priority(False)}
+    table = patterns_to_table(find_flags_pennants_pips(sse_close, 8, 3, **kwargs))
+    default = patterns_to_table(find_flags_pennants_pips(sse_close, 8, 3))
+    assert len(table['kind']) > 0
+    # 熊市池按牛市的规则排序时会淘汰最好的候选，结果不同
+    swapped = patterns_to_table(find_flags_pennants_pips(sse_close, 8, 3, pole_priority(False), pole_priority(True)))
+    assert not np.array_equal(table['conf_x'], swapped['conf_x'])
+    assert not np.array_equal(table['conf_x'], default['conf_x'])
+
+
+def test_dedup_merges_within_tolerance():
+    a = _pattern(100, 0.0, tip_x=120, tip_y=1.0, conf_x=130, pole_height=1.0)
+    b = _pattern(101, 0.0, tip_x=122, tip_y=1.0, conf_x=131, pole_height=1.5)  # 与a相差不超过2
+    c = _pattern(104, 0.0, tip_x=120, tip_y=1.0, conf_x=130)                   # base_x相差4
+    d = _pattern(100, 0.0, tip_x=120, tip_y=1.0, conf_x=130, pennant=True)     # 类型不同
+    e = _pattern(100, 1.0, tip_x=120, tip_y=0.0, conf_x=130)                   # 方向不同
+    kept, counts = dedup_patterns([c, b, a, d, e], tol=2)
+    assert len(kept) == 4
+    assert b in kept and a not in kept  # 合并时保留旗杆更高的形态
+    assert counts[kept.index(b)] == 2
+    assert counts.sum() == 5
+    assert [p.conf_x for p in kept] == sorted(p.conf_x for p in kept)
+
+
+def test_dedup_drops_expired_representatives():
+    # 确认点相差超过tol的形态不合并，即使base_x和tip_x相同
+    patterns = [_pattern(10, 0.0, tip_x=20, tip_y=1.0, conf_x=30 + 3 * k) for k in range(50)]
+    kept, counts = dedup_patterns(patterns, tol=2)
+    assert len(kept) == 50 and (counts == 1).all()
+    kept, counts = dedup_patterns(patterns + patterns, tol=2)
+    assert len(kept) == 50 and (counts == 2).all()
@@ -0,0 +1,63 @@
+import numpy as np
+
+from flag_pattern.portfolio import PortfolioConfig, PortfolioSimulator, events_from_table
+
+
+def _table(conf_x, kind, flag_width, pole_height):
+    return {'conf_x': np.array(conf_x), 'kind': np.array(kind, dtype=np.int8),
+            'flag_width': np.array(flag_width), 'pole_height': np.array(pole_height, dtype=float)}
+
+
+def _run(streams, **config):
+    config = PortfolioConfig(cost_bps=0.0, **config)
+    return PortfolioSimulator(config).run(streams)
+
+
+def test_same_bar_signals_ordered_by_score():
+    table = _table([5, 3, 5, 5], [0, 1, 2, 3], [4, 4, 4, 4], [0.1, 0.5, 0.3, 0.2])
+    events = list(events_from_table(table))
+    assert [e[0] for e in events] == [3, 5, 5, 5]
+    assert [e[4] for e in events] == [0.5, 0.3, 0.2, 0.1]
+    assert [e[1] for e in events] == [-1, 1, -1, 1]  # 偶数kind为牛市做多
+
+
+def test_max_per_symbol_takes_best_signal_of_the_bar():
+    prices = np.linspace(0.0, 0.5, 50)
+    table = _table([10, 10, 10], [0, 0, 0], [5, 5, 5], [0.1, 0.3, 0.2])
+    result = _run({'a': (events_from_table(table), None, prices)}, max_positions=5, max_per_symbol=1)
+    assert result.n_signals == 3 and result.n_rejected == 2
+    assert result.trades['entry_x'].tolist() == [10]
+    assert result.trades['exit_x'].tolist() == [15]
+
+
+def test_max_positions_across_symbols():
+    prices = np.zeros(50)
+    streams = {s: (events_from_table(_table([10], [0], [5], [score])), None, prices)
+               for s, score in (('a', 0.1), ('b', 0.3), ('c', 0.2))}
+    result = _run(streams, max_positions=2, max_per_symbol=1)
+    # 同一时刻的信号按优先级分配仓位，优先级最低的品种被拒绝
+    assert sorted(result.trades['symbol'].tolist()) == ['b', 'c']
+    assert result.n_rejected == 1
+
+
+def test_exit_frees_position_for_same_bar_entry():
+    prices = np.zeros(50)
+    table = _table([10, 15], [0, 0], [5, 5], [0.1, 0.1])
+    result = _run({'a': (events_from_table(table), None, prices)}, max_positions=1)
+    # 第一笔在15平仓，同一根K线上先平仓后开仓
+    assert result.trades['entry_x'].tolist() == [10, 15]
+    assert result.n_rejected == 0
+
+
+def test_returns_skips_and_dates():
+    prices = np.log(np.array([100.0] * 10 + [110.0] * 10))
+    table = _table([5, 12, 15], [0, 1, 0], [5, 3, 10], [0.2, 0.2, 0.2])
+    dates = np.arange('2024-01-01', '2024-01-21', dtype='datetime64[D]')
+    result = _run({'a': (events_from_table(table), dates, prices)}, max_positions=3, max_per_symbol=3,
+                  position_fraction=0.5)
+    assert result.n_skipped == 1  # 持有期超出数据范围
+    np.testing.assert_allclose(result.trades['ret'], [0.1, 0.0])
+    assert result.trades['exit_time'][0] == dates[10].astype('datetime64[s]').astype(np.int64)
+    stats = result.stats()
+    np.testing.assert_allclose(stats['total_return'], 0.05)
+    assert stats['n_trades'] == 2 and stats['max_drawdown'] == 0.0
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm_0328 import find_flags_pennants_pips, patterns_to_table
+from flag_pattern.resample import Timeframe, bucket_keys, bucket_starts, scan_timeframes
+
+
+def _days(*days):
+    return np.array(days, dtype='datetime64[D]')
+
+
+def test_week_starts_on_monday():
+    # 2024-01-01是周一
+    dates = _days('2023-12-31', '2024-01-01', '2024-01-05', '2024-01-07', '2024-01-08')
+    keys = bucket_keys(dates, 'W')
+    assert keys[0] != keys[1]
+    assert keys[1] == keys[2] == keys[3]
+    assert keys[3] != keys[4]
+    assert bucket_starts(keys).tolist() == [0, 1, 4]
+
+
+def test_month_quarter_year_edges():
+    dates = _days('2024-01-31', '2024-02-01', '2024-02-29', '2024-04-01', '2024-12-31', '2025-01-01')
+    assert bucket_starts(bucket_keys(dates, 'M')).tolist() == [0, 1, 3, 4, 5]
+    assert bucket_starts(bucket_keys(dates, 'Q')).tolist() == [0, 3, 4, 5]
+    assert bucket_starts(bucket_keys(dates, 'Y')).tolist() == [0, 5]
+
+
+def test_intraday_label_end():
+    dates = np.arange('2024-01-02T09:31', '2024-01-02T09:41', dtype='datetime64[m]')
+    # 以开始时间标记时09:35开始新的5分钟桶；以结束时间标记时09:35属于09:30-09:35
+    assert bucket_starts(bucket_keys(dates, '5min')).tolist() == [0, 4, 9]
+    assert bucket_starts(bucket_keys(dates, '5min', label='end')).tolist() == [0, 5]
+    assert bucket_starts(bucket_keys(dates, '1h')).tolist() == [0]
+
+    with pytest.raises(ValueError):
+        bucket_keys(dates, '5s')
+    with pytest.raises(ValueError):
+        bucket_keys(dates, 'D', label='middle')
+
+
+def test_partial_last_bucket():
+    # 两个完整的周（周一至周五）加上第三周的前两天
+    dates = np.busday_offset('2024-01-01', np.arange(12), roll='forward')
+    tf = Timeframe(dates, 'W')
+    assert tf.starts.tolist() == [0, 5, 10]
+    assert tf.ends.tolist() == [4, 9, 11]
+    assert tf.dates.tolist() == dates[[4, 9, 11]].tolist()
+
+    x = np.arange(12, dtype=float)
+    bars = tf.aggregate(open_=x, high=x + 0.5, low=x - 0.5, close=x + 0.25, volume=np.ones(12))
+    assert bars['open'].tolist() == [0, 5, 10]
+    assert bars['high'].tolist() == [4.5, 9.5, 11.5]
+    assert bars['low'].tolist() == [-0.5, 4.5, 9.5]
+    assert bars['close'].tolist() == [4.25, 9.25, 11.25]
+    assert bars['volume'].tolist() == [5, 5, 2]
+
+    assert tf.to_base([0, 2]).tolist() == [4, 11]
+    assert tf.to_base_start([0, 2]).tolist() == [0, 10]
+
+
+def test_scan_timeframes(sse_close):
+    dates = np.busday_offset('1995-01-02', np.arange(len(sse_close)), roll='forward')
+    tables, timeframes = scan_timeframes(dates, sse_close, freqs=('base', 'W'), orders={'base': 10, 'W': 3},
+                                         max_workers=1)
+
+    direct = patterns_to_table(find_flags_pennants_pips(sse_close, 10))
+    for name, col in direct.items():
+        np.testing.assert_array_equal(tables['base'][name], col)
+    np.testing.assert_array_equal(tables['base']['src_conf_x'], direct['conf_x'])
+
+    weekly, tf = tables['W'], timeframes['W']
+    assert len(weekly['conf_x']) > 0
+    np.testing.assert_array_equal(weekly['src_conf_x'], tf.ends[weekly['conf_x']])
+    np.testing.assert_array_equal(weekly['conf_time'], dates[tf.ends[weekly['conf_x']]])
+    weekly_close = sse_close[tf.ends]
+    direct = patterns_to_table(find_flags_pennants_pips(weekly_close, 3))
+    np.testing.assert_array_equal(weekly['conf_x'], direct['conf_x'])
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from flag_pattern.result_writer import ResultWriter, list_partitions, read_results, summarize_store
+
+
+def _table(kinds, returns):
+    return {'kind': np.asarray(kinds, dtype=np.int8), 'conf_x': np.arange(len(kinds), dtype=np.int64),
+            'return': np.asarray(returns, dtype=np.float64)}
+
+
+def _counts(summary, order):
+    return summary.xs(('SSE', 'pips', order), level=['symbol', 'method', 'order'])['count'].to_dict()
+
+
+def test_overwrite_rerun_clears_partitions_that_became_empty(tmp_path):
+    root = str(tmp_path)
+    with ResultWriter(root) as writer:
+        writer.write('patterns', _table([0, 1], [0.01, -0.02]), 'SSE', 'pips', 3)
+        writer.write('patterns', _table([2], [0.03]), 'SSE', 'pips', 4)
+    assert _counts(summarize_store(root), 3) == {'bull_flag': 1, 'bear_flag': 1, 'bull_pennant': 0, 'bear_pennant': 0}
+
+    # 重新运行：order=3这次没有识别到形态，旧结果必须被替换掉
+    with ResultWriter(root, overwrite=True) as writer:
+        writer.write('patterns', _table([], []), 'SSE', 'pips', 3)
+        writer.write('patterns', _table([3], [0.05]), 'SSE', 'pips', 4)
+
+    summary = summarize_store(root)
+    assert _counts(summary, 3) == {'bull_flag': 0, 'bear_flag': 0, 'bull_pennant': 0, 'bear_pennant': 0}
+    assert _counts(summary, 4) == {'bull_flag': 0, 'bear_flag': 0, 'bull_pennant': 0, 'bear_pennant': 1}
+    assert len(read_results(root, 'patterns', order=3)) == 0
+    assert list_partitions(root, 'patterns') == [('SSE', 'pips', 3), ('SSE', 'pips', 4)]
+
+
+def test_empty_result_is_listed_with_zero_count(tmp_path):
+    root = str(tmp_path)
+    with ResultWriter(root) as writer:
+        writer.write('patterns', _table([], []), 'SSE', 'pips', 5)
+    summary = summarize_store(root)
+    assert list(summary.index.unique('order')) == [5]
+    assert (summary['count'] == 0).all()
+
+
+def test_append_keeps_previous_rows(tmp_path):
+    root = str(tmp_path)
+    with ResultWriter(root) as writer:
+        writer.write('patterns', _table([0], [0.01]), 'SSE', 'pips', 3)
+    with ResultWriter(root) as writer:
+        writer.write('patterns', _table([], []), 'SSE', 'pips', 3)
+        writer.write('patterns', _table([0], [0.02]), 'SSE', 'pips', 3)
+    assert _counts(summarize_store(root), 3)['bull_flag'] == 2
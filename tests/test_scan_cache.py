@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from flag_pattern import scan_cache
+from flag_pattern.flag_pattern_algorithm import (FlagParams, find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+from flag_pattern.pattern_pool import pole_priority
+from flag_pattern.scan_cache import ScanCache, cached_find_flags_pennants, cached_patterns_table, scan_key
+
+
+@pytest.fixture
+def data(sse_close):
+    return sse_close[:2000]
+
+
+def _assert_same(table, expected):
+    assert set(table) == set(expected)
+    for name, col in expected.items():
+        np.testing.assert_array_equal(table[name], col, err_msg=name)
+
+
+def test_hit_returns_memory_mapped_table(data, tmp_path):
+    cache = ScanCache(str(tmp_path))
+    expected = patterns_to_table(find_flags_pennants_trendline(data, 8))
+    _assert_same(cached_patterns_table(data, 8, 'trendline', cache), expected)
+    assert len(cache.entries()) == 1
+
+    table = cached_patterns_table(data, 8, 'trendline', cache)
+    assert isinstance(table['conf_x'], np.memmap)
+    _assert_same(table, expected)
+    assert len(cache.entries()) == 1
+
+    found = cached_find_flags_pennants(data, 8, 'trendline', cache)
+    assert found == tuple(find_flags_pennants_trendline(data, 8))
+
+
+def test_key_changes_with_data_params_and_code(data, monkeypatch):
+    key = scan_key(data, 'pips', 8)
+    assert scan_key(data.copy(), 'pips', 8) == key
+    assert scan_key(data.astype(np.float32), 'pips', 8) != key
+    changed = data.copy()
+    changed[-1] += 1e-12
+    assert scan_key(changed, 'pips', 8) != key
+    assert scan_key(data, 'trendline', 8) != key
+    assert scan_key(data, 'pips', 9) != key
+    assert scan_key(data, 'pips', 8, params=FlagParams(pip_distance=2)) != key
+    assert scan_key(data, 'pips', 8, params=FlagParams()) == scan_key(data, 'pips', 8, params=FlagParams())
+    assert scan_key(data, 'pips', 8, index=object()) == key  # 只影响速度的参数不计入缓存键
+
+    monkeypatch.setattr(scan_cache, '_code_version', 'another-version')
+    assert scan_key(data, 'pips', 8) != key
+
+
+def test_source_files_cover_pattern_kinds():
+    assert 'pattern_index.py' in scan_cache._SOURCE_FILES
+    here = os.path.dirname(scan_cache.__file__)
+    assert all(os.path.exists(os.path.join(here, name)) for name in scan_cache._SOURCE_FILES)
+
+
+def test_callables_are_rejected(data, tmp_path):
+    with pytest.raises(TypeError):
+        cached_patterns_table(data, 8, 'pips', ScanCache(str(tmp_path)), bull_priority=pole_priority(True))
+
+
+def test_corrupt_entry_is_recomputed(data, tmp_path):
+    cache = ScanCache(str(tmp_path))
+    expected = patterns_to_table(find_flags_pennants_pips(data, 8))
+    cached_patterns_table(data, 8, 'pips', cache)
+    key = scan_key(data, 'pips', 8)
+    with open(os.path.join(str(tmp_path), key, 'conf_x.npy'), 'wb') as fh:
+        fh.write(b'not a numpy file')
+
+    assert cache.get(key) is None
+    assert not os.path.exists(os.path.join(str(tmp_path), key))
+    _assert_same(cached_patterns_table(data, 8, 'pips', cache), expected)
+    _assert_same(cache.get(key), expected)
+
+
+def test_lru_eviction(data, tmp_path):
+    cache = ScanCache(str(tmp_path), max_bytes=1)
+    cached_patterns_table(data, 8, 'pips', cache)
+    cached_patterns_table(data, 9, 'pips', cache)
+    # 预算不足时只保留刚写入的条目
+    assert [os.path.basename(p) for _, _, p in cache.entries()] == [scan_key(data, 'pips', 9)]
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from flag_pattern.order_sweep import run_order_sweep
+from flag_pattern.scan_pipeline import run_pipeline
+
+pytest.importorskip('pyarrow')
+from flag_pattern.result_writer import ResultWriter, read_results  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def sources(sse_close):
+    return {'a': sse_close[:2500], 'b': sse_close[2500:5000], 'c': sse_close[5000:]}
+
+
+def test_writer_output_matches_order_sweep(sources, tmp_path):
+    expected, tables = run_order_sweep(sources, [5, 10], max_workers=1, return_patterns=True)
+    with ResultWriter(str(tmp_path)) as writer:
+        results, _ = run_pipeline(sources, [5, 10], scan_workers=2, writer=writer)
+    assert results.equals(expected)
+
+    stored = read_results(str(tmp_path), 'patterns')
+    for (symbol, method, order), table in tables.items():
+        part = stored[(stored['symbol'] == symbol) & (stored['order'] == order)].sort_values(['kind', 'conf_x'])
+        np.testing.assert_array_equal(part['conf_x'].to_numpy(), table['conf_x'])
+
+
+def test_return_patterns(sources):
+    _, tables = run_order_sweep(sources, [8], max_workers=1, return_patterns=True)
+    results, _, patterns = run_pipeline(sources, [8], scan_workers=2, return_patterns=True)
+    assert set(patterns) == set(tables)
+    for key, table in tables.items():
+        np.testing.assert_array_equal(patterns[key]['return'], table['return'])
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import (find_flags_pennants_pips, find_flags_pennants_trendline,
+                                                 patterns_to_table)
+from flag_pattern.pattern_index import PATTERN_KINDS
+from flag_pattern.scan_service import serve
+
+
+@pytest.fixture(scope='module')
+def server(sse_close):
+    data = sse_close[:3000]
+
+    def slow():
+        time.sleep(0.5)  # 加载期间到达的相同请求应当合并
+        return data
+
+    server = serve({'sse': data, 'slow': slow}, port=0, block=False)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _get(server, path):
+    url = f'http://127.0.0.1:{server.server_address[1]}{path}'
+    try:
+        with urlopen(url, timeout=60) as resp:
+            return resp.status, json.loads(resp.read())
+    except HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+@pytest.mark.parametrize('method, finder', [('pips', find_flags_pennants_pips),
+                                            ('trendline', find_flags_pennants_trendline)])
+def test_patterns_match_batch(server, sse_close, method, finder):
+    status, body = _get(server, f'/patterns?symbol=sse&method={method}&order=8')
+    assert status == 200
+    expected = patterns_to_table(finder(sse_close[:3000], 8))
+    assert body['count'] == len(expected['kind'])
+    assert body['columns']['kind'] == [PATTERN_KINDS[k] for k in expected['kind']]
+    for name, col in expected.items():
+        if name != 'kind':
+            np.testing.assert_array_equal(np.array(body['columns'][name], dtype=np.float64),
+                                          col.astype(np.float64), err_msg=name)
+
+
+def test_concurrent_requests_are_coalesced(server):
+    before = server.service.cache.stats()
+    results = []
+
+    def request():
+        results.append(_get(server, '/patterns?symbol=slow&method=pips&order=10'))
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    after = server.service.cache.stats()
+
+    assert [status for status, _ in results] == [200] * 6
+    assert len({json.dumps(body['columns']) for _, body in results}) == 1
+    # 价格加载和扫描各计算一次，其余请求等待同一个结果
+    assert after['misses'] - before['misses'] == 2
+    assert after['coalesced'] - before['coalesced'] >= 1
+    assert (after['coalesced'] + after['hits']) - (before['coalesced'] + before['hits']) == 5
+
+
+@pytest.mark.parametrize('query', ['order=2', 'max_pending=0', 'pip_distance=4', 'order=abc', 'foo=1'])
+def test_bad_arguments_return_400(server, query):
+    status, body = _get(server, f'/patterns?symbol=sse&{query}')
+    assert status == 400 and body['error']
+
+
+def test_unknown_symbol_and_path_return_404(server):
+    assert _get(server, '/patterns?symbol=nope')[0] == 404
+    assert _get(server, '/nope')[0] == 404
+
+
+def test_scan_errors_return_500():
+    def broken():
+        raise KeyError('close')  # 例如文件中缺少价格列
+
+    server = serve({'broken': broken}, port=0, block=False)
+    try:
+        status, body = _get(server, '/patterns?symbol=broken')
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert status == 500 and 'KeyError' in body['error']
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from flag_pattern.breakout import pending_breakouts
+from flag_pattern.incremental_scan import ResumableScanner
+from flag_pattern.screener import build_screener
+
+
+@pytest.mark.parametrize('method', ['pips', 'trendline'])
+def test_rows_match_pending_breakouts(sse_close, method):
+    series = {'a': sse_close[:1500], 'b': sse_close[2000:3500], 'c': sse_close[4000:5500]}
+    screener = build_screener({k: v[:1400] for k, v in series.items()}, 10, method, max_pending=2)
+    for t in range(1400, 1500):
+        screener.update({k: v[t] for k, v in series.items()})
+
+    for k, (symbol, data) in enumerate(series.items()):
+        scanner = ResumableScanner(10, method, 2)
+        scanner.update(data)
+        table = pending_breakouts(scanner)
+        count = len(table['kind'])
+        for name in ('kind', 'level', 'slope', 'base_x', 'tip_x', 'level_x'):
+            np.testing.assert_array_equal(getattr(screener, name)[k, :count], table[name], err_msg=name)
+        assert np.isnan(screener.level[k, count:]).all()
+        assert screener.last_y[k] == data[-1]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+
+from flag_pattern.important_point_algorithm import find_pips
+from flag_pattern.shape_index import ShapeIndex, find_pips_many
+
+
+@pytest.mark.parametrize('dist_measure', [1, 2, 3])
+@pytest.mark.parametrize('width, n_pips', [(5, 5), (24, 5), (60, 7)])
+def test_find_pips_many_matches_find_pips(sse_close, dist_measure, width, n_pips):
+    windows = sliding_window_view(sse_close[:1500], width)[::7]
+    pips_x, pips_y = find_pips_many(windows, n_pips, dist_measure)
+    assert pips_x.shape == pips_y.shape == (len(windows), n_pips)
+    for r, window in enumerate(windows):
+        x, y = find_pips(window, n_pips, dist_measure)
+        np.testing.assert_array_equal(pips_x[r], x)
+        np.testing.assert_array_equal(pips_y[r], y)
+
+
+def test_query_nearest_and_mask():
+    rng = np.random.default_rng(3)
+    vectors = rng.random((50, 8)).astype(np.float32)
+    index = ShapeIndex(8)
+    index.add(vectors, kind=np.arange(50) % 4)
+
+    q = vectors[7] + 0.001
+    expected = np.argsort(np.linalg.norm(vectors - q, axis=1), kind='stable')[:5]
+    rows, dist = index.query(q, k=5)
+    np.testing.assert_array_equal(rows, expected)
+    assert np.all(np.diff(dist) >= 0)
+
+    # mask保留的向量少于k个时，只返回保留的向量，不返回距离为inf的被排除行
+    mask = index.meta['kind'] == 1
+    mask[20:] = False
+    rows, dist = index.query(vectors[:3], k=10, mask=mask)
+    assert rows.shape == dist.shape == (3, mask.sum())
+    assert np.all(mask[rows]) and np.all(np.isfinite(dist))
+
+    rows, dist = index.query(q, k=10, mask=np.zeros(50, dtype=bool))
+    assert rows.shape == dist.shape == (0,)
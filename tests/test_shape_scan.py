@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from flag_pattern.flag_pattern_algorithm import find_flags_pennants_pips, patterns_to_table
+from flag_pattern.shape_scan import SHAPE_KINDS, find_shapes_pips
+
+
+@pytest.mark.parametrize('order, max_pending', [(5, 1), (12, 1), (8, 3)])
+def test_flag_rows_match_pips(sse_close, order, max_pending):
+    table = find_shapes_pips(sse_close, order, max_pending)
+    expected = patterns_to_table(find_flags_pennants_pips(sse_close, order, max_pending))
+    flags = table['kind'] < 4
+    for name, col in expected.items():
+        np.testing.assert_array_equal(table[name][flags], col, err_msg=name)
+
+
+def test_finds_wedges_and_triangles(sse_close):
+    kinds = find_shapes_pips(sse_close, 5)['kind']
+    assert kinds.max() < len(SHAPE_KINDS)
+    assert (kinds >= 4).any()
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from flag_pattern.flag_pattern_algorithm_0328 import find_flags_pennants_pips, patterns_to_table
+from flag_pattern.significance import run_significance, run_universe_significance
+
+
+@pytest.fixture(scope='module')
+def universe(sse_close, random_walk):
+    series = {'sse': sse_close, 'rw': random_walk}
+    tables = {s: patterns_to_table(find_flags_pennants_pips(data, 10)) for s, data in series.items()}
+    return series, tables
+
+
+def test_fixed_seed_is_reproducible(universe):
+    series, tables = universe
+    a = run_significance(tables['sse'], series['sse'], n_resamples=500, seed=7)
+    b = run_significance(tables['sse'], series['sse'], n_resamples=500, seed=7)
+    pd.testing.assert_frame_equal(a, b)
+    assert a['count'].sum() == len(tables['sse']['conf_x'])
+
+    c = run_significance(tables['sse'], series['sse'], n_resamples=500, seed=8)
+    assert not a.drop(columns='count').equals(c.drop(columns='count'))
+
+
+def test_universe_independent_of_workers(universe):
+    series, tables = universe
+    serial = run_universe_significance(series, tables, n_resamples=300, seed=11, max_workers=1)
+    parallel = run_universe_significance(series, tables, n_resamples=300, seed=11, max_workers=2)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+    # 每个品种的结果与用派生子种子单独检验一致
+    children = np.random.SeedSequence(11).spawn(len(series))
+    for symbol, child in zip(series, children):
+        alone = run_significance(tables[symbol], series[symbol], n_resamples=300, seed=child)
+        pd.testing.assert_frame_equal(serial.xs(symbol, level='symbol'), alone, check_names=False)
@@ -0,0 +1,63 @@
+import numpy as np
+
+from flag_pattern.flag_pattern_algorithm_0328 import find_flags_pennants_pips, patterns_to_table
+from flag_pattern.order_sweep import pattern_returns
+from flag_pattern.walk_forward import blocked_kfold_splits, run_walk_forward, walk_forward_splits
+
+
+def test_rolling_splits():
+    splits = walk_forward_splits(100, 40, 20)
+    assert splits == [([(0, 40)], (40, 60)), ([(20, 60)], (60, 80)), ([(40, 80)], (80, 100))]
+
+    # 最后一个测试窗口不完整时丢弃
+    assert walk_forward_splits(99, 40, 20)[-1] == ([(20, 60)], (60, 80))
+
+
+def test_anchored_gap_and_step():
+    splits = walk_forward_splits(100, 30, 20, step=10, anchored=True, gap=5)
+    assert splits == [([(0, 30)], (35, 55)), ([(0, 40)], (45, 65)), ([(0, 50)], (55, 75)),
+                      ([(0, 60)], (65, 85)), ([(0, 70)], (75, 95))]
+    for train, (test_start, _) in splits:
+        assert test_start - train[-1][1] == 5
+
+
+def test_blocked_kfold_embargo():
+    splits = blocked_kfold_splits(100, 4, embargo=5)
+    assert [test for _, test in splits] == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    # 首尾两折只剩一段训练区间，空区间被丢弃
+    assert splits[0][0] == [(30, 100)]
+    assert splits[1][0] == [(0, 20), (55, 100)]
+    assert splits[3][0] == [(0, 70)]
+    for train, (lo, hi) in splits:
+        for a, b in train:
+            assert b <= lo - 5 or a >= hi + 5
+
+    assert blocked_kfold_splits(100, 4)[1][0] == [(0, 25), (50, 100)]
+
+
+def test_fold_selection_uses_only_training_outcomes(sse_close):
+    orders = [8, 12]
+    splits = blocked_kfold_splits(len(sse_close), 3, embargo=50)
+    folds, scores = run_walk_forward(sse_close, orders, splits, min_count=5, max_workers=1, return_scores=True)
+
+    assert folds['train'].tolist() == [train for train, _ in splits]
+    assert folds['train_bars'].tolist() == [sum(b - a for a, b in train) for train, _ in splits]
+
+    for c, (order, _) in enumerate(scores['candidates']):
+        table = patterns_to_table(find_flags_pennants_pips(sse_close, order))
+        conf_x = np.asarray(table['conf_x'])
+        exit_x = conf_x + np.asarray(table['flag_width']).astype(np.int64)
+        returns = pattern_returns(table, sse_close)
+        for f, (train, (lo, hi)) in enumerate(splits):
+            # 训练集只包含持有期在同一训练区间内结束的形态
+            in_train = np.zeros(len(conf_x), dtype=bool)
+            for a, b in train:
+                in_train |= (conf_x >= a) & (exit_x < b)
+            r = returns[in_train]
+            np.testing.assert_allclose(scores['train'][f, c], np.nanmean(r))
+            in_test = (conf_x >= lo) & (conf_x < hi)
+            assert scores['test'][f, c, 0] == in_test.sum()
+
+    for f, row in folds.iterrows():
+        best = int(np.nanargmax(scores['train'][f]))
+        assert (row['order'], row['combo']) == scores['candidates'][best]
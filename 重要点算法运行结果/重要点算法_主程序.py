@@ -3,9 +3,14 @@ import pandas as pd  # 用于数据处理和分析
 import numpy as np   # 用于数值计算
 import matplotlib.pyplot as plt  # 用于数据可视化
 import mplfinance as mpf  # 用于绘制金融图表
-from important_point_algorithm import rw_top, rw_bottom, rw_extremes,directional_change, get_extremes, find_pips # 导入重要点算法函数
+from flag_pattern.important_point_algorithm import rw_top, rw_bottom, rw_extremes,directional_change, get_extremes, find_pips # 导入重要点算法函数
 # from get_stock_data import get_stock_data # 导入获取股票数据函数
 import plotly.graph_objects as go
+from flag_pattern.result_writer import ResultWriter, dataset_to_excel  # 导入列式结果存储
+
+# 极值点结果的列式存储目录，以及是否额外导出Excel（较慢，只在需要人工查看时打开）
+results_root = 'scan_results'
+export_excel = False
 
 # data = get_stock_data("000001.SH", "1995-01-01", "2025-02-28")
 # 从Excel文件中读取上证指数数据
@@ -171,12 +176,21 @@ bottoms_df['振幅'] = (bottoms_df['确认价格'] - bottoms_df['底部价格'])
 tops_df = tops_df[['确认日期', '确认价格', '顶部日期', '顶部价格', '振幅', '确认索引', '顶部索引']]
 bottoms_df = bottoms_df[['确认日期', '确认价格', '底部日期', '底部价格', '振幅', '确认索引', '底部索引']]
 
-# 创建Excel写入器
-with pd.ExcelWriter('【Directional Change】极值点数据.xlsx') as writer:
-    tops_df.to_excel(writer, sheet_name='顶部点', index=False)
-    bottoms_df.to_excel(writer, sheet_name='底部点', index=False)
+# 顶部点和底部点合并为一张表写入列式存储，用'类型'列区分
+dc_extremes = pd.concat([
+    tops_df.rename(columns={'顶部日期': '极值日期', '顶部价格': '极值价格', '顶部索引': '极值索引'}).assign(类型='顶部点'),
+    bottoms_df.rename(columns={'底部日期': '极值日期', '底部价格': '极值价格', '底部索引': '极值索引'}).assign(类型='底部点'),
+], ignore_index=True)
+with ResultWriter(results_root, overwrite=True) as writer:
+    writer.write('extremes', dc_extremes, '000001.SH', 'directional_change', sigma)
+
+print(f"极值点数据已保存到'{results_root}/extremes'中")
 
-print("极值点数据已保存到'【Directional Change】极值点数据.xlsx'文件中")
+# 需要时从列式存储导出Excel，顶部点和底部点各一个工作表
+if export_excel:
+    dataset_to_excel(results_root, 'extremes', '【Directional Change】极值点数据.xlsx', sheet_by='类型',
+                     method='directional_change')
+    print("极值点数据已保存到'【Directional Change】极值点数据.xlsx'文件中")
 
 # 创建图表对象
 # go.Figure()是plotly库中的一个函数,用于创建一个空的图形对象
@@ -290,11 +304,16 @@ pips_df = pd.DataFrame({
     '索引': pips_x
 })
 
-# 保存到Excel
-with pd.ExcelWriter('【PIP算法】重要点数据.xlsx') as writer:
-    pips_df.to_excel(writer, sheet_name='重要点', index=False)
+# 写入列式存储
+with ResultWriter(results_root, overwrite=True) as writer:
+    writer.write('pips', pips_df, '000001.SH', 'pips', n_pips)
+
+print(f"\n重要点数据已保存到'{results_root}/pips'中")
 
-print("\n重要点数据已保存到'【PIP算法】重要点数据.xlsx'文件中")
+# 需要时从列式存储导出Excel
+if export_excel:
+    dataset_to_excel(results_root, 'pips', '【PIP算法】重要点数据.xlsx', method='pips', order=n_pips)
+    print("\n重要点数据已保存到'【PIP算法】重要点数据.xlsx'文件中")
 
 # 创建不同参数组合的对比图
 n_pips_list = [10, 20, 50,100]  # 不同数量的重要点用于比较效果